@@ -88,6 +88,15 @@ class Graph[T, GT](LazyMixin, SharedReference[GT]):
     @abstractmethod
     def edge_cnt(self) -> int: ...
 
+    @property
+    def version(self) -> int:
+        """
+        Mutation counter of the underlying graph, only ever grows.
+        Backends that can remove edges have to override this, counts alone
+        don't change on a remove followed by an add.
+        """
+        return self.node_cnt + self.edge_cnt
+
     @abstractmethod
     def v(self, obj: T): ...
 
@@ -23,6 +23,8 @@ class PyGraph[T](Sized, Iterable[T]):
         self._e = list[tuple[T, T, L]]()
         self._e_cache = defaultdict[T, dict[T, L]](dict)
         self._v = set[T]()
+        # bumped on every mutation
+        self.version = 0
 
     def __iter__(self) -> Iterator[T]:
         return iter(self._v)
@@ -34,6 +36,7 @@ class PyGraph[T](Sized, Iterable[T]):
         return len(self._e)
 
     def add_edge(self, from_obj: T, to_obj: T, link: L):
+        self.version += 1
         self._e.append((from_obj, to_obj, link))
         self._e_cache[from_obj][to_obj] = link
         self._e_cache[to_obj][from_obj] = link
@@ -41,6 +44,7 @@ class PyGraph[T](Sized, Iterable[T]):
         self._v.add(to_obj)
 
     def remove_edge(self, from_obj: T, to_obj: T | None = None):
+        self.version += 1
         targets = [to_obj] if to_obj else list(self.edges(from_obj).keys())
         for target in targets:
             self._e.remove((from_obj, target, self._e_cache[from_obj][target]))
@@ -48,6 +52,7 @@ class PyGraph[T](Sized, Iterable[T]):
             del self._e_cache[target][from_obj]
 
     def update(self, other: "PyGraph[T]"):
+        self.version += 1
         self._v.update(other._v)
         self._e.extend(other._e)
         self._e_cache.update(other._e_cache)
@@ -64,6 +69,10 @@ class PyGraphView[T](PyGraph[T]):
         self._parent = parent
         self._filter = filter
 
+    @property
+    def version(self) -> int:
+        return self._parent.version
+
     def update(self, other: "PyGraph[T]"):
         raise TypeError("Cannot update a view")
 
@@ -104,6 +113,10 @@ class GraphPY[T](Graph[T, PyGraph[T]]):
     def edge_cnt(self) -> int:
         return self().size()
 
+    @property
+    def version(self) -> int:
+        return self().version
+
     def v(self, obj: T):
         return obj
 
@@ -132,6 +132,8 @@ class Node(FaebrykLibObject, metaclass=PostInitCaller):
     )
 
     _init: bool = False
+    # (graph, graph version, include_mifs, tree), see util.get_node_tree_view
+    _tree_view: tuple | None = None
 
     def __hash__(self) -> int:
         # TODO proper hash
@@ -2,11 +2,13 @@
 # SPDX-License-Identifier: MIT
 
 import logging
+from dataclasses import dataclass
 from enum import Enum
 from textwrap import indent
 from typing import (
     Callable,
     Iterable,
+    Iterator,
     cast,
 )
 
@@ -249,20 +251,92 @@ def get_node_direct_mods_or_mifs(node: Node, include_mifs: bool = True):
     return node.get_children(direct_only=True, types=types)
 
 
+@dataclass(frozen=True)
+class NodeTree:
+    """
+    Flat breadth first view of the Module/ModuleInterface hierarchy below root.
+
+    nodes[i] is a child of nodes[parents[i]] (-1 for the root) at depths[i].
+    Depth d is the slice nodes[level_bounds[d] : level_bounds[d + 1]].
+    """
+
+    nodes: list[Node]
+    parents: list[int]
+    depths: list[int]
+    level_bounds: list[int]
+
+    @classmethod
+    def build(cls, root: Node, include_mifs: bool = True) -> "NodeTree":
+        types = (Module, ModuleInterface) if include_mifs else Module
+        nodes: list[Node] = [root]
+        parents = [-1]
+        depths = [0]
+        level_bounds = [0, 1]
+
+        while level_bounds[-2] < level_bounds[-1]:
+            depth = len(level_bounds) - 1
+            for i in range(level_bounds[-2], level_bounds[-1]):
+                for child in nodes[i].get_node_direct_children_():
+                    if not isinstance(child, types):
+                        continue
+                    nodes.append(child)
+                    parents.append(i)
+                    depths.append(depth)
+            level_bounds.append(len(nodes))
+        level_bounds.pop()
+
+        return cls(nodes, parents, depths, level_bounds)
+
+    @property
+    def depth(self) -> int:
+        return len(self.level_bounds) - 1
+
+    def level(self, depth: int) -> list[Node]:
+        return self.nodes[self.level_bounds[depth] : self.level_bounds[depth + 1]]
+
+    def iter_levels(self) -> Iterator[list[Node]]:
+        return (self.level(d) for d in range(self.depth))
+
+    def to_dict(self, include_root: bool = True) -> dict[Node, dict[Node, dict]]:
+        subtrees: list[dict[Node, dict]] = [{} for _ in self.nodes]
+        for i in range(1, len(self.nodes)):
+            subtrees[self.parents[i]][self.nodes[i]] = subtrees[i]
+
+        if include_root:
+            return {self.nodes[0]: subtrees[0]}
+        return subtrees[0]
+
+
+def get_node_tree_view(node: Node, include_mifs: bool = True) -> NodeTree:
+    """
+    NodeTree of node, cached until the graph of node changes.
+    """
+    g = node.get_graph()
+    G = g()
+    version = g.version
+
+    cached = node._tree_view
+    if (
+        cached is not None
+        and cached[0] is G
+        and cached[1] == version
+        and cached[2] == include_mifs
+    ):
+        return cached[3]
+
+    tree = NodeTree.build(node, include_mifs=include_mifs)
+    node._tree_view = G, version, include_mifs, tree
+    return tree
+
+
 def get_node_tree(
     node: Node,
     include_mifs: bool = True,
     include_root: bool = True,
 ) -> dict[Node, dict[Node, dict]]:
-    out = get_node_direct_mods_or_mifs(node, include_mifs=include_mifs)
-
-    tree = {
-        n: get_node_tree(n, include_mifs=include_mifs, include_root=False) for n in out
-    }
-
-    if include_root:
-        return {node: tree}
-    return tree
+    return get_node_tree_view(node, include_mifs=include_mifs).to_dict(
+        include_root=include_root
+    )
 
 
 def iter_tree_by_depth(tree: dict[Node, dict]):
@@ -510,7 +584,7 @@ def get_children_of_type[U: Node](node: Node, child_type: type[U]) -> list[U]:
 
 
 def get_first_child_of_type[U: Node](node: Node, child_type: type[U]) -> U:
-    for level in iter_tree_by_depth(get_node_tree(node)):
+    for level in get_node_tree_view(node).iter_levels():
         for child in level:
             if isinstance(child, child_type):
                 return child
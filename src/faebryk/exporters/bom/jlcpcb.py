@@ -5,8 +5,9 @@ import csv
 import logging
 import os
 import re
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 from pathlib import Path
+from typing import Iterable
 
 import faebryk.library._F as F
 from faebryk.core.module import Module
@@ -26,11 +27,6 @@ class BOMLine:
     LCSC_Partnumber: str
 
 
-def rename_column(rows: list[dict[str, str]], old: str, new: str) -> None:
-    for row in rows:
-        row[new] = row.pop(old)
-
-
 def split_designator(designator: str) -> tuple[str, int]:
     match = re.compile(r"(\d+)$").search(designator)
     if match is None:
@@ -41,114 +37,103 @@ def split_designator(designator: str) -> tuple[str, int]:
 
 
 def write_bom_jlcpcb(components: set[Module], path: Path) -> None:
+    _write_bomlines((line for c in components if (line := _get_bomline(c))), path)
+
+
+def _write_bomlines(bomlines: Iterable[BOMLine], path: Path) -> None:
     if not path.parent.exists():
         os.makedirs(path.parent)
-    with open(path, "w", newline="") as bom_csv:
-        bomlines = [line for c in components if (line := _get_bomline(c))]
-        bomlines = sorted(
-            _compact_bomlines(bomlines),
-            key=lambda x: split_designator(x.Designator.split(", ")[0]),
-        )
 
-        rows = [vars(line) for line in bomlines]
-        rename_column(rows, "LCSC_Partnumber", "LCSC Part #")
+    bomlines = sorted(
+        _compact_bomlines(bomlines),
+        key=lambda x: split_designator(x.Designator.split(", ")[0]),
+    )
+    columns = {f.name: f.name for f in fields(BOMLine)}
+    columns["LCSC_Partnumber"] = "LCSC Part #"
 
-        writer = csv.DictWriter(
+    with open(path, "w", newline="") as bom_csv:
+        writer = csv.writer(
             bom_csv,
-            fieldnames=list(rows[0].keys()),
             delimiter=",",
             quotechar='"',
             quoting=csv.QUOTE_MINIMAL,
             lineterminator="\n",
         )
-        writer.writeheader()
-        writer.writerows(rows)
+        writer.writerow(columns.values())
+        writer.writerows((getattr(line, name) for name in columns) for line in bomlines)
+
+
+def _compact_bomlines(bomlines: Iterable[BOMLine]) -> list[BOMLine]:
+    """
+    Merge lines with equal LCSC part number into the first one, in one pass.
+    """
+    groups: dict[str, tuple[BOMLine, list[str]]] = {}
+    for bomline in bomlines:
+        group = groups.get(bomline.LCSC_Partnumber)
+        if group is None:
+            groups[bomline.LCSC_Partnumber] = bomline, [bomline.Designator]
+            continue
 
+        compact_bomline, designators = group
+        for key in "Footprint", "Value":
+            if getattr(compact_bomline, key) != getattr(bomline, key):
+                logger.warning(
+                    f"{key} is not the same for two equal partnumbers "
+                    f"{bomline.LCSC_Partnumber}: "
+                    f"{compact_bomline.Designator} "
+                    f"with {key}: {getattr(compact_bomline, key)} "
+                    f"{bomline.Designator} "
+                    f"with {key}: {getattr(bomline,key)}"
+                )
+        designators.append(bomline.Designator)
+        compact_bomline.Quantity += bomline.Quantity
 
-def _compact_bomlines(bomlines: list[BOMLine]) -> list[BOMLine]:
     compact_bomlines = []
-    for row, bomline in enumerate(bomlines):
-        # skip PNs that we already added
-        if bomline.LCSC_Partnumber in [row.LCSC_Partnumber for row in compact_bomlines]:
-            continue
-
-        compact_bomline = bomline
-        for other_bomline in bomlines[row + 1 :]:
-            if bomline.LCSC_Partnumber == other_bomline.LCSC_Partnumber:
-                for key in "Footprint", "Value":
-                    if getattr(bomline, key) != getattr(other_bomline, key):
-                        logger.warning(
-                            f"{key} is not the same for two equal partnumbers "
-                            f"{bomline.LCSC_Partnumber}: "
-                            f"{bomline.Designator} "
-                            f"with {key}: {getattr(bomline, key)} "
-                            f"{other_bomline.Designator} "
-                            f"with {key}: {getattr(other_bomline,key)}"
-                        )
-                # Sort designators in bomline by number
-                compact_bomline.Designator = ", ".join(
-                    sorted(
-                        (
-                            compact_bomline.Designator + ", " + other_bomline.Designator
-                        ).split(", "),
-                        key=lambda x: split_designator(x),
-                    )
+    for compact_bomline, designators in groups.values():
+        if len(designators) > 1:
+            # Sort designators in bomline by number
+            compact_bomline.Designator = ", ".join(
+                sorted(
+                    (d for ds in designators for d in ds.split(", ")),
+                    key=split_designator,
                 )
-                compact_bomline.Quantity += other_bomline.Quantity
-        compact_bomlines += [compact_bomline]
+            )
+        compact_bomlines.append(compact_bomline)
 
     return compact_bomlines
 
 
 def _get_bomline(cmp: Module) -> BOMLine | None:
-    if not cmp.has_trait(F.has_footprint):
+    if (has_footprint := cmp.try_get_trait(F.has_footprint)) is None:
         return
 
-    if not all(
-        cmp.has_trait(t)
-        for t in (
-            F.has_descriptive_properties,
-            F.has_designator,
-        )
-    ):
+    properties_t = cmp.try_get_trait(F.has_descriptive_properties)
+    designator_t = cmp.try_get_trait(F.has_designator)
+    if properties_t is None or designator_t is None:
         logger.warning(f"Missing fields on component {cmp}")
         return
 
-    properties = cmp.get_trait(F.has_descriptive_properties).get_properties()
-    footprint = cmp.get_trait(F.has_footprint).get_footprint()
+    properties = properties_t.get_properties()
+    footprint = has_footprint.get_footprint()
 
-    value = (
-        cmp.get_trait(F.has_simple_value_representation).get_value()
-        if cmp.has_trait(F.has_simple_value_representation)
-        else ""
-    )
-    designator = cmp.get_trait(F.has_designator).get_designator()
+    value_t = cmp.try_get_trait(F.has_simple_value_representation)
+    value = value_t.get_value() if value_t is not None else ""
+    designator = designator_t.get_designator()
 
-    if not footprint.has_trait(F.has_kicad_footprint):
+    kicad_footprint = footprint.try_get_trait(F.has_kicad_footprint)
+    if kicad_footprint is None:
         logger.warning(f"Missing kicad footprint on component {cmp}")
         return
 
     if "LCSC" not in properties:
         return
 
-    manufacturer = (
-        properties[DescriptiveProperties.manufacturer]
-        if DescriptiveProperties.manufacturer in properties
-        else ""
-    )
-    partnumber = (
-        properties[DescriptiveProperties.partno]
-        if DescriptiveProperties.partno in properties
-        else ""
-    )
-
-    footprint_name = footprint.get_trait(
-        F.has_kicad_footprint
-    ).get_kicad_footprint_name()
+    manufacturer = properties.get(DescriptiveProperties.manufacturer, "")
+    partnumber = properties.get(DescriptiveProperties.partno, "")
 
     return BOMLine(
         Designator=designator,
-        Footprint=footprint_name,
+        Footprint=kicad_footprint.get_kicad_footprint_name(),
         Quantity=1,
         Value=value,
         Manufacturer=manufacturer,
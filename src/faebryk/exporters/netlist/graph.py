@@ -3,6 +3,7 @@
 
 import logging
 from abc import abstractmethod
+from typing import Iterable
 
 import networkx as nx
 
@@ -110,8 +111,49 @@ def add_or_get_net(interface: F.Electrical):
     return next(iter(nets))
 
 
+def get_electrical_components(
+    g: Graph, mifs: Iterable[F.Electrical] | None = None
+) -> list[set[F.Electrical]]:
+    """
+    Electrically connected components of all F.Electrical interfaces in g.
+    Union-find over the `connected` edges, every edge is visited once per side.
+    Connections are closed transitively, so a component of k interfaces has
+    about k^2 edges, the pass is linear in edges, not in interfaces.
+    Pass mifs if the interfaces of g are already known.
+    """
+    from faebryk.core.util import get_all_nodes_of_type, get_connected_mifs
+
+    if mifs is None:
+        mifs = get_all_nodes_of_type(g, F.Electrical)
+    mifs = list(mifs)
+    parent = {mif: mif for mif in mifs}
+
+    def find(mif: F.Electrical) -> F.Electrical:
+        root = mif
+        while parent[root] is not root:
+            root = parent[root]
+        # path compression
+        while parent[mif] is not root:
+            parent[mif], mif = root, parent[mif]
+        return root
+
+    for mif in mifs:
+        root = find(mif)
+        for other in get_connected_mifs(mif.connected):
+            if other not in parent:
+                continue
+            other_root = find(other)
+            if other_root is not root:
+                parent[other_root] = root
+
+    components: dict[F.Electrical, set[F.Electrical]] = {}
+    for mif in mifs:
+        components.setdefault(find(mif), set()).add(mif)
+    return list(components.values())
+
+
 def attach_nets_and_kicad_info(g: Graph):
-    from faebryk.core.util import get_all_nodes_with_trait
+    from faebryk.core.util import get_all_nodes_of_type, get_all_nodes_with_trait
     # g has to be closed
 
     Gclosed = g
@@ -135,7 +177,35 @@ def attach_nets_and_kicad_info(g: Graph):
             continue
         fp.add_trait(can_represent_kicad_footprint_via_attached_component(n, Gclosed))
 
-    for fp in node_fps.values():
-        # TODO use graph
-        for mif in fp.get_children(direct_only=True, types=F.Pad):
-            add_or_get_net(mif.net)
+    # pad interface -> (pad, footprint)
+    pad_mifs = {
+        pad.net: (pad, fp)
+        for fp in get_all_nodes_of_type(Gclosed, F.Footprint)
+        for pad in fp.get_children(direct_only=True, types=F.Pad)
+    }
+    # only pads of components get a net
+    needs_net = {
+        pad.net
+        for fp in node_fps.values()
+        for pad in fp.get_children(direct_only=True, types=F.Pad)
+    }
+
+    # one sweep over the connected components instead of one search per pad
+    for component in get_electrical_components(Gclosed):
+        nets = {
+            p[0]
+            for mif in component
+            if (p := mif.get_parent()) is not None and isinstance(p[0], F.Net)
+        }
+        if len(nets) > 1:
+            raise Exception(f"Multiple nets interconnected: {nets}")
+
+        if nets:
+            net = next(iter(nets))
+        elif anchor := next((mif for mif in component if mif in needs_net), None):
+            net = F.Net()
+            net.part_of.connect(anchor)
+        else:
+            continue
+
+        net.set_fps(dict(pad_mifs[mif] for mif in component if mif in pad_mifs))
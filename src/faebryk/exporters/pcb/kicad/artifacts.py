@@ -1,19 +1,236 @@
 # This file is part of the faebryk project
 # SPDX-License-Identifier: MIT
 
+import hashlib
 import logging
+import os
+import shutil
 import subprocess as sp
 import tempfile
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextvars import ContextVar, copy_context
+from functools import cache
 from pathlib import Path
+from typing import Callable
 from zipfile import ZipFile
 
 from kicadcliwrapper.generated.kicad_cli import kicad_cli as k
+from kicadcliwrapper.generated.kicad_cli_l2 import kicad_cli_l2
+from kicadcliwrapper.lib import find_kicad_cli, make_command
+
+from faebryk.libs.util import NotNone
 
 logger = logging.getLogger(__name__)
 
 
+class _ExportJobs:
+    """
+    kicad-cli processes of one export pipeline, to kill them on abort.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._processes: set[sp.Popen] = set()
+        self.aborted = False
+
+    def register(self, process: sp.Popen):
+        with self._lock:
+            self._processes.add(process)
+            if self.aborted:
+                process.kill()
+
+    def unregister(self, process: sp.Popen):
+        with self._lock:
+            self._processes.discard(process)
+
+    def abort(self):
+        with self._lock:
+            self.aborted = True
+            for process in self._processes:
+                process.kill()
+
+
+_export_jobs: ContextVar[_ExportJobs | None] = ContextVar("_export_jobs", default=None)
+
+
+@cache
+def _kicad_cli(path_env: str | None) -> str:
+    return find_kicad_cli()
+
+
 def _export(cmd):
-    return k(k.pcb(k.pcb.export(cmd))).exec()
+    """
+    Run kicad-cli, streaming its output to the log.
+    Raises CalledProcessError like the kicadcliwrapper.
+    """
+    command = make_command(kicad_cli_l2, k(k.pcb(k.pcb.export(cmd))))
+    cli = _kicad_cli(os.environ.get("PATH"))
+    name = f"kicad-cli {' '.join(command[1:3])}"
+
+    jobs = _export_jobs.get()
+    process = sp.Popen(
+        [cli, *command[1:]],
+        stdout=sp.PIPE,
+        stderr=sp.STDOUT,
+        text=True,
+    )
+    if jobs is not None:
+        jobs.register(process)
+
+    output = []
+    try:
+        assert process.stdout is not None
+        for line in process.stdout:
+            output.append(line)
+            logger.debug(f"{name}: {line.rstrip()}")
+        returncode = process.wait()
+    finally:
+        if jobs is not None:
+            jobs.unregister(process)
+
+    if returncode != 0:
+        raise sp.CalledProcessError(returncode, command, "".join(output))
+    return "".join(output)
+
+
+def run_exports(exports: dict[str, Callable[[], None]], jobs: int | None = None):
+    """
+    Run independent exports concurrently with up to jobs at a time
+    (default: all at once).
+    The first failure kills the running kicad-cli processes and skips the
+    remaining exports.
+
+    Raises:
+        ExceptionGroup: with the errors of all failed exports
+    """
+    if not exports:
+        return
+
+    export_jobs = _ExportJobs()
+
+    def _run(name: str, export: Callable[[], None]):
+        if export_jobs.aborted:
+            return
+        _export_jobs.set(export_jobs)
+        logger.info(f"Exporting {name}")
+        export()
+        logger.info(f"Exported {name}")
+
+    with ThreadPoolExecutor(max_workers=jobs or len(exports)) as pool:
+        futures = {
+            pool.submit(copy_context().run, _run, name, export): name
+            for name, export in exports.items()
+        }
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        first_failed = {f for f in done if f.exception() is not None}
+        if first_failed:
+            export_jobs.abort()
+        wait(futures)
+
+    # exports killed by the abort fail as well, only report actual causes
+    failed = [
+        f
+        for f in futures
+        if (e := f.exception()) is not None and (f in first_failed or not _killed(e))
+    ]
+    if failed:
+        raise ExceptionGroup(
+            f"Failed exports: {[futures[f] for f in failed]}",
+            [NotNone(f.exception()) for f in failed],
+        )
+
+
+def _killed(e: BaseException | None) -> bool:
+    while e is not None:
+        if isinstance(e, sp.CalledProcessError) and e.returncode < 0:
+            return True
+        e = e.__cause__
+    return False
+
+
+class ArtifactCache:
+    """
+    Local store of export outputs, keyed by a hash of the pcb file content,
+    the exporter, the output file name, its parameters and the kicad-cli version.
+
+    Inputs outside the pcb file (e.g. 3D models) are not part of the key,
+    clear the cache directory when they change.
+    """
+
+    # bump when the exporters change their kicad-cli options
+    VERSION = 1
+
+    def __init__(self, cache_dir: Path) -> None:
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._digests: dict[Path, tuple[tuple[int, int], str]] = {}
+
+    def _file_digest(self, path: Path) -> str:
+        path = path.resolve()
+        st = path.stat()
+        stamp = st.st_mtime_ns, st.st_size
+        with self._lock:
+            if (cached := self._digests.get(path)) and cached[0] == stamp:
+                return cached[1]
+        with path.open("rb") as f:
+            digest = hashlib.file_digest(f, "sha256").hexdigest()
+        with self._lock:
+            self._digests[path] = stamp, digest
+        return digest
+
+    def key(self, export: Callable, pcb_file: Path, out_name: str, **params) -> str:
+        return hashlib.sha256(
+            repr(
+                (
+                    self.VERSION,
+                    _kicad_cli_version(os.environ.get("PATH")),
+                    export.__name__,
+                    self._file_digest(pcb_file),
+                    out_name,
+                    sorted(params.items()),
+                )
+            ).encode()
+        ).hexdigest()
+
+    def export(
+        self,
+        export: Callable[..., None],
+        pcb_file: Path,
+        out_file: Path,
+        **params,
+    ) -> bool:
+        """
+        export(pcb_file, out_file, **params) unless a cached output exists.
+
+        Returns:
+            True if restored from the cache
+        """
+        key = self.key(export, pcb_file, out_file.name, **params)
+        entry = self.cache_dir / key / out_file.name
+
+        if entry.is_file():
+            logger.info(f"Restoring {out_file.name} from artifact cache")
+            out_file.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(entry, out_file)
+            return True
+
+        export(pcb_file, out_file, **params)
+
+        # concurrent stores of the same key race, first one wins
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(dir=self.cache_dir))
+        shutil.copyfile(out_file, tmp / out_file.name)
+        try:
+            tmp.rename(self.cache_dir / key)
+        except OSError:
+            shutil.rmtree(tmp)
+        return False
+
+
+@cache
+def _kicad_cli_version(path_env: str | None) -> str:
+    return sp.check_output([_kicad_cli(path_env), "--version"], text=True).strip()
 
 
 def export_step(pcb_file: Path, step_file: Path) -> None:
@@ -2,15 +2,17 @@
 # SPDX-License-Identifier: MIT
 
 import logging
+import math
 import pprint
 import re
 import uuid
 from abc import abstractmethod
 from dataclasses import fields
-from itertools import pairwise
-from typing import Any, Callable, Iterable, List, Sequence, TypeVar
+from itertools import chain, pairwise
+from typing import Any, Callable, Iterable, List, Mapping, Sequence, TypeVar
 
 import numpy as np
+from sexpdata import Symbol
 from shapely import Polygon
 from typing_extensions import deprecated
 
@@ -20,12 +22,12 @@ from faebryk.core.module import Module
 from faebryk.core.moduleinterface import ModuleInterface
 from faebryk.core.node import Node
 from faebryk.libs.geometry.basic import Geometry
+from faebryk.libs.geometry.spatial import BBox, SpatialIndex
 from faebryk.libs.kicad.fileformats import (
     UUID,
     C_arc,
     C_circle,
     C_effects,
-    C_footprint,
     C_fp_text,
     C_kicad_pcb_file,
     C_line,
@@ -39,8 +41,13 @@ from faebryk.libs.kicad.fileformats import (
     C_xyr,
     C_xyz,
 )
-from faebryk.libs.sexp.dataclass_sexp import dataclass_dfs
-from faebryk.libs.util import cast_assert, find, get_key
+from faebryk.libs.sexp.dataclass_sexp import LazyList
+from faebryk.libs.util import (
+    KeyErrorAmbiguous,
+    KeyErrorNotFound,
+    cast_assert,
+    find,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -68,6 +75,8 @@ Geom = C_line | C_arc | C_rect | C_circle
 Point = Geometry.Point
 Point2D = Geometry.Point2D
 
+_UUID_SYMBOL = Symbol("uuid")
+
 
 def gen_uuid(mark: str = "") -> UUID:
     # format: d864cebe-263c-4d3f-bbd6-bb51c6d2a608
@@ -154,6 +163,75 @@ def get_all_geos(obj: PCB | Footprint) -> list[Geom]:
     return [geo for geos in candidates for geo in geos]
 
 
+# front <-> back layer names, filled on first use of a layer
+_LAYER_FLIP: dict[str, str] = {}
+
+
+def flip_layer(layer: str) -> str:
+    try:
+        return _LAYER_FLIP[layer]
+    except KeyError:
+        flipped = layer.replace("F.", "<F>.").replace("B.", "F.").replace("<F>.", "B.")
+        _LAYER_FLIP[layer] = flipped
+        return flipped
+
+
+def _geo_points(geo: Geom) -> list[Point2D]:
+    if isinstance(geo, C_circle):
+        x, y = coord_to_point2d(geo.center)
+        r = Geometry.distance_euclid((x, y), coord_to_point2d(geo.end))
+        return [(x - r, y - r), (x + r, y - r), (x + r, y + r), (x - r, y + r)]
+    if isinstance(geo, C_rect):
+        return Geometry.rect_to_polygon(
+            (coord_to_point2d(geo.start), coord_to_point2d(geo.end))
+        )
+    if isinstance(geo, C_arc):
+        # TODO: bulge of the arc beyond start/mid/end is ignored
+        return [coord_to_point2d(c) for c in (geo.start, geo.mid, geo.end)]
+    return [coord_to_point2d(geo.start), coord_to_point2d(geo.end)]
+
+
+def get_pad_bbox(fp: Footprint, pad: Pad) -> BBox:
+    x, y = (float(c) for c in abs_pos(fp.at, pad.at)[:2])
+    w, h = pad.size.w, pad.size.h or pad.size.w
+    # pad rotation in a pcb is absolute
+    theta = math.radians(pad.at.r)
+    c, s = abs(math.cos(theta)), abs(math.sin(theta))
+    dx, dy = (w * c + h * s) / 2, (w * s + h * c) / 2
+    return (x - dx, y - dy), (x + dx, y + dy)
+
+
+def get_fp_bbox(fp: Footprint) -> BBox:
+    """
+    Courtyard bbox, falls back to the pads if the footprint has no courtyard.
+    """
+    origin = coord_to_point(fp.at)
+    points = [
+        Geometry.as2d(Geometry.abs_pos(origin, p))
+        for geo in get_all_geos(fp)
+        if geo.layer.endswith(".CrtYd")
+        for p in _geo_points(geo)
+    ]
+    if not points:
+        points = [p for pad in fp.pads for p in get_pad_bbox(fp, pad)]
+    if not points:
+        points = [coord_to_point2d(fp.at)]
+    return Geometry.bbox(points)
+
+
+def get_copper_bbox(obj: "PCB.C_segment | Via") -> BBox:
+    if isinstance(obj, Via):
+        return Geometry.bbox([coord_to_point2d(obj.at)], tolerance=obj.size.w / 2)
+    points = [obj.start, obj.end]
+    if isinstance(obj, PCB.C_arc_segment):
+        points.append(obj.mid)
+    return Geometry.bbox([coord_to_point2d(p) for p in points], tolerance=obj.width / 2)
+
+
+# pads (with their footprint) and vias of a net
+type NetObjs = tuple[list[tuple[Pad, Footprint]], list[Via]]
+
+
 class PCB_Transformer:
     class has_linked_kicad_footprint(Module.TraitT):
         """
@@ -217,13 +295,128 @@ class PCB_Transformer:
         )
         self.font = FONT
 
+        # Indexes, kept consistent by insert_*/_delete
+        self._nets: dict[str, Net] = {}
+        self._footprints: dict[tuple[str, str], Footprint] = {}
+        # keyed by id, dataclasses aren't hashable; values keep the key object
+        # alive, so ids can't be reused while cached
+        self._pads: dict[int, tuple[Footprint, dict[str, list[Pad]]]] = {}
+        self._marked: dict[UUID, Any] = {}
+        # pcb footprints don't follow the type name -> field name scheme
+        self._list_fields: dict[tuple[type, str], str] = {(Footprint, ""): "footprints"}
+        self._spatial: SpatialIndex | None = None
+        self._pad_fp: dict[int, tuple[Pad, Footprint]] = {}
+        self._net_objs: dict[int, NetObjs] | None = None
+
         self.cleanup()
+        self.build_indexes()
         self.attach()
 
-    def attach(self):
-        footprints = {
+    def build_indexes(self):
+        """
+        (Re)build lookup indexes over the pcb.
+        Needed if the pcb was modified without going through the transformer.
+        """
+        self._nets = {pcb_net.name: pcb_net for pcb_net in self.pcb.nets}
+        self._footprints = {
             (f.propertys["Reference"].value, f.name): f for f in self.pcb.footprints
         }
+        self._pads = {}
+        self._net_objs = None
+        # built lazily, needs to decode all tracks
+        self._spatial = None
+
+    @property
+    def spatial(self) -> SpatialIndex:
+        """
+        Spatial index over pads, footprint courtyards, tracks and vias.
+        Kept up to date by move_fp, insert_track and insert_via.
+        """
+        if self._spatial is None:
+            self._spatial = SpatialIndex()
+            self._pad_fp = {}
+            for fp in self.pcb.footprints:
+                self._spatial_insert_fp(fp)
+            for obj in [*self.pcb.segments, *self.pcb.arcs, *self.pcb.vias]:
+                self._spatial.insert(obj, get_copper_bbox(obj))
+        return self._spatial
+
+    def _spatial_insert_fp(self, fp: Footprint):
+        assert self._spatial is not None
+        self._spatial.insert(fp, get_fp_bbox(fp))
+        for pad in fp.pads:
+            self._spatial.insert(pad, get_pad_bbox(fp, pad))
+            self._pad_fp[id(pad)] = pad, fp
+
+    def _spatial_insert_copper(self, obj: "PCB.C_segment | Via"):
+        if self._spatial is not None:
+            self._spatial.insert(obj, get_copper_bbox(obj))
+
+    def get_pad_footprint(self, pad: Pad) -> Footprint:
+        self.spatial
+        cached_pad, fp = self._pad_fp[id(pad)]
+        assert cached_pad is pad
+        return fp
+
+    def get_objs_in_rect[R](
+        self, rect: BBox, types: type[R] | tuple[type[R], ...], layer: str | None = None
+    ) -> list[R]:
+        """
+        Indexed objects of the given types whose bbox intersects rect.
+        layer: only copper on that layer (pads, tracks and vias)
+        """
+
+        def _filter(obj) -> bool:
+            if not isinstance(obj, types):
+                return False
+            if layer is None or isinstance(obj, Footprint):
+                return True
+            if isinstance(obj, (Pad, Via)):
+                return layer in obj.layers or layer in self.get_copper_layers_pad(obj)
+            return obj.layer == layer
+
+        return self.spatial.query_rect(rect, _filter)
+
+    def get_nearest_objs[R](
+        self, point: Point2D, types: type[R] | tuple[type[R], ...], k: int = 1
+    ) -> list[R]:
+        return self.spatial.nearest(point, k, lambda obj: isinstance(obj, types))
+
+    def _get_net_objs(self, net: int) -> NetObjs:
+        """
+        Pads (with their footprint) and vias of a net.
+        Only footprints and vias are looked at, lazy sections stay undecoded.
+        """
+        if self._net_objs is None:
+            self._net_objs = {}
+            for fp in self.pcb.footprints:
+                for pad in fp.pads:
+                    if pad.net is not None:
+                        self._net_objs.setdefault(pad.net.number, ([], []))[0].append(
+                            (pad, fp)
+                        )
+            for via in self.pcb.vias:
+                self._net_objs.setdefault(via.net, ([], []))[1].append(via)
+        return self._net_objs.get(net, ([], []))
+
+    def get_pads_by_name(self, fp: Footprint) -> dict[str, list[Pad]]:
+        if (cached := self._pads.get(id(fp))) is not None and cached[0] is fp:
+            return cached[1]
+
+        pads = {}
+        for pad in fp.pads:
+            pads.setdefault(pad.name, []).append(pad)
+        self._pads[id(fp)] = fp, pads
+        return pads
+
+    def get_marked(self, uuid: UUID) -> Any:
+        """
+        Get object inserted by this transformer by its uuid.
+        """
+        return self._marked[uuid]
+
+    def attach(self):
+        footprints = self._footprints
         from faebryk.core.util import get_all_nodes_with_trait
 
         for node, fpt in get_all_nodes_with_trait(self.graph, F.has_footprint):
@@ -249,12 +442,9 @@ class PCB_Transformer:
             node.add_trait(self.has_linked_kicad_footprint_defined(fp, self))
 
             pin_names = g_fp.get_trait(F.has_kicad_footprint).get_pin_names()
+            pads_by_name = self.get_pads_by_name(fp)
             for fpad in g_fp.get_children(direct_only=True, types=ModuleInterface):
-                pads = [
-                    pad
-                    for pad in fp.pads
-                    if pad.name == pin_names[cast_assert(FPad, fpad)]
-                ]
+                pads = pads_by_name.get(pin_names[cast_assert(FPad, fpad)], [])
                 fpad.add_trait(
                     PCB_Transformer.has_linked_kicad_pad_defined(fp, pads, self)
                 )
@@ -267,21 +457,31 @@ class PCB_Transformer:
         }
         logger.debug(f"Attached: {pprint.pformat(attached)}")
 
-    def cleanup(self):
-        # delete faebryk objects in pcb
-
-        # find all objects with path_len 2 (direct children of a list in pcb)
-        candidates = [o for o in dataclass_dfs(self.pcb) if len(o[1]) == 2]
-        for obj, path, _ in candidates:
-            if not self.is_marked(obj):
-                continue
+    def cleanup(self) -> int:
+        """
+        Delete faebryk objects (marked uuid) that are direct children of the
+        top-level containers of the pcb.
 
-            # delete object by removing it from the container they are in
-            holder = path[-1]
-            if isinstance(holder, list):
-                holder.remove(obj)
+        :return: number of deleted objects
+        """
+        removed = 0
+        for f in fields(self.pcb):
+            holder = getattr(self.pcb, f.name)
+            if isinstance(holder, LazyList) and not holder.is_materialized:
+                # no need to decode, check uuid in raw sexp
+                removed += holder.filter_raw(lambda raw: not self._is_marked_raw(raw))
+            elif isinstance(holder, list):
+                kept = [obj for obj in holder if not self.is_marked(obj)]
+                removed += len(holder) - len(kept)
+                holder[:] = kept
             elif isinstance(holder, dict):
-                del holder[get_key(obj, holder)]
+                marked = [k for k, obj in holder.items() if self.is_marked(obj)]
+                for k in marked:
+                    del holder[k]
+                removed += len(marked)
+
+        logger.debug(f"Cleanup: removed {removed} faebryk objects")
+        return removed
 
     @staticmethod
     def flipped[T](input_list: list[tuple[T, int]]) -> list[tuple[T, int]]:
@@ -297,14 +497,29 @@ class PCB_Transformer:
             return False
         return is_marked(obj.uuid, "FBRK")
 
+    @staticmethod
+    def _is_marked_raw(raw: list) -> bool:
+        for v in raw:
+            if (
+                isinstance(v, list)
+                and len(v) == 2
+                and v[0] == _UUID_SYMBOL
+                and isinstance(v[1], str)
+            ):
+                return is_marked(UUID(v[1]), "FBRK")
+        return False
+
     # Getter ---------------------------------------------------------------------------
     @staticmethod
     def get_fp(cmp) -> Footprint:
         return cmp.get_trait(PCB_Transformer.has_linked_kicad_footprint).get_fp()
 
     def get_net(self, net: FNet) -> Net:
-        nets = {pcb_net.name: pcb_net for pcb_net in self.pcb.nets}
-        return nets[net.get_trait(F.has_overriden_name).get_name()]
+        name = net.get_trait(F.has_overriden_name).get_name()
+        if name not in self._nets:
+            # nets might have been added to the pcb directly
+            self._nets = {pcb_net.name: pcb_net for pcb_net in self.pcb.nets}
+        return self._nets[name]
 
     def get_edge(self) -> list[Point2D]:
         def geo_to_lines(
@@ -402,10 +617,15 @@ class PCB_Transformer:
             lambda pad_and_name: intf.is_connected_to(pad_and_name[0].net) is not None,
         )[1]
 
-        fp = PCB_Transformer.get_fp(ffp)
-        pad = find(fp.pads, lambda p: p.name == pin_name)
+        t = ffp.get_trait(PCB_Transformer.has_linked_kicad_footprint)
+        fp = t.get_fp()
+        pads = t.get_transformer().get_pads_by_name(fp).get(pin_name, [])
+        if not pads:
+            raise KeyErrorNotFound()
+        if len(pads) != 1:
+            raise KeyErrorAmbiguous(pads)
 
-        return fp, pad
+        return fp, pads[0]
 
     @staticmethod
     def get_pad(intf: F.Electrical) -> tuple[Footprint, Pad, Node]:
@@ -515,55 +735,100 @@ class PCB_Transformer:
 
     def _get_pcb_list_field[R](self, node: R, prefix: str = "") -> list[R]:
         root = self.pcb
-        key = prefix + type(node).__name__.removeprefix("C_") + "s"
-
-        assert hasattr(root, key)
+        key = self._list_fields.get((type(node), prefix))
+        if key is None:
+            key = prefix + type(node).__name__.removeprefix("C_") + "s"
+            assert hasattr(root, key)
+            assert all(isinstance(x, type(node)) for x in getattr(root, key))
+            self._list_fields[(type(node), prefix)] = key
 
         target = getattr(root, key)
         assert isinstance(target, list)
-        assert all(isinstance(x, type(node)) for x in target)
         return target
 
+    def _index_insert(self, obj: Any):
+        if self.is_marked(obj):
+            self._marked[obj.uuid] = obj
+        if isinstance(obj, Footprint):
+            self._footprints[(obj.propertys["Reference"].value, obj.name)] = obj
+            self._pads.pop(id(obj), None)
+            if self._spatial is not None:
+                self._spatial_insert_fp(obj)
+            # rebuilt on demand
+            self._net_objs = None
+
+    def _index_delete(self, obj: Any):
+        if self.is_marked(obj) and self._marked.get(obj.uuid) is obj:
+            del self._marked[obj.uuid]
+        if self._spatial is not None:
+            self._spatial.discard(obj)
+        if isinstance(obj, Via) and self._net_objs is not None:
+            vias = self._net_objs.get(obj.net, ([], []))[1]
+            vias[:] = [v for v in vias if v is not obj]
+        if isinstance(obj, Footprint):
+            key = obj.propertys["Reference"].value, obj.name
+            if self._footprints.get(key) is obj:
+                del self._footprints[key]
+            self._pads.pop(id(obj), None)
+            for pad in obj.pads:
+                self._pad_fp.pop(id(pad), None)
+                if self._spatial is not None:
+                    self._spatial.discard(pad)
+            self._net_objs = None
+
     def _insert(self, obj: Any, prefix: str = ""):
         obj = PCB_Transformer.mark(obj)
         self._get_pcb_list_field(obj, prefix=prefix).append(obj)
+        self._index_insert(obj)
 
     def _delete(self, obj: Any, prefix: str = ""):
-        self._get_pcb_list_field(obj, prefix=prefix).remove(obj)
+        """
+        Remove obj from the pcb.
+        Matches by identity first, since dataclass equality is deep and slow,
+        then by equality like list.remove. Raises ValueError if not in the pcb.
+        """
+        target = self._get_pcb_list_field(obj, prefix=prefix)
+        idx = next((i for i, x in enumerate(target) if x is obj), None)
+        if idx is None:
+            idx = target.index(obj)
+        self._index_delete(target.pop(idx))
 
     def insert_via(
         self, coord: tuple[float, float], net: int, size_drill: tuple[float, float]
     ):
-        self.pcb.vias.append(
-            Via(
-                at=C_xy(*coord),
-                size=C_wh(size_drill[0], size_drill[0]),
-                drill=size_drill[1],
-                layers=["F.Cu", "B.Cu"],
-                net=net,
-                uuid=self.gen_uuid(mark=True),
-            )
+        via = Via(
+            at=C_xy(*coord),
+            size=C_wh(size_drill[0], size_drill[0]),
+            drill=size_drill[1],
+            layers=["F.Cu", "B.Cu"],
+            net=net,
+            uuid=self.gen_uuid(mark=True),
         )
+        self.pcb.vias.append(via)
+        self._index_insert(via)
+        self._spatial_insert_copper(via)
+        if self._net_objs is not None:
+            self._net_objs.setdefault(net, ([], []))[1].append(via)
 
     def insert_text(self, text: str, at: C_xyr, font: Font, front: bool = True):
-        self.pcb.gr_texts.append(
-            GR_Text(
-                text=text,
-                at=at,
-                layer=C_text_layer(f"{'F' if front else 'B'}.SilkS"),
-                effects=C_effects(
-                    font=font,
-                    justify=(
-                        C_effects.E_justify.center,
-                        C_effects.E_justify.center,
-                        C_effects.E_justify.mirror
-                        if not front
-                        else C_effects.E_justify.normal,
-                    ),
+        gr_text = GR_Text(
+            text=text,
+            at=at,
+            layer=C_text_layer(f"{'F' if front else 'B'}.SilkS"),
+            effects=C_effects(
+                font=font,
+                justify=(
+                    C_effects.E_justify.center,
+                    C_effects.E_justify.center,
+                    C_effects.E_justify.mirror
+                    if not front
+                    else C_effects.E_justify.normal,
                 ),
-                uuid=self.gen_uuid(mark=True),
-            )
+            ),
+            uuid=self.gen_uuid(mark=True),
         )
+        self.pcb.gr_texts.append(gr_text)
+        self._index_insert(gr_text)
 
     def insert_track(
         self,
@@ -577,29 +842,31 @@ class PCB_Transformer:
         if arc:
             start_and_ends = points_[::2]
             for s, e, m in zip(start_and_ends[:-1], start_and_ends[1:], points_[1::2]):
-                self.pcb.arcs.append(
-                    PCB.C_arc_segment(
-                        start=s,
-                        mid=m,
-                        end=e,
-                        width=width,
-                        layer=layer,
-                        net=net_id,
-                        uuid=self.gen_uuid(mark=True),
-                    )
+                arc_segment = PCB.C_arc_segment(
+                    start=s,
+                    mid=m,
+                    end=e,
+                    width=width,
+                    layer=layer,
+                    net=net_id,
+                    uuid=self.gen_uuid(mark=True),
                 )
+                self.pcb.arcs.append(arc_segment)
+                self._index_insert(arc_segment)
+                self._spatial_insert_copper(arc_segment)
         else:
             for s, e in zip(points_[:-1], points_[1:]):
-                self.pcb.segments.append(
-                    PCB.C_segment(
-                        start=s,
-                        end=e,
-                        width=width,
-                        layer=layer,
-                        net=net_id,
-                        uuid=self.gen_uuid(mark=True),
-                    )
+                segment = PCB.C_segment(
+                    start=s,
+                    end=e,
+                    width=width,
+                    layer=layer,
+                    net=net_id,
+                    uuid=self.gen_uuid(mark=True),
                 )
+                self.pcb.segments.append(segment)
+                self._index_insert(segment)
+                self._spatial_insert_copper(segment)
 
     def insert_line(self, start: C_xy, end: C_xy, width: float, layer: str):
         self.insert_geo(
@@ -619,17 +886,10 @@ class PCB_Transformer:
         self._delete(geo, prefix="gr_")
 
     def get_net_obj_bbox(self, net: Net, layer: str, tolerance=0.0):
-        vias = self.pcb.vias
-        pads = [(pad, fp) for fp in self.pcb.footprints for pad in fp.pads]
-
-        net_vias = [via for via in vias if via.net == net.number]
-        net_pads = [
-            (pad, fp)
-            for pad, fp in pads
-            if pad.net == net.number and layer in pad.layers
-        ]
-        coords: list[Point2D] = [coord_to_point2d(via.at) for via in net_vias] + [
-            abs_pos2d(fp.at, pad.at) for pad, fp in net_pads
+        pads, vias = self._get_net_objs(net.number)
+
+        coords: list[Point2D] = [coord_to_point2d(via.at) for via in vias] + [
+            abs_pos2d(fp.at, pad.at) for pad, fp in pads if layer in pad.layers
         ]
 
         # TODO ugly, better get pcb boundaries
@@ -653,47 +913,51 @@ class PCB_Transformer:
                 logger.warning(f"Zone already exists in {layer=}")
                 return
 
-        self.pcb.zones.append(
-            Zone(
-                net=net.number,
-                net_name=net.name,
-                layer=layers[0] if len(layers) == 1 else None,
-                layers=layers if len(layers) > 1 else None,
-                uuid=self.gen_uuid(mark=True),
-                name=f"layer_fill_{net.name}",
-                polygon=C_polygon(
-                    C_polygon.C_pts([point2d_to_coord(p) for p in polygon])
-                ),
-                min_thickness=0.2,
-                filled_areas_thickness=False,
-                fill=Zone.C_fill(
-                    enable=True,
-                    mode=None,
-                    hatch_thickness=0.25,
-                    hatch_gap=0.5,
-                    hatch_orientation=0,
-                    hatch_smoothing_level=0,
-                    hatch_smoothing_value=0,
-                    hatch_border_algorithm=Zone.C_fill.E_hatch_border_algorithm.hatch_thickness,
-                    hatch_min_hole_area=0.3,
-                    thermal_gap=0.2,
-                    thermal_bridge_width=0.2,
-                    smoothing=None,
-                    radius=1,
-                    island_removal_mode=Zone.C_fill.E_island_removal_mode.do_not_remove,
-                    island_area_min=10.0,
-                ),
-                locked=False,
-                hatch=Zone.C_hatch(mode=Zone.C_hatch.E_mode.edge, pitch=0.5),
-                priority=0,
-                connect_pads=Zone.C_connect_pads(
-                    mode=Zone.C_connect_pads.E_mode.thermal_reliefs, clearance=0.2
-                ),
-            )
+        zone = Zone(
+            net=net.number,
+            net_name=net.name,
+            layer=layers[0] if len(layers) == 1 else None,
+            layers=layers if len(layers) > 1 else None,
+            uuid=self.gen_uuid(mark=True),
+            name=f"layer_fill_{net.name}",
+            polygon=C_polygon(C_polygon.C_pts([point2d_to_coord(p) for p in polygon])),
+            min_thickness=0.2,
+            filled_areas_thickness=False,
+            fill=Zone.C_fill(
+                enable=True,
+                mode=None,
+                hatch_thickness=0.25,
+                hatch_gap=0.5,
+                hatch_orientation=0,
+                hatch_smoothing_level=0,
+                hatch_smoothing_value=0,
+                hatch_border_algorithm=Zone.C_fill.E_hatch_border_algorithm.hatch_thickness,
+                hatch_min_hole_area=0.3,
+                thermal_gap=0.2,
+                thermal_bridge_width=0.2,
+                smoothing=None,
+                radius=1,
+                island_removal_mode=Zone.C_fill.E_island_removal_mode.do_not_remove,
+                island_area_min=10.0,
+            ),
+            locked=False,
+            hatch=Zone.C_hatch(mode=Zone.C_hatch.E_mode.edge, pitch=0.5),
+            priority=0,
+            connect_pads=Zone.C_connect_pads(
+                mode=Zone.C_connect_pads.E_mode.thermal_reliefs, clearance=0.2
+            ),
         )
+        self.pcb.zones.append(zone)
+        self._index_insert(zone)
 
     # Positioning ----------------------------------------------------------------------
-    def move_footprints(self):
+    def move_footprints(
+        self, positions: Mapping[Node, F.has_pcb_position.Point] | None = None
+    ):
+        """
+        positions: absolute positions resolved beforehand (see resolve_positions),
+        nodes missing in it are looked up through their trait
+        """
         from faebryk.core.util import get_all_nodes_with_traits
 
         # position modules with defined positions
@@ -703,73 +967,84 @@ class PCB_Transformer:
 
         logger.info(f"Positioning {len(pos_mods)} footprints")
 
+        layer_name = {
+            F.has_pcb_position.layer_type.TOP_LAYER: "F.Cu",
+            F.has_pcb_position.layer_type.BOTTOM_LAYER: "B.Cu",
+        }
+
+        moves: list[tuple[Footprint, C_xyr, str]] = []
         for module, _ in pos_mods:
             fp = module.get_trait(self.has_linked_kicad_footprint).get_fp()
-            coord = module.get_trait(F.has_pcb_position).get_position()
-            layer_name = {
-                F.has_pcb_position.layer_type.TOP_LAYER: "F.Cu",
-                F.has_pcb_position.layer_type.BOTTOM_LAYER: "B.Cu",
-            }
+            coord = positions.get(module) if positions is not None else None
+            if coord is None:
+                coord = module.get_trait(F.has_pcb_position).get_position()
 
             if coord[3] == F.has_pcb_position.layer_type.NONE:
                 raise Exception(f"Component {module}({fp.name}) has no layer defined")
 
             logger.debug(f"Placing {fp.name} at {coord} layer {layer_name[coord[3]]}")
-            self.move_fp(fp, C_xyr(*coord[:3]), layer_name[coord[3]])
+            moves.append((fp, C_xyr(*coord[:3]), layer_name[coord[3]]))
+
+        self.move_fps(moves)
 
     def move_fp(self, fp: Footprint, coord: C_xyr, layer: str):
-        if any([x.text == "FBRK:notouch" for x in fp.fp_texts]):
-            logger.warning(f"Skipped no touch component: {fp.name}")
-            return
-
-        # Rotate
-        rot_angle = (coord.r - fp.at.r) % 360
-
-        if rot_angle:
-            # Rotation vector in kicad footprint objs not relative to footprint rotation
-            #  or is it?
-            for obj in fp.pads:
-                obj.at.r = (obj.at.r + rot_angle) % 360
-            # For some reason text rotates in the opposite direction
-            #  or maybe not?
-            for obj in fp.fp_texts + list(fp.propertys.values()):
-                obj.at.r = (obj.at.r + rot_angle) % 360
-
-        fp.at = coord
-
-        # Flip
-        flip = fp.layer != layer
-
-        if flip:
-
-            def _flip(x: str):
-                return x.replace("F.", "<F>.").replace("B.", "F.").replace("<F>.", "B.")
-
-            fp.layer = _flip(fp.layer)
-
-            # TODO: sometimes pads are being rotated by kicad ?!??
-            for obj in fp.pads:
-                obj.layers = [_flip(x) for x in obj.layers]
-
-            for obj in get_all_geos(fp) + fp.fp_texts + list(fp.propertys.values()):
-                if isinstance(obj, C_footprint.C_property):
-                    obj = obj.layer
-                if isinstance(obj, C_fp_text):
-                    obj = obj.layer
-                obj.layer = _flip(obj.layer)
-
-        # Label
-        if not any([x.text == "FBRK:autoplaced" for x in fp.fp_texts]):
-            fp.fp_texts.append(
-                C_fp_text(
-                    type=C_fp_text.E_type.user,
-                    text="FBRK:autoplaced",
-                    at=C_xyr(0, 0, rot_angle),
-                    effects=C_effects(self.font),
-                    uuid=self.gen_uuid(mark=True),
-                    layer=C_text_layer("User.5"),
+        self.move_fps([(fp, coord, layer)])
+
+    def move_fps(self, moves: Iterable[tuple[Footprint, C_xyr, str]]):
+        """
+        Move many footprints in one pass.
+        """
+        for fp, coord, layer in moves:
+            texts = {x.text for x in fp.fp_texts}
+            if "FBRK:notouch" in texts:
+                logger.warning(f"Skipped no touch component: {fp.name}")
+                continue
+
+            # Rotate
+            rot_angle = (coord.r - fp.at.r) % 360
+
+            if rot_angle:
+                # Rotation vector in kicad footprint objs not relative to footprint
+                #  rotation or is it?
+                # For some reason text rotates in the opposite direction
+                #  or maybe not?
+                for obj in chain(fp.pads, fp.fp_texts, fp.propertys.values()):
+                    obj.at.r = (obj.at.r + rot_angle) % 360
+
+            fp.at = coord
+
+            # Flip
+            if fp.layer != layer:
+                self._flip_fp(fp)
+
+            if self._spatial is not None:
+                self._spatial_insert_fp(fp)
+
+            # Label
+            if "FBRK:autoplaced" not in texts:
+                fp.fp_texts.append(
+                    C_fp_text(
+                        type=C_fp_text.E_type.user,
+                        text="FBRK:autoplaced",
+                        at=C_xyr(0, 0, rot_angle),
+                        effects=C_effects(self.font),
+                        uuid=self.gen_uuid(mark=True),
+                        layer=C_text_layer("User.5"),
+                    )
                 )
-            )
+
+    @staticmethod
+    def _flip_fp(fp: Footprint):
+        fp.layer = flip_layer(fp.layer)
+
+        # TODO: sometimes pads are being rotated by kicad ?!??
+        for obj in fp.pads:
+            obj.layers = [flip_layer(x) for x in obj.layers]
+
+        for obj in get_all_geos(fp):
+            obj.layer = flip_layer(obj.layer)
+        for obj in fp.fp_texts + list(fp.propertys.values()):
+            obj.layer.layer = flip_layer(obj.layer.layer)
 
     # Edge -----------------------------------------------------------------------------
     # TODO: make generic
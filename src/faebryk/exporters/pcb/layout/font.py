@@ -3,13 +3,11 @@
 
 import logging
 
-from rich.progress import track
-
 import faebryk.library._F as F
 from faebryk.core.node import Node
 from faebryk.exporters.pcb.layout.layout import Layout
 from faebryk.libs.font import Font
-from faebryk.libs.geometry.basic import get_distributed_points_in_polygon
+from faebryk.libs.geometry.basic import get_distributed_points_in_polygons
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +21,7 @@ class FontLayout(Layout):
         density: float,
         bbox: tuple[float, float] | None = None,
         scale_to_fit: bool = False,
+        workers: int | None = 1,
     ) -> None:
         """
         Create a layout that distributes nodes in a font
@@ -33,6 +32,7 @@ class FontLayout(Layout):
         :param density: The density of the distribution in nodes/point
         :param bbox: The bounding box to distribute the nodes in
         :param scale_to_fit: Whether to scale the font to fit the bounding box
+        :param workers: Processes to fill the glyphs with, None for cpu count
         """
         super().__init__()
 
@@ -44,9 +44,13 @@ class FontLayout(Layout):
         )
 
         logger.info(f"Finding points in polygons with density: {density}")
-        nodes = []
-        for p in track(polys, description="Finding points in polygons"):
-            nodes.extend(get_distributed_points_in_polygon(polygon=p, density=density))
+        nodes = [
+            n
+            for points in get_distributed_points_in_polygons(
+                polys, density=density, workers=workers
+            )
+            for n in points
+        ]
 
         logger.info(f"Creating {len(nodes)} nodes in polygons")
 
@@ -2,38 +2,72 @@
 TODO: Explain file
 """
 
+import heapq
 import logging
 import math
 import re
 from abc import ABC, abstractmethod
-from typing import Self
+from contextlib import contextmanager
+from enum import StrEnum, auto
+from functools import cached_property
+from typing import Callable, Iterable, Iterator, Self
 
-import graph_tool.all as gt
 import networkx as nx
 import numpy as np
 
+from faebryk.libs.util import ConfigFlagEnum
+
+try:
+    import graph_tool.all as gt
+except ImportError:
+    gt = None
+
 # logging settings
 logger = logging.getLogger(__name__)
 
 RESOLUTION = 0.1  # mm
 DIAGONALS = True
 WEIGHTS = (10, 15, 10000)
+# connect more than two nodes with a shared tree instead of a chain
+STEINER = True
+# numpy only pays off for larger A* heuristic batches (coords x targets)
+SCALAR_HEURISTIC_MAX = 16
+
+
+class GraphBackends(StrEnum):
+    GT = auto()
+    IMPLICIT = auto()
+
+
+GRAPH_BACKEND = ConfigFlagEnum(
+    GraphBackends, "ROUTING_GRAPH", GraphBackends.IMPLICIT, "Routing grid backend"
+)
 
 
 class GridException(Exception): ...
 
 
+class GridRouteException(GridException):
+    """
+    Net can't be routed on the current grid, e.g. its nodes are blocked
+    """
+
+
 class GridInvalidVertexException(GridException):
     def __init__(self, vertex_index: int, graph: "Graph") -> None:
         self.vertex_index = vertex_index
         self.graph = graph
         super().__init__(f"Invalid vertex: {vertex_index}")
 
+    # raised in routing workers too
+    def __reduce__(self):
+        return type(self), (self.vertex_index, self.graph)
+
     def get_coord(self, grid: "Grid"):
         return grid._project_out(self.vertex_index)
 
 
-class Coord[T: int, float](np.ndarray):
+class Coord[T: (int, float)](np.ndarray):
     EPS = 0.05
 
     def __new__(cls, x: T, y: T, z: T):
@@ -114,6 +148,8 @@ class Coord[T: int, float](np.ndarray):
 IntCoord = int
 intCoord = tuple[int, int, int]
 OutCoord = Coord[float]
+# branches of a routed net, each branch starts on one of the previous ones
+PathTree = list[list[IntCoord]]
 
 
 def sub(c1: intCoord, c2: intCoord):
@@ -149,12 +185,11 @@ class Graph[T](ABC):
         )
         return out
 
-    @staticmethod
-    @abstractmethod
-    def _lattice(dims: tuple[int, int], weight: int): ...
-
+    @classmethod
     @abstractmethod
-    def add_edges(self, edges: np.ndarray, weight: float): ...
+    def lattice(
+        cls, dims: tuple[int, int, int], diagonal: bool, layer: bool
+    ) -> Self: ...
 
     @abstractmethod
     def vertices(self) -> set[IntCoord]: ...
@@ -167,72 +202,70 @@ class Graph[T](ABC):
     ) -> Self: ...
 
     @abstractmethod
-    def neigh(self, vs: set[IntCoord], order: int, ring: bool) -> set[IntCoord]: ...
+    def subgraph_e(self, ex: set[tuple[IntCoord, IntCoord]] | np.ndarray) -> Self: ...
 
     @abstractmethod
-    def astar(self, start: IntCoord, end: IntCoord, h=None) -> list[IntCoord]: ...
+    def neigh(self, vs: set[IntCoord], order: int, ring: bool) -> set[IntCoord]: ...
 
     @abstractmethod
-    def stack(self): ...
-
-    def diagonal_edges_lattice(self):
-        dims = self.steps[:2]
-        # Create an array for all possible i, j combinations
-        i, j = np.meshgrid(range(dims[0] - 1), range(dims[1] - 1), indexing="ij")
-
-        # Create edge tuples for both diagonal directions
-        edges1 = np.stack((i, j, i + 1, j + 1), axis=-1).reshape(-1, 2, 2)
-        edges2 = np.stack((i + 1, j, i, j + 1), axis=-1).reshape(-1, 2, 2)
-
-        # Concatenate them together
-        edges = np.concatenate((edges1, edges2), axis=0)
-
-        e_i = (edges[..., 1] * dims[0] + edges[..., 0]).reshape(-1, 2)
-
-        return e_i
-
-    def layer_edges_lattice(self):
-        dims = self.steps
+    def astar(self, start: IntCoord, end: IntCoord, h=None) -> list[IntCoord]: ...
 
-        layer_node_count = dims[0] * dims[1]
-        left = np.arange(layer_node_count)
-        stacks = tuple(
-            np.stack(
-                [
-                    left + layer_node_count * z1,
-                    left + layer_node_count * z2,
-                ],
-                axis=-1,
-            )
-            for z1 in range(dims[2])
-            for z2 in range(dims[2])
-            if z1 > z2
+    def inter_layer_edges(
+        self, coords: set[IntCoord] | np.ndarray
+    ) -> set[tuple[IntCoord, IntCoord]]:
+        """
+        All edges between coords and the same x/y position on the other layers
+        """
+        coords_np = np.asarray(
+            coords if isinstance(coords, np.ndarray) else list(coords), dtype=np.int64
         )
-        out = np.concatenate(
-            stacks,
-            axis=0,
+        all_layers = np.stack(
+            [
+                (coords_np + self.project_into((0, 0, z)))
+                % (self.steps[0] * self.steps[1] * self.steps[2])
+                for z in range(self.steps[2])
+            ],
+            axis=-1,
         )
+        return {(abc[0], e) for abc in all_layers for e in abc[1:]}
 
-        return out
-
-    @classmethod
-    def lattice(cls, dims: tuple[int, int, int], diagonal: bool, layer: bool):
-        g = cls(cls._lattice(dims[:2], weight=WEIGHTS[0]), dims)
+    def subgraph_via(self, ex: set[IntCoord] | np.ndarray) -> Self:
+        """
+        Remove all inter-layer edges of ex
+        """
+        return self.subgraph_e(ex=self.inter_layer_edges(ex))
 
-        if diagonal:
-            # Add diagonals
-            logger.info("Building diagonals")
-            diagonals = g.diagonal_edges_lattice()
-            logging.info(f"Adding diagonals {len(diagonals)}")
-            g.add_edges(diagonals, weight=WEIGHTS[1])
+    def block(
+        self,
+        ex: set[IntCoord] | np.ndarray | None = None,
+        ex_via: set[IntCoord] | np.ndarray | None = None,
+    ) -> Self:
+        """
+        Permanently remove vertices ex and inter-layer edges of ex_via.
+        Might modify the graph in place.
+        """
+        out = self
+        if ex_via is not None and len(ex_via):
+            out = out.subgraph_via(ex_via)
+        return out.subgraph(ex=ex)
 
-        if layer and dims[2] > 1:
-            logger.info("Building layers")
-            g.stack()
-            layer_edges = g.layer_edges_lattice()
-            g.add_edges(layer_edges, weight=WEIGHTS[2])
+    @contextmanager
+    def overlay(
+        self,
+        ex: set[IntCoord] | np.ndarray | None = None,
+        ex_via: set[IntCoord] | np.ndarray | None = None,
+    ) -> Iterator[Self]:
+        """
+        Temporarily remove vertices ex and inter-layer edges of ex_via.
+        """
+        yield self.block(ex=ex, ex_via=ex_via)
 
-        return g
+    def copy(self) -> Self:
+        """
+        Copy that is safe to block
+        """
+        # views are not modified in place
+        return self
 
     def distance(self, a: IntCoord, b: IntCoord = 0) -> float:
         # if not ex.isdisjoint({a, b}):
@@ -246,7 +279,43 @@ class Graph[T](ABC):
         # logger.info(f"Distance({tuples}) = {out}")
         return out
 
-    def find_path(self, nodes: set[IntCoord], ex: set[IntCoord]) -> list[IntCoord]:
+    def distances(self, a: IntCoord, bs: np.ndarray) -> np.ndarray:
+        """
+        Vectorized distance from a to all bs
+        """
+        return np.linalg.norm(
+            np.stack(self.project_out(bs), axis=-1) - np.array(self.project_out(a)),
+            axis=-1,
+        )
+
+    def astar_multi(
+        self, sources: set[IntCoord], targets: set[IntCoord]
+    ) -> list[IntCoord]:
+        """
+        Path from any of sources to the closest of targets.
+        """
+        sources_np = np.fromiter(sources, dtype=np.int64, count=len(sources))
+        targets_np = np.fromiter(targets, dtype=np.int64, count=len(targets))
+        # pick closest pair, single-pair search only
+        dists = np.stack([self.distances(t, sources_np) for t in targets_np])
+        t, s = np.unravel_index(np.argmin(dists), dists.shape)
+        return self.astar(int(sources_np[s]), int(targets_np[t]), h=self.distance)
+
+    @staticmethod
+    def _check_path(out: list[IntCoord], ex: set[IntCoord] | np.ndarray):
+        if not out:
+            raise nx.NetworkXNoPath("No path found")
+
+        if isinstance(ex, np.ndarray):
+            crossed = np.isin(out, ex).any()
+        else:
+            crossed = not ex.isdisjoint(out)
+        if crossed:
+            raise nx.NetworkXNoPath("Crossed illegal domain")
+
+    def find_path(
+        self, nodes: set[IntCoord], ex: set[IntCoord] | np.ndarray
+    ) -> list[IntCoord]:
         logger.info(f"Find path for {[self.project_out(n) for n in nodes]}")
 
         def sub_path(start: IntCoord, end: IntCoord) -> list[IntCoord]:
@@ -258,11 +327,7 @@ class Graph[T](ABC):
                 end,
                 h=self.distance,
             )
-            if not out:
-                raise nx.NetworkXNoPath("No path found")
-
-            if not ex.isdisjoint(out):
-                raise nx.NetworkXNoPath("Crossed illegal domain")
+            self._check_path(out, ex)
 
             # logger.info(f"Found: {out}")
             return out
@@ -270,21 +335,50 @@ class Graph[T](ABC):
         if len(nodes) == 2:
             return sub_path(*nodes)
 
-        nodes_left = list(nodes)
-        cur = min(nodes_left, key=self.distance)
-        nodes_left.remove(cur)
+        nodes_left = np.fromiter(nodes, dtype=np.int64, count=len(nodes))
+        i = np.argmin(self.distances(0, nodes_left))
+        cur = int(nodes_left[i])
+        nodes_left = np.delete(nodes_left, i)
         path = [cur]
 
-        while nodes_left:
-            heur_pick = min(nodes_left, key=lambda x: self.distance(cur, x))
-            nodes_left.remove(heur_pick)
+        while len(nodes_left):
+            i = np.argmin(self.distances(cur, nodes_left))
+            heur_pick = int(nodes_left[i])
+            nodes_left = np.delete(nodes_left, i)
             path.extend(sub_path(cur, heur_pick)[1:])
             cur = heur_pick
 
         return path
 
+    def find_tree(
+        self, nodes: set[IntCoord], ex: set[IntCoord] | np.ndarray
+    ) -> PathTree:
+        """
+        Connect nodes by growing a tree from the node closest to the origin:
+        each branch is the shortest path from the tree to the closest node left.
+        """
+        if not STEINER or len(nodes) <= 2:
+            return [self.find_path(nodes, ex)]
+
+        logger.info(f"Find tree for {[self.project_out(n) for n in nodes]}")
+
+        nodes_np = np.fromiter(nodes, dtype=np.int64, count=len(nodes))
+        start = int(nodes_np[np.argmin(self.distances(0, nodes_np))])
+        tree = {start}
+        nodes_left = set(nodes) - tree
+        branches: PathTree = []
+
+        while nodes_left:
+            branch = self.astar_multi(tree, nodes_left)
+            self._check_path(branch, ex)
+            branches.append(branch)
+            tree.update(branch)
+            nodes_left.difference_update(branch)
 
-class GraphTool(Graph[gt.Graph]):
+        return branches
+
+
+class GraphTool(Graph["gt.Graph"]):
     def make_exception(self, e: ValueError) -> Exception:
         msg: str = e.args[0]
         m = re.match(r"^Invalid vertex index: ([0-9]*)$", msg)
@@ -321,6 +415,65 @@ class GraphTool(Graph[gt.Graph]):
         edges = np.hstack([edges, np.full((edges.shape[0], 1), weight)])
         self.G.add_edge_list(edges, eprops=[weights])
 
+    def diagonal_edges_lattice(self):
+        dims = self.steps[:2]
+        # Create an array for all possible i, j combinations
+        i, j = np.meshgrid(range(dims[0] - 1), range(dims[1] - 1), indexing="ij")
+
+        # Create edge tuples for both diagonal directions
+        edges1 = np.stack((i, j, i + 1, j + 1), axis=-1).reshape(-1, 2, 2)
+        edges2 = np.stack((i + 1, j, i, j + 1), axis=-1).reshape(-1, 2, 2)
+
+        # Concatenate them together
+        edges = np.concatenate((edges1, edges2), axis=0)
+
+        e_i = (edges[..., 1] * dims[0] + edges[..., 0]).reshape(-1, 2)
+
+        return e_i
+
+    def layer_edges_lattice(self):
+        dims = self.steps
+
+        layer_node_count = dims[0] * dims[1]
+        left = np.arange(layer_node_count)
+        stacks = tuple(
+            np.stack(
+                [
+                    left + layer_node_count * z1,
+                    left + layer_node_count * z2,
+                ],
+                axis=-1,
+            )
+            for z1 in range(dims[2])
+            for z2 in range(dims[2])
+            if z1 > z2
+        )
+        out = np.concatenate(
+            stacks,
+            axis=0,
+        )
+
+        return out
+
+    @classmethod
+    def lattice(cls, dims: tuple[int, int, int], diagonal: bool, layer: bool):
+        g = cls(cls._lattice(dims[:2], weight=WEIGHTS[0]), dims)
+
+        if diagonal:
+            # Add diagonals
+            logger.info("Building diagonals")
+            diagonals = g.diagonal_edges_lattice()
+            logging.info(f"Adding diagonals {len(diagonals)}")
+            g.add_edges(diagonals, weight=WEIGHTS[1])
+
+        if layer and dims[2] > 1:
+            logger.info("Building layers")
+            g.stack()
+            layer_edges = g.layer_edges_lattice()
+            g.add_edges(layer_edges, weight=WEIGHTS[2])
+
+        return g
+
     def vertices(self):
         return set(self.G.vertex_index[v] for v in self.G.vertices())
 
@@ -443,7 +596,378 @@ class GraphTool(Graph[gt.Graph]):
 #        )
 
 
-GRAPH = GraphTool
+class GraphImplicit(Graph[np.ndarray]):
+    """
+    Lattice that is never materialized.
+
+    G is a bitmap with one entry per grid vertex (False = removed).
+    Edges are derived arithmetically from the vertex index:
+    orthogonal & diagonal neighbours within a layer and all-pairs layer edges,
+    weighted like the lattice built by GraphTool.
+    no_via marks vertices without inter-layer edges.
+    Other removed edges are kept as a set of keys (see _edge_key).
+
+    Both bitmaps are numpy views on bytearrays, so block/overlay can update
+    them in place while the search loop indexes the raw bytes.
+    """
+
+    def __init__(
+        self,
+        G: np.ndarray,
+        steps,
+        diagonal: bool = DIAGONALS,
+        layer: bool = True,
+        removed_edges: frozenset[int] = frozenset(),
+        no_via: np.ndarray | None = None,
+    ):
+        # plain ints, numpy scalars are slow in the search loop
+        steps = tuple(map(int, steps))
+        self._mask = bytearray(np.asarray(G, dtype=bool).tobytes())
+        super().__init__(np.frombuffer(self._mask, dtype=bool), steps)
+        self._via_mask = bytearray(
+            np.asarray(no_via, dtype=bool).tobytes()
+            if no_via is not None
+            else math.prod(steps)
+        )
+        self.no_via = np.frombuffer(self._via_mask, dtype=bool)
+        self.diagonal = diagonal
+        self.layer = layer and steps[2] > 1
+        self.removed_edges = removed_edges
+
+    def __reduce__(self):
+        # the numpy views have to be rebuilt on top of new bytearrays
+        return (
+            type(self),
+            (
+                self.G,
+                self.steps,
+                self.diagonal,
+                self.layer,
+                self.removed_edges,
+                self.no_via,
+            ),
+        )
+
+    def copy(self):
+        return self._derive()
+
+    def _derive(
+        self,
+        G: np.ndarray | None = None,
+        removed_edges=None,
+        no_via: np.ndarray | None = None,
+    ) -> Self:
+        return type(self)(
+            self.G if G is None else G,
+            self.steps,
+            diagonal=self.diagonal,
+            layer=self.layer,
+            removed_edges=(
+                self.removed_edges if removed_edges is None else removed_edges
+            ),
+            no_via=self.no_via if no_via is None else no_via,
+        )
+
+    @classmethod
+    def lattice(cls, dims: tuple[int, int, int], diagonal: bool, layer: bool):
+        return cls(
+            np.ones(math.prod(dims), dtype=bool), dims, diagonal=diagonal, layer=layer
+        )
+
+    @cached_property
+    def size(self) -> int:
+        return self.steps[0] * self.steps[1] * self.steps[2]
+
+    @cached_property
+    def _planar_moves(self) -> list[tuple[int, int, int, int]]:
+        """
+        (dx, dy, index offset, weight) of all in-layer edges
+        """
+        moves = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+        diagonals = [(1, 1), (-1, -1), (1, -1), (-1, 1)] if self.diagonal else []
+        return [
+            (dx, dy, dx + dy * self.steps[0], weight)
+            for weight, ms in ((WEIGHTS[0], moves), (WEIGHTS[1], diagonals))
+            for dx, dy in ms
+        ]
+
+    @cached_property
+    def _removed_np(self) -> np.ndarray:
+        return np.fromiter(self.removed_edges, dtype=np.int64)
+
+    def _edge_key(self, a, b):
+        return np.minimum(a, b) * self.size + np.maximum(a, b)
+
+    def vertices(self):
+        return set(np.flatnonzero(self.G).tolist())
+
+    @staticmethod
+    def _conv(set_or_array: set[IntCoord] | np.ndarray | None) -> np.ndarray:
+        if set_or_array is None:
+            return np.empty(0, dtype=np.int64)
+        if isinstance(set_or_array, np.ndarray):
+            return set_or_array
+        return np.fromiter(set_or_array, dtype=np.int64, count=len(set_or_array))
+
+    def subgraph(
+        self,
+        ex: set[IntCoord] | np.ndarray | None = None,
+        inc: set[IntCoord] | np.ndarray | None = None,
+    ):
+        ex_used = ex is not None and len(ex) > 0
+        inc_used = inc is not None and len(inc) > 0
+        if not ex_used and not inc_used:
+            return self
+
+        if inc_used:
+            keep = np.zeros_like(self.G)
+            keep[self._conv(inc)] = True
+            keep &= self.G
+        else:
+            keep = self.G.copy()
+
+        if ex_used:
+            keep[self._conv(ex)] = False
+
+        return self._derive(G=keep)
+
+    def subgraph_via(self, ex: set[IntCoord] | np.ndarray):
+        if len(ex) == 0:
+            return self
+
+        no_via = self.no_via.copy()
+        no_via[self._conv(ex)] = True
+        return self._derive(no_via=no_via)
+
+    def block(
+        self,
+        ex: set[IntCoord] | np.ndarray | None = None,
+        ex_via: set[IntCoord] | np.ndarray | None = None,
+    ):
+        self.G[self._conv(ex)] = False
+        self.no_via[self._conv(ex_via)] = True
+        return self
+
+    @contextmanager
+    def overlay(
+        self,
+        ex: set[IntCoord] | np.ndarray | None = None,
+        ex_via: set[IntCoord] | np.ndarray | None = None,
+    ):
+        ex_np, ex_via_np = self._conv(ex), self._conv(ex_via)
+        saved, saved_via = self.G[ex_np], self.no_via[ex_via_np]
+        self.block(ex=ex_np, ex_via=ex_via_np)
+        try:
+            yield self
+        finally:
+            self.G[ex_np] = saved
+            self.no_via[ex_via_np] = saved_via
+
+    def subgraph_e(self, ex: set[tuple[IntCoord, IntCoord]] | np.ndarray):
+        if len(ex) == 0:
+            return self
+
+        edges = np.asarray(ex if isinstance(ex, np.ndarray) else list(ex))
+        keys = self._edge_key(edges[:, 0], edges[:, 1])
+        return self._derive(removed_edges=self.removed_edges | set(keys.tolist()))
+
+    def _neigh_edges(self, vs: np.ndarray, ring: bool):
+        """
+        All edges (vs, neighbour) of the graph starting in vs
+        """
+        vs = vs[self.G[vs]]
+        x, y, z = self.project_out(vs)
+        srcs, dsts = [], []
+
+        for dx, dy, dv, _ in self._planar_moves:
+            m = (x + dx >= 0) & (x + dx < self.steps[0])
+            m &= (y + dy >= 0) & (y + dy < self.steps[1])
+            srcs.append(vs[m])
+            dsts.append(vs[m] + dv)
+
+        if not ring and self.layer:
+            layer_size = self.steps[0] * self.steps[1]
+            vs_via = vs[~self.no_via[vs]]
+            for dz in range(1, self.steps[2]):
+                dst = (vs_via + dz * layer_size) % self.size
+                srcs.append(vs_via[~self.no_via[dst]])
+                dsts.append(dst[~self.no_via[dst]])
+
+        src, dst = np.concatenate(srcs), np.concatenate(dsts)
+        m = self.G[dst]
+        if self.removed_edges:
+            m &= ~np.isin(self._edge_key(src, dst), self._removed_np)
+
+        return src[m], dst[m]
+
+    def neigh(self, vs: set[IntCoord], order: int, ring: bool):
+        """
+        if ring is true only look in for neighbours with same z coordinate
+        """
+
+        if order == 0:
+            return vs
+
+        _, dst = self._neigh_edges(
+            np.fromiter(vs, dtype=np.int64, count=len(vs)), ring=ring
+        )
+        return self.neigh(set(dst.tolist()), order=order - 1, ring=ring)
+
+    def astar(self, start: IntCoord, end: IntCoord, h=None) -> list[IntCoord]:
+        """
+        A* over the implicit lattice.
+        h is ignored in favour of the octile distance matching the edge weights.
+        """
+        return self.astar_multi({start}, {end})
+
+    def _heuristics(self, targets: np.ndarray) -> Callable[[list, list, list], list]:
+        """
+        Octile distance matching the edge weights to the closest target.
+        Takes and returns columns of coordinates, so the multi-target case can be
+        evaluated on the precomputed target arrays in one go.
+        """
+        w_orth, w_diag, w_layer = WEIGHTS
+        # cost delta of replacing two orthogonal steps with a diagonal one
+        w_diag_gain = min(0, w_diag - 2 * w_orth) if self.diagonal else 0
+        tx, ty, tz = self.project_out(targets)
+
+        ts = list(zip(tx.tolist(), ty.tolist(), tz.tolist()))
+
+        def heuristics_np(xs: list, ys: list, zs: list) -> list:
+            dx = np.abs(np.asarray(xs)[:, None] - tx)
+            dy = np.abs(np.asarray(ys)[:, None] - ty)
+            h = (
+                w_orth * (dx + dy)
+                + w_diag_gain * np.minimum(dx, dy)
+                + w_layer * (np.asarray(zs)[:, None] != tz)
+            )
+            return h.min(axis=1).tolist()
+
+        def heuristics(xs: list, ys: list, zs: list) -> list:
+            if len(xs) * len(ts) > SCALAR_HEURISTIC_MAX:
+                return heuristics_np(xs, ys, zs)
+
+            out = []
+            for x, y, z in zip(xs, ys, zs):
+                best = math.inf
+                for ex, ey, ez in ts:
+                    dx, dy = abs(x - ex), abs(y - ey)
+                    h = (
+                        w_orth * (dx + dy)
+                        + w_diag_gain * min(dx, dy)
+                        + (w_layer if z != ez else 0)
+                    )
+                    if h < best:
+                        best = h
+                out.append(best)
+            return out
+
+        return heuristics
+
+    def astar_multi(
+        self, sources: set[IntCoord], targets: set[IntCoord]
+    ) -> list[IntCoord]:
+        """
+        Multi-source A* from any of sources to the closest of targets.
+        """
+        mask, via_mask = self._mask, self._via_mask
+        size = self.size
+        for v in (*sources, *targets):
+            if not 0 <= v < size or not mask[v]:
+                raise GridInvalidVertexException(v, self)
+
+        sx, sy, sz = self.steps
+        layer_size = sx * sy
+        w_layer = WEIGHTS[2]
+        planar = self._planar_moves
+        layers = range(sz) if self.layer else ()
+        removed = self.removed_edges
+        heuristics = self._heuristics(
+            np.fromiter(targets, dtype=np.int64, count=len(targets))
+        )
+
+        g_score = dict.fromkeys(sources, 0)
+        came_from: dict[IntCoord, IntCoord] = {}
+        closed: set[IntCoord] = set()
+        # (f, -g, v): prefer deeper nodes on ties
+        open_heap = [
+            (h, 0, v) for v, h in zip(sources, heuristics(*self._columns(sources)))
+        ]
+        heapq.heapify(open_heap)
+
+        while open_heap:
+            _, neg_g, v = heapq.heappop(open_heap)
+            if v in closed:
+                continue
+            if v in targets:
+                path = [v]
+                while v in came_from:
+                    v = came_from[v]
+                    path.append(v)
+                return path[::-1]
+            closed.add(v)
+
+            g = -neg_g
+            z, rem = divmod(v, layer_size)
+            y, x = divmod(rem, sx)
+
+            candidates = [
+                (x + dx, y + dy, z, v + dv, w)
+                for dx, dy, dv, w in planar
+                if 0 <= x + dx < sx and 0 <= y + dy < sy
+            ]
+            if not via_mask[v]:
+                candidates.extend(
+                    (x, y, z2, n, w_layer)
+                    for z2 in layers
+                    if z2 != z and not via_mask[n := rem + z2 * layer_size]
+                )
+
+            pushed = []
+            for nx_, ny_, nz_, n, w in candidates:
+                if not mask[n] or n in closed:
+                    continue
+                if removed and min(v, n) * size + max(v, n) in removed:
+                    continue
+                ng = g + w
+                if ng >= g_score.get(n, math.inf):
+                    continue
+                g_score[n] = ng
+                came_from[n] = v
+                pushed.append((nx_, ny_, nz_, n, ng))
+
+            if not pushed:
+                continue
+            xs, ys, zs, ns, ngs = zip(*pushed)
+            for n, ng, h in zip(ns, ngs, heuristics(xs, ys, zs)):
+                heapq.heappush(open_heap, (ng + h, -ng, n))
+
+        return []
+
+    def _columns(self, vs: Iterable[IntCoord]) -> tuple[list, list, list]:
+        x, y, z = self.project_out(np.fromiter(vs, dtype=np.int64))
+        return x.tolist(), y.tolist(), z.tolist()
+
+
+GRAPH: type[Graph] = GraphTool if GRAPH_BACKEND == GraphBackends.GT else GraphImplicit
+
+
+def _as_coords(coords: Iterable[OutCoord] | np.ndarray | None) -> np.ndarray:
+    if coords is None:
+        return np.empty((0, 3))
+    if isinstance(coords, np.ndarray) and coords.ndim == 2:
+        return coords
+    return np.asarray(list(coords), dtype=float).reshape(-1, 3)
+
+
+def _as_rects(
+    rects: Iterable[tuple[OutCoord, OutCoord]] | np.ndarray | None,
+) -> np.ndarray:
+    if rects is None:
+        return np.empty((0, 2, 3))
+    if isinstance(rects, np.ndarray):
+        return rects.reshape(-1, 2, 3)
+    return np.asarray(list(rects), dtype=float).reshape(-1, 2, 3)
 
 
 class Grid:
@@ -460,7 +984,14 @@ class Grid:
 
         steps = math.ceil((self.rect[1] - self.rect[0]) / self.resolution) + 1
         self.steps = steps
+        # plain arrays for the batched projections
+        self._origin = np.asarray(self.rect[0], dtype=float)
+        self._res = np.asarray(self.resolution, dtype=float)
+        self._steps = np.asarray(steps, dtype=np.int64)
+        self._strides = np.array([1, steps[0], steps[0] * steps[1]], dtype=np.int64)
         self.used: set[IntCoord] = set()
+        # used paths & their ring neighbourhood, updated on every commit
+        self.used_mask = np.zeros(math.prod(steps), dtype=bool)
 
         logger.info(f"Building {steps} grid for Rect {rect}")
 
@@ -471,15 +1002,12 @@ class Grid:
         )
 
         logger.info(f"Adding {len(inclusion_poly or [])} inclusion zones to grid")
-        if inclusion_poly and len(inclusion_poly) == 1:
-            inc = self._project_poly_into(inclusion_poly[0])
-        else:
-            inc = {
-                coord
-                for poly in inclusion_poly or []
-                for coord in self._project_poly_into(poly)
-            }
-        self.G = self.G.subgraph(inc=inc)
+        inc = np.concatenate(
+            [self._project_poly_into(poly) for poly in inclusion_poly or []]
+            or [np.empty(0, dtype=np.int64)]
+        )
+        self.G = self.G.subgraph(inc=np.unique(inc))
+        self._G_base = self.G.copy()
 
     def _project_out(self, coord: IntCoord) -> OutCoord:
         out_t = self.G.project_out(coord)
@@ -502,23 +1030,79 @@ class Grid:
         return out
 
     def _project_rect_into(self, rect: tuple[OutCoord, OutCoord]) -> list[IntCoord]:
-        out = []
-        TOLERANCE = 1
-        # tolerance = OutCoord(TOLERANCE, TOLERANCE, 0)
+        out = self._project_rects_into_np(np.asarray([rect], dtype=float)).tolist()
+
+        assert out
+        return out
 
-        qrect = tuple(self._project_into_tuple(r) for r in rect)
+    # Batched projections -------------------------------------------------------
+    def _project_into_tuple_np(self, coords: np.ndarray) -> np.ndarray:
+        """
+        (N, 3) float coords -> (N, 3) int grid coords
+        """
+        return np.rint((coords - self._origin) / self._res).astype(np.int64)
 
-        qrect_dim = sub(qrect[1], qrect[0])
+    def _project_into_np(self, coords: np.ndarray) -> np.ndarray:
+        """
+        (N, 3) float coords -> (N,) vertex indices
+        """
+        return self._project_into_tuple_np(coords) @ self._strides
 
-        out = [
-            self.G.project_into(add(qrect[0], (x, y, z)))
-            for x in range(-TOLERANCE, qrect_dim[0] + 1 + TOLERANCE)
-            for y in range(-TOLERANCE, qrect_dim[1] + 1 + TOLERANCE)
-            for z in range(qrect_dim[2] + 1)
-        ]
+    def _project_outof_tuple_np(self, coords: np.ndarray) -> np.ndarray:
+        """
+        (N, 3) int grid coords -> (N, 3) float coords
+        """
+        return coords * self._res + self._origin
 
-        assert out
-        return out
+    def _project_out_tuple_np(self, coords: np.ndarray) -> np.ndarray:
+        """
+        (N,) vertex indices -> (N, 3) int grid coords
+        """
+        coords = np.asarray(coords, dtype=np.int64)
+        return np.stack(
+            [
+                coords % self._steps[0],
+                (coords // self._steps[0]) % self._steps[1],
+                coords // (self._steps[0] * self._steps[1]),
+            ],
+            axis=-1,
+        )
+
+    def _project_out_np(self, coords: np.ndarray) -> np.ndarray:
+        """
+        (N,) vertex indices -> (N, 3) float coords
+        """
+        return self._project_outof_tuple_np(self._project_out_tuple_np(coords))
+
+    def _project_rects_into_np(self, rects: np.ndarray) -> np.ndarray:
+        """
+        (R, 2, 3) float rects -> vertex indices of all grid points in the rects.
+        Rects grow by one grid point in x/y, points outside of the grid are
+        dropped.
+        """
+        TOLERANCE = np.array([1, 1, 0])
+
+        rects = np.asarray(rects, dtype=float).reshape(-1, 2, 3)
+        starts = self._project_into_tuple_np(rects[:, 0]) - TOLERANCE
+        dims = self._project_into_tuple_np(rects[:, 1]) + TOLERANCE - starts + 1
+        dims = np.maximum(dims, 0)
+
+        # enumerate all points of all rects in one go
+        counts = dims.prod(axis=1)
+        rect_i = np.repeat(np.arange(len(rects)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        d = dims[rect_i]
+        coords = starts[rect_i] + np.stack(
+            [
+                local // (d[:, 1] * d[:, 2]),
+                (local // d[:, 2]) % d[:, 1],
+                local % d[:, 2],
+            ],
+            axis=-1,
+        )
+
+        inside = ((coords >= 0) & (coords < self._steps)).all(axis=1)
+        return coords[inside] @ self._strides
 
     def _project_poly_into_shape(self, poly: list[OutCoord]) -> list[IntCoord]:
         from shapely import box, intersection
@@ -579,43 +1163,48 @@ class Grid:
     def reproject(self, coord: OutCoord) -> OutCoord:
         return self._project_out(self._project_into(coord))
 
-    def find_path(
+    def route(
         self,
-        nodes: list[OutCoord],
-        exclusion_points: set[OutCoord] | None = None,
-        exclusion_rects: set[tuple[OutCoord, OutCoord]] | None = None,
-        # inclusion_poly: list[list[OutCoord]] | None = None,
-        layer_exclusion_rects: set[tuple[OutCoord, OutCoord]] | None = None,
-        remove: bool = True,
-        compressed: bool = True,
-    ) -> list[OutCoord]:
+        nodes: list[OutCoord] | np.ndarray,
+        exclusion_points: set[OutCoord] | np.ndarray | None = None,
+        exclusion_rects: set[tuple[OutCoord, OutCoord]] | np.ndarray | None = None,
+        layer_exclusion_rects: set[tuple[OutCoord, OutCoord]]
+        | np.ndarray
+        | None = None,
+        tree: bool = True,
+    ) -> PathTree:
+        """
+        Find a path tree connecting nodes without committing it.
+        Without tree the nodes are chained into a single path instead.
+        Coords & rects can be given as (N, 3) & (R, 2, 3) arrays.
+        """
         logger.info("-" * 80)
         logger.info(f"Find outcoord path for {nodes}")
 
         # Translate OutCoord to internal
-        exclusion_coords = {self._project_into(x) for x in exclusion_points or {}}
-        exclusion_coords |= {
-            coord
-            for rect in exclusion_rects or {}
-            for coord in self._project_rect_into(rect)
-        }
-        node_coords = {self._project_into(x) for x in nodes}
-        used = self.G.neigh(self.used, order=1, ring=True)
-        ex = exclusion_coords | used
+        exclusion_coords = np.unique(
+            np.concatenate(
+                [
+                    self._project_into_np(_as_coords(exclusion_points)),
+                    self._project_rects_into_np(_as_rects(exclusion_rects)),
+                ]
+            )
+        )
+        node_coords = set(self._project_into_np(_as_coords(nodes)).tolist())
 
         logger.info("Run checks")
 
         # Checks
-        if not node_coords.isdisjoint(exclusion_coords):
-            hits = node_coords.intersection(exclusion_coords)
+        hits = np.intersect1d(list(node_coords), exclusion_coords)
+        if len(hits):
             logger.warning(
                 f"In exclusion: {hits} {set(self._project_out(hit) for hit in hits)}"
             )
-            raise Exception()
+            raise GridRouteException("Nodes in exclusion")
 
-        if not node_coords.isdisjoint(used):
+        if not self.is_free(node_coords):
             logger.warning("In use")
-            raise Exception()
+            raise GridRouteException("Nodes in use")
 
         # TODO reimplement, but fast
         # v_set = self.G.vertices()
@@ -623,56 +1212,117 @@ class Grid:
         #    logger.warning(f"Not in graph: {node_coords.difference(v_set)}")
         #    raise Exception()
 
-        # TODO combine with node sub
-        # Remove cross-layer edges if on any layer in use
-        logger.info("Remove inter-layer edges in zones")
-
-        G = self.G
+        # Used paths are already blocked in self.G (see commit),
+        # per-net exclusions are only applied temporarily.
+        # Inter-layer edges of used coords are gone with their vertices.
+        layer_exclusion_coords = self._project_rects_into_np(
+            _as_rects(layer_exclusion_rects)
+        )
 
-        def all_layers(coords: set[IntCoord]):
-            coords_np = np.array(list(coords))
-            return np.stack(
-                [
-                    (coords_np + self.G.project_into((0, 0, z)))
-                    % (self.steps[0] * self.steps[1] * self.steps[2])
-                    for z in range(self.steps[2])
-                ],
-                axis=-1,
+        with self.G.overlay(ex=exclusion_coords, ex_via=layer_exclusion_coords) as G:
+            if not tree:
+                return [G.find_path(nodes=node_coords, ex=exclusion_coords)]
+            return G.find_tree(
+                nodes=node_coords,
+                ex=exclusion_coords,
             )
 
-        def inter_layer_edges(coords):
-            return {(abc[0], e) for abc in all_layers(coords) for e in abc[1:]}
+    def is_free(self, path: Iterable[IntCoord]) -> bool:
+        """
+        True if no coord of path touches a committed path
+        """
+        return not self.used_mask[list(path)].any()
 
-        layer_exclusion_coords = {
-            coord
-            for rect in layer_exclusion_rects or {}
-            for coord in self._project_rect_into(rect)
-        } | exclusion_coords
+    def commit(self, tree: PathTree):
+        """
+        Block tree and its surrounding for all following routes
+        """
+        coords = {c for path in tree for c in path}
+        self.used |= coords
+        ring = self.G.neigh(coords, order=1, ring=True)
+        self.used_mask[list(ring)] = True
+        self.G = self.G.block(ex=ring, ex_via=coords)
 
-        if not remove:
-            layer_exclusion_coords |= used
+    def reset(self, trees: Iterable[PathTree] = ()):
+        """
+        Drop all committed paths and commit paths instead (rip-up)
+        """
+        self.G = self._G_base.copy()
+        self.used = set()
+        self.used_mask[:] = False
+        for tree in trees:
+            self.commit(tree)
+
+    def project_path(
+        self, path: list[IntCoord], compressed: bool = True
+    ) -> list[OutCoord]:
+        if not path:
+            return []
 
-        # TODO make efficient
-        G = G.subgraph_e(ex=inter_layer_edges(layer_exclusion_coords))
+        coords = self._project_out_tuple_np(path)
+        if compressed:
+            # keep first, last & every point where the direction changes
+            vectors = np.diff(coords, axis=0)
+            turns = np.flatnonzero((vectors[1:] != vectors[:-1]).any(axis=1)) + 1
+            keep = np.concatenate([[0], turns, [len(coords) - 1]])
+            coords = coords[np.unique(keep)]
+
+        return [OutCoord(*c) for c in self._project_outof_tuple_np(coords).tolist()]
 
-        logger.info("Build node subgraph")
-        G = G.subgraph(ex=ex, inc=None)
+    def project_tree(
+        self, tree: PathTree, compressed: bool = True
+    ) -> list[list[OutCoord]]:
+        return [self.project_path(path, compressed=compressed) for path in tree]
 
-        path = G.find_path(
-            nodes=node_coords,
-            ex=ex,
+    def find_path(
+        self,
+        nodes: list[OutCoord],
+        exclusion_points: set[OutCoord] | None = None,
+        exclusion_rects: set[tuple[OutCoord, OutCoord]] | None = None,
+        # inclusion_poly: list[list[OutCoord]] | None = None,
+        layer_exclusion_rects: set[tuple[OutCoord, OutCoord]] | None = None,
+        remove: bool = True,
+        compressed: bool = True,
+    ) -> list[OutCoord]:
+        """
+        Chain nodes into a single path, see find_tree for branching nets
+        """
+        tree = self.route(
+            nodes,
+            exclusion_points=exclusion_points,
+            exclusion_rects=exclusion_rects,
+            layer_exclusion_rects=layer_exclusion_rects,
+            tree=False,
         )
 
         if remove:
-            self.used |= set(path)
-            self.G = self.G.subgraph_e(ex=inter_layer_edges(path))
+            self.commit(tree)
 
-        projected_out_path = [self._project_out(c) for c in path]
+        return self.project_path(tree[0], compressed=compressed)
 
-        if compressed:
-            projected_out_path = self._compress_path(projected_out_path)
+    def find_tree(
+        self,
+        nodes: list[OutCoord],
+        exclusion_points: set[OutCoord] | None = None,
+        exclusion_rects: set[tuple[OutCoord, OutCoord]] | None = None,
+        layer_exclusion_rects: set[tuple[OutCoord, OutCoord]] | None = None,
+        remove: bool = True,
+        compressed: bool = True,
+    ) -> list[list[OutCoord]]:
+        """
+        Connect nodes with a tree of paths, one path per branch
+        """
+        tree = self.route(
+            nodes,
+            exclusion_points=exclusion_points,
+            exclusion_rects=exclusion_rects,
+            layer_exclusion_rects=layer_exclusion_rects,
+        )
+
+        if remove:
+            self.commit(tree)
 
-        return projected_out_path
+        return self.project_tree(tree, compressed=compressed)
 
     @staticmethod
     def _compress_path(path: list[OutCoord]):
@@ -692,7 +1342,41 @@ class Grid:
 
         return compressed_path
 
-    def draw(self):
+    def draw(self, output: str = "graph_app.png"):
+        if isinstance(self.G, GraphTool):
+            self._draw_gt(output)
+        else:
+            self._draw_bitmap(output)
+
+    def _draw_bitmap(self, output: str):
+        """
+        One image per layer: removed vertices black, free green, used red.
+        """
+        from matplotlib.colors import ListedColormap
+        from matplotlib.figure import Figure
+
+        dims = self.steps
+        img = np.zeros(math.prod(dims), dtype=np.int8)
+        img[list(self.G.vertices())] = 1
+        img[self.used_mask] = 2
+        layers = img.reshape(dims[2], dims[1], dims[0])
+
+        logger.info("Draw")
+        fig = Figure(figsize=(8 * dims[2], 8))
+        for z, layer in enumerate(layers):
+            ax = fig.add_subplot(1, dims[2], z + 1)
+            ax.imshow(
+                layer,
+                cmap=ListedColormap(["black", "green", "red"]),
+                vmin=0,
+                vmax=2,
+                interpolation="nearest",
+            )
+            ax.set_title(f"layer {z}")
+        fig.savefig(output)
+
+    def _draw_gt(self, output: str):
+        assert isinstance(self.G, GraphTool)
         g = self.G.G
         # weights = g.ep["weight"]
         dims = self.steps
@@ -713,7 +1397,7 @@ class Grid:
             g,
             pos=gt.sfdp_layout(g, cooling_step=0.95, epsilon=1e-2),
             vertex_text=g.vertex_index,
-            output="graph_app.png",
+            output=output,
             bg_color="white",
             vertex_color=vused,
             vertex_fill_color=vlayer,
@@ -8,10 +8,15 @@ TODO: Explain file
 import logging
 from itertools import groupby
 
-import networkx as nx
+import numpy as np
 
 import faebryk.library._F as F
-from faebryk.exporters.pcb.kicad.transformer import PCB_Transformer
+from faebryk.exporters.pcb.kicad.transformer import (
+    Footprint,
+    Pad,
+    PCB_Transformer,
+    abs_pos,
+)
 from faebryk.exporters.pcb.routing.grid import (
     Coord,
     Graph,
@@ -19,8 +24,19 @@ from faebryk.exporters.pcb.routing.grid import (
     GridInvalidVertexException,
     OutCoord,
 )
-from faebryk.libs.geometry.basic import Geometry
-from faebryk.libs.kicad.pcb import Footprint, GR_Circle, GR_Line, GR_Rect, Pad
+from faebryk.exporters.pcb.routing.scheduler import (
+    NetOrder,
+    RoutingJob,
+    RoutingScheduler,
+)
+from faebryk.libs.kicad.fileformats import (
+    C_circle,
+    C_line,
+    C_rect,
+    C_stroke,
+    C_xy,
+    E_fill,
+)
 
 # logging settings
 logger = logging.getLogger(__name__)
@@ -32,8 +48,8 @@ if not BURIED_VIAS:
     raise NotImplementedError()
 
 
-def out_to_pcb(c: OutCoord) -> tuple[float, float]:
-    return round(c, 3).as_tuple()[:2]
+def out_to_pcb(c: OutCoord) -> C_xy:
+    return C_xy(*round(c, 3).as_tuple()[:2])
 
 
 class PCB_Router:
@@ -52,7 +68,7 @@ class PCB_Router:
 
             self.pos = [
                 Coord(
-                    *Geometry.abs_pos(fp.at.coord, pad.at.coord),
+                    *abs_pos(fp.at, pad.at)[:2],
                     router.copper_layers[layer],
                 )
                 for layer in self.layers
@@ -73,6 +89,21 @@ class PCB_Router:
             if len(transformer.get_copper_layers_pad(pad)) >= 1
         }
 
+        # exclusion zones of all pads packed into one array, a net just masks
+        # its own pads out
+        rpads = list(self.pads.values())
+        self._pad_index = {rpad: i for i, rpad in enumerate(rpads)}
+        zones = [
+            (i, zone)
+            for i, rpad in enumerate(rpads)
+            for zone in self.get_pad_exclusion_zones(rpad)
+        ]
+        self._zones = np.asarray([z for _, z in zones], dtype=float).reshape(-1, 2, 3)
+        self._zone_owner = np.array([i for i, _ in zones], dtype=np.int64)
+        self._zone_single_layer = np.array(
+            [len(rpads[i].pos) == 1 for i, _ in zones], dtype=bool
+        )
+
         pad_coords = {p for pad in self.pads.values() for p in pad.pos}
 
         # TODO give some space around pads for routing
@@ -101,66 +132,82 @@ class PCB_Router:
 
         for c in grid_points:
             self.transformer.insert_geo(
-                GR_Circle.factory(
+                C_circle(
                     center=out_to_pcb(c),
                     end=out_to_pcb(c + OutCoord(self.grid.resolution.x / 4, 0, 0)),
-                    stroke=GR_Circle.Stroke.factory(0, "default"),
-                    fill_type="solid",
+                    stroke=C_stroke(0, C_stroke.E_type.default),
+                    fill=E_fill.solid,
                     layer=f"User.{GRID_START_LAYER-int(c.z)}",
-                    uuid=self.transformer.gen_uuid(),
+                    uuid=self.transformer.gen_uuid(mark=True),
                 )
             )
 
     def draw_circle(self, coord: OutCoord, size=0.5, layer="User.9"):
         self.transformer.insert_geo(
-            GR_Circle.factory(
+            C_circle(
                 center=out_to_pcb(coord),
                 end=out_to_pcb(coord + OutCoord(size, 0, 0)),
-                stroke=GR_Circle.Stroke.factory(0.1, "default"),
-                fill_type="none",
+                stroke=C_stroke(0.1, C_stroke.E_type.default),
+                fill=E_fill.none,
                 layer=layer,
-                uuid=self.transformer.gen_uuid(),
+                uuid=self.transformer.gen_uuid(mark=True),
             )
         )
 
-    def route_all(self):
+    def route_all(
+        self,
+        order: NetOrder = NetOrder.PINS,
+        workers: int | None = None,
+        ripup_passes: int = 2,
+    ):
+        """
+        Route all nets with the RoutingScheduler.
+        workers: number of processes for speculative routing, defaults to cpu count
+        """
         from faebryk.core.util import get_all_nodes_of_type
 
         nets = get_all_nodes_of_type(self.transformer.graph, F.Net)
 
-        # TODO add net picking heuristic
+        # nets can share a name, so jobs are tracked by identity
+        jobs: dict[RoutingJob, F.Net] = {}
         for net in nets:
-            netname = net.get_trait(F.has_overriden_name).get_name()
-            try:
-                self.route_net(net)
-            except GridInvalidVertexException as e:
-                coord = e.get_coord(self.grid)
-                logger.error(f"Failed routing {netname}: {e}: {coord}")
-                self.draw_circle(coord)
-                self.draw_grid(e.graph)
-                return
-            except Exception as e:
-                logger.error(
-                    f"Could not route: {netname}: {type(e).__name__}({e.args})"
-                )
+            job = self.get_routing_job(net)
+            if job is None:
+                continue
+            jobs[job] = net
+
+        scheduler = RoutingScheduler(
+            self.grid, order=order, workers=workers, ripup_passes=ripup_passes
+        )
+        try:
+            paths = scheduler.run(list(jobs))
+        except GridInvalidVertexException as e:
+            coord = e.get_coord(self.grid)
+            logger.error(f"Failed routing: {e}: {coord}")
+            self.draw_circle(coord)
+            self.draw_grid(e.graph)
+            return
+
+        for job, path in paths.items():
+            net = jobs[job]
+            self.insert_path(net, self.grid.project_tree(path), set(job.nodes))
 
         # self.grid.draw()
 
     def get_pad_exclusion_zones(self, pad: RPad):
         def layer(p):
             middle = p
-            size = Coord(*pad.pad.size, 0)
+            size = Coord(pad.pad.size.w, pad.pad.size.h or pad.pad.size.w, 0)
 
             origin = middle - size / 2
             return origin, origin + size
 
         return [layer(p) for p in pad.pos]
 
-    def route_net(self, net: F.Net):
+    def get_routing_job(self, net: F.Net) -> RoutingJob | None:
         transformer = self.transformer
 
         assert net is not None
-        pcb_net = transformer.get_net(net)
         net_name = net.get_trait(F.has_overriden_name).get_name()
         mifs = net.get_connected_interfaces()
 
@@ -177,49 +224,55 @@ class PCB_Router:
         pads = {self.pads[pad] for pad in _pads}
 
         if len(pads) < 2:
-            return
+            return None
 
         # exclusion
-        exclusion_pads = set(self.pads.values()).difference(pads)
-        exclusion_rects = {
-            r for pad in exclusion_pads for r in self.get_pad_exclusion_zones(pad)
-        }
-        layer_exclusion_rects = {
-            r
-            for pad in pads
-            if len(pad.pos) == 1
-            for r in self.get_pad_exclusion_zones(pad)
-        }
+        own = np.isin(self._zone_owner, [self._pad_index[pad] for pad in pads])
+        exclusion_rects = self._zones[~own]
+        layer_exclusion_rects = self._zones[own & self._zone_single_layer]
+
+        nodes = {p for pad in pads for p in pad.pos}
+        return RoutingJob(
+            name=net_name,
+            nodes=list(nodes),
+            exclusion_rects=exclusion_rects,
+            layer_exclusion_rects=layer_exclusion_rects,
+        )
+
+    def route_net(self, net: F.Net):
+        job = self.get_routing_job(net)
+        if job is None:
+            return
 
         # find path
-        pad_pos = {p: pad for pad in pads for p in pad.pos}
-        nodes = set(pad_pos.keys())
-        try:
-            path = self.grid.find_path(
-                list(nodes),
-                exclusion_rects=exclusion_rects,
-                layer_exclusion_rects=layer_exclusion_rects,
-            )
-        except nx.NetworkXNoPath as e:
-            # TODO
-            logger.warning(
-                f"Can't route Net({net_name}): Could not find path: {e.args[0]}"
-            )
+        path = job.route(self.grid)
+        if path is None:
             return
+        self.grid.commit(path)
+
+        self.insert_path(net, self.grid.project_tree(path), set(job.nodes))
 
-        logger.info(f"Found path {path}")
+    def insert_path(self, net: F.Net, tree: list[list[OutCoord]], nodes: set[OutCoord]):
+        transformer = self.transformer
+        pcb_net = transformer.get_net(net)
+
+        logger.info(f"Found path {tree}")
 
         layer_names = {v: k for k, v in self.copper_layers.items()}
-        layered_path = ((k, list(v)) for k, v in groupby(path, lambda c: c[2]))
+        layered_paths = (
+            (i, k, list(v))
+            for path in tree
+            for i, (k, v) in enumerate(groupby(path, lambda c: c[2]))
+        )
 
-        for i, (layer, layer_path) in enumerate(layered_path):
+        for i, layer, layer_path in layered_paths:
             layer_name = layer_names[layer]
             switch_point = layer_path[0]
 
             # if point in nodes then through hole pad
             if i > 0 and switch_point not in nodes:
                 transformer.insert_via(
-                    coord=out_to_pcb(switch_point),
+                    coord=round(switch_point, 3).as_tuple()[:2],
                     net=pcb_net.number,
                     size_drill=(0.45, 0.25),
                 )
@@ -252,23 +305,23 @@ class PCB_Router:
             layers = pad.layers
 
             for layer in layers:
-                self.transformer.insert(
-                    GR_Rect.factory(
-                        *(out_to_pcb(c) for c in q_rect),
-                        stroke=GR_Rect.Stroke.factory(0.1, "default"),
-                        fill_type="none",
+                self.transformer.insert_geo(
+                    C_rect(
+                        *(out_to_pcb(c) for c in q_rect[:2]),
+                        stroke=C_stroke(0.1, C_stroke.E_type.default),
+                        fill=E_fill.none,
                         layer=f"User.{self.copper_layers[layer] + 1}",
-                        uuid=self.transformer.gen_uuid(),
+                        uuid=self.transformer.gen_uuid(mark=True),
                     )
                 )
 
         for c1, c2 in zip(self.edge[:-1], self.edge[1:]):
-            self.transformer.insert(
-                GR_Line.factory(
+            self.transformer.insert_geo(
+                C_line(
                     *(out_to_pcb(OutCoord(*c, 0)) for c in (c1, c2)),
-                    stroke=GR_Line.Stroke.factory(0.1, "default"),
+                    stroke=C_stroke(0.1, C_stroke.E_type.default),
                     layer="User.9",
-                    uuid=self.transformer.gen_uuid(),
+                    uuid=self.transformer.gen_uuid(mark=True),
                 )
             )
 
@@ -0,0 +1,244 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+"""
+Multi-net routing on a shared Grid.
+
+Nets are ordered by a heuristic and routed in batches of nets with
+non-overlapping bounding boxes. A batch is routed speculatively in worker
+processes against a snapshot of the grid, the results are then committed
+in order. Paths that collide with an earlier commit of the same batch are
+rerouted on the live grid. The workers of a run share one pool and catch up
+with the grid by replaying the commits since the pool was started.
+Failed nets get a bounded number of rip-up-and-reroute passes.
+"""
+
+import logging
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from enum import StrEnum, auto
+
+import networkx as nx
+import numpy as np
+
+from faebryk.exporters.pcb.routing.grid import (
+    Grid,
+    GridRouteException,
+    OutCoord,
+    PathTree,
+)
+
+logger = logging.getLogger(__name__)
+
+# keep some space around the pads of a net for the batch overlap check
+BBOX_MARGIN = 1  # mm
+
+
+class NetOrder(StrEnum):
+    PINS = auto()
+    BBOX = auto()
+
+
+@dataclass(eq=False)
+class RoutingJob:
+    name: str
+    nodes: list[OutCoord]
+    # (R, 2, 3) arrays of rects
+    exclusion_rects: np.ndarray = field(default_factory=lambda: np.empty((0, 2, 3)))
+    layer_exclusion_rects: np.ndarray = field(
+        default_factory=lambda: np.empty((0, 2, 3))
+    )
+
+    @property
+    def bbox(self) -> tuple[float, float, float, float]:
+        xs = [float(n.x) for n in self.nodes]
+        ys = [float(n.y) for n in self.nodes]
+        return (
+            min(xs) - BBOX_MARGIN,
+            min(ys) - BBOX_MARGIN,
+            max(xs) + BBOX_MARGIN,
+            max(ys) + BBOX_MARGIN,
+        )
+
+    @property
+    def bbox_area(self) -> float:
+        x0, y0, x1, y1 = self.bbox
+        return (x1 - x0) * (y1 - y0)
+
+    def overlaps(self, other: "RoutingJob") -> bool:
+        a, b = self.bbox, other.bbox
+        return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+    def route(self, grid: Grid) -> PathTree | None:
+        """
+        None if the net can't be routed, broken grids still raise
+        """
+        try:
+            return grid.route(
+                self.nodes,
+                exclusion_rects=self.exclusion_rects,
+                layer_exclusion_rects=self.layer_exclusion_rects,
+            )
+        except (GridRouteException, nx.NetworkXNoPath) as e:
+            logger.warning(
+                f"Can't route Net({self.name}): {type(e).__name__}({e.args})"
+            )
+            return None
+
+
+# worker process state
+_grid: Grid | None = None
+_replayed = 0
+
+
+def _init_worker(grid: bytes):
+    global _grid, _replayed
+    _grid = pickle.loads(grid)
+    _replayed = 0
+
+
+def _route_in_worker(args: tuple[RoutingJob, list[PathTree]]) -> PathTree | None:
+    global _replayed
+    job, commits = args
+    assert _grid is not None
+    for path in commits[_replayed:]:
+        _grid.commit(path)
+    _replayed = len(commits)
+    return job.route(_grid)
+
+
+class RoutingScheduler:
+    def __init__(
+        self,
+        grid: Grid,
+        order: NetOrder = NetOrder.PINS,
+        workers: int | None = None,
+        ripup_passes: int = 2,
+    ) -> None:
+        self.grid = grid
+        self.order = order
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.ripup_passes = ripup_passes
+
+        self.paths: dict[RoutingJob, PathTree] = {}
+        self.failed: list[RoutingJob] = []
+
+        self._pool: ProcessPoolExecutor | None = None
+        # commits since the pool was started, replayed by the workers
+        self._commits: list[PathTree] = []
+
+    def _sort(self, jobs: list[RoutingJob]) -> list[RoutingJob]:
+        if self.order == NetOrder.PINS:
+            return sorted(jobs, key=lambda j: (len(j.nodes), j.bbox_area))
+        return sorted(jobs, key=lambda j: (j.bbox_area, len(j.nodes)))
+
+    @staticmethod
+    def _batches(jobs: list[RoutingJob]) -> list[list[RoutingJob]]:
+        """
+        Split the ordered jobs into consecutive batches of non-overlapping nets
+        """
+        batches: list[list[RoutingJob]] = []
+        for job in jobs:
+            if batches and not any(job.overlaps(other) for other in batches[-1]):
+                batches[-1].append(job)
+            else:
+                batches.append([job])
+        return batches
+
+    def _route_batch(self, batch: list[RoutingJob]) -> list[PathTree | None] | None:
+        """
+        Route batch against a snapshot of the grid in worker processes.
+        Returns None if not worth parallelizing.
+        """
+        if self.workers <= 1 or len(batch) <= 1:
+            return None
+
+        if self._pool is None:
+            # workers might be started later, they need the grid of right now
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(pickle.dumps(self.grid),),
+            )
+            self._commits = []
+
+        commits = self._commits
+        return list(self._pool.map(_route_in_worker, [(j, commits) for j in batch]))
+
+    def _commit(self, job: RoutingJob, path: PathTree | None) -> bool:
+        # speculative path might collide with an earlier commit
+        if path is not None and not self.grid.is_free(c for p in path for c in p):
+            logger.info(f"Conflict for Net({job.name}), rerouting")
+            path = None
+        if path is None:
+            path = job.route(self.grid)
+        if path is None:
+            return False
+
+        self.grid.commit(path)
+        self._commits.append(path)
+        self.paths[job] = path
+        return True
+
+    def _ripup(self, job: RoutingJob) -> bool:
+        """
+        Rip up all routed nets in the way of job, route job first and
+        then the ripped up nets again.
+        Only accepted if all nets could be routed, otherwise reverted.
+        """
+        victims = [other for other in self.paths if job.overlaps(other)]
+        if not victims:
+            return False
+
+        logger.info(f"Rip-up {[v.name for v in victims]} for Net({job.name})")
+
+        old_paths = dict(self.paths)
+        for victim in victims:
+            del self.paths[victim]
+        self.grid.reset(self.paths.values())
+
+        if all(self._commit(j, None) for j in [job, *victims]):
+            return True
+
+        self.paths = old_paths
+        self.grid.reset(self.paths.values())
+        return False
+
+    def run(self, jobs: list[RoutingJob]) -> dict[RoutingJob, PathTree]:
+        ordered = self._sort(jobs)
+        self.failed = []
+
+        try:
+            for batch in self._batches(ordered):
+                self._run_batch(batch)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+            self._commits = []
+
+        for i in range(self.ripup_passes):
+            if not self.failed:
+                break
+            logger.info(f"Rip-up pass {i}: {len(self.failed)} failed nets")
+            self.failed = [job for job in self.failed if not self._ripup(job)]
+
+        if self.failed:
+            logger.warning(f"Unrouted nets: {[job.name for job in self.failed]}")
+
+        return self.paths
+
+    def _run_batch(self, batch: list[RoutingJob]):
+        speculative = self._route_batch(batch)
+        for i, job in enumerate(batch):
+            if speculative is None:
+                ok = self._commit(job, None)
+            # the live grid only has more obstacles than the snapshot
+            elif speculative[i] is None:
+                ok = False
+            else:
+                ok = self._commit(job, speculative[i])
+            if not ok:
+                self.failed.append(job)
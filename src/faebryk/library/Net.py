@@ -13,6 +13,11 @@ logger = logging.getLogger(__name__)
 class Net(Module):
     part_of: F.Electrical
 
+    # (connection count, pad -> footprint), stale once part_of gets connected
+    _fps: tuple[int, dict[F.Pad, F.Footprint]] | None = None
+    # (connection count, name), footprint renames need invalidate_name
+    _name: tuple[int, str] | None = None
+
     @L.rt_field
     def overriden_name(self):
         class _(F.has_overriden_name.impl()):
@@ -21,6 +26,10 @@ class Net(Module):
                     can_represent_kicad_footprint,
                 )
 
+                count = self._connection_count()
+                if self._name is not None and self._name[0] == count:
+                    return self._name[1]
+
                 name = "-".join(
                     sorted(
                         (
@@ -37,19 +46,45 @@ class Net(Module):
                 if len(name) > 255:
                     name = name[:200] + "..." + name[-52:]
 
+                self._name = count, name
                 return name
 
         return _()
 
-    def get_fps(self):
+    def _connection_count(self) -> int:
+        # connections are only ever added and closed transitively
+        return len(self.part_of.connected.edges)
+
+    def get_fps(self) -> dict[F.Pad, F.Footprint]:
         from faebryk.core.util import get_parent_of_type
 
-        return {
+        if self._fps is not None and self._fps[0] == self._connection_count():
+            return self._fps[1]
+
+        fps = {
             pad: fp
             for mif in self.get_connected_interfaces()
             if (fp := get_parent_of_type(mif, F.Footprint)) is not None
             and (pad := get_parent_of_type(mif, F.Pad)) is not None
         }
+        self.set_fps(fps)
+        return fps
+
+    def set_fps(self, fps: dict[F.Pad, F.Footprint]):
+        """
+        Set precomputed footprint memberships, valid until the net gets connected
+        to something else.
+        Also drops the cached name, footprint names might have changed since.
+        """
+        self._fps = self._connection_count(), fps
+        self.invalidate_name()
+
+    def invalidate_name(self):
+        """
+        Drop the cached name, needed when footprint names change
+        (e.g. override_names_with_designators).
+        """
+        self._name = None
 
     # TODO should this be here?
     def get_connected_interfaces(self):
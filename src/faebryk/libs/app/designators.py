@@ -6,73 +6,83 @@ import pprint
 import re
 from collections import defaultdict
 from pathlib import Path
-from typing import cast
+from typing import Iterable
 
 import faebryk.library._F as F
 from faebryk.core.graphinterface import Graph
 from faebryk.core.util import (
     get_all_nodes_by_names,
+    get_all_nodes_of_type,
     get_all_nodes_with_trait,
 )
 from faebryk.exporters.netlist.netlist import T2Netlist
 from faebryk.libs.kicad.fileformats import C_kicad_pcb_file
-from faebryk.libs.util import duplicates, get_key, groupby
+from faebryk.libs.util import duplicates, get_key
 
 logger = logging.getLogger(__name__)
 
 
+class DesignatorAllocator:
+    """
+    Hands out the lowest free number per designator prefix.
+
+    Numbers below the counter of a prefix are all taken, so the counter only
+    moves forward: allocating n designators is linear in n plus the number
+    of reserved ones.
+    """
+
+    PATTERN = re.compile(r"([A-Z]+)([0-9]+)")
+
+    def __init__(self, reserved: Iterable[str] = ()) -> None:
+        self._used: dict[str, set[int]] = defaultdict(set)
+        self._next: dict[str, int] = defaultdict(lambda: 1)
+        for designator in reserved:
+            self.reserve(designator)
+
+    def reserve(self, designator: str):
+        if m := self.PATTERN.match(designator):
+            self._used[m.group(1)].add(int(m.group(2)))
+
+    def allocate(self, prefix: str) -> str:
+        used = self._used[prefix]
+        num = self._next[prefix]
+        while num in used:
+            num += 1
+        used.add(num)
+        self._next[prefix] = num + 1
+        return f"{prefix}{num}"
+
+
 def attach_random_designators(graph: Graph):
     """
     sorts nodes by path and then sequentially assigns designators
     """
 
-    nodes = {n for n, _ in get_all_nodes_with_trait(graph, F.has_footprint)}
+    nodes = [n for n, _ in get_all_nodes_with_trait(graph, F.has_footprint)]
 
-    in_use = {
-        n.get_trait(F.has_designator).get_designator()
+    designators = {
+        n: t.get_designator()
         for n in nodes
-        if n.has_trait(F.has_designator)
+        if (t := n.try_get_trait(F.has_designator)) is not None
     }
-    pattern = re.compile(r"([A-Z]+)([0-9]+)")
+    allocator = DesignatorAllocator(designators.values())
 
-    groups = groupby(
-        [(m.group(1), int(m.group(2))) for d in in_use if (m := pattern.match(d))],
-        key=lambda x: x[0],
+    nodes_sorted = sorted(
+        (n for n in nodes if n not in designators), key=lambda x: x.get_full_name()
     )
 
-    assigned = defaultdict(
-        list,
-        {k: cast(list[int], [num for _, num in v]) for k, v in groups.items()},
-    )
-
-    def _get_first_hole(used: list[int]):
-        s_used = sorted(used)
-        for i in range(len(used)):
-            if i + 1 != s_used[i]:
-                return i + 1
-        return len(used) + 1
-
-    nodes_sorted = sorted(nodes, key=lambda x: x.get_full_name())
-
     for n in nodes_sorted:
-        if n.has_trait(F.has_designator):
-            continue
-        if not n.has_trait(F.has_designator_prefix):
+        if (prefix_t := n.try_get_trait(F.has_designator_prefix)) is not None:
+            prefix = prefix_t.get_prefix()
+        else:
             prefix = type(n).__name__
             logger.warning(f"Node {prefix} has no designator prefix")
 
-        prefix = n.get_trait(F.has_designator_prefix).get_prefix()
-
-        next_num = _get_first_hole(assigned[prefix])
-        designator = f"{prefix}{next_num}"
+        designator = allocator.allocate(prefix)
         n.add_trait(F.has_designator_defined(designator))
+        designators[n] = designator
 
-        assigned[prefix].append(next_num)
-
-    no_designator = {n for n in nodes if not n.has_trait(F.has_designator)}
-    assert not no_designator
-
-    dupes = duplicates(nodes, lambda n: n.get_trait(F.has_designator).get_designator())
+    dupes = duplicates(designators, lambda n: designators[n])
     assert not dupes, f"Duplcicate designators: {dupes}"
 
 
@@ -85,6 +95,10 @@ def override_names_with_designators(graph: Graph):
             )
         n.add_trait(F.has_overriden_name_defined(name))
 
+    # net names are built from the footprint names
+    for net in get_all_nodes_of_type(graph, F.Net):
+        net.invalidate_name()
+
 
 def attach_hierarchical_designators(graph: Graph):
     # TODO
@@ -120,8 +134,9 @@ def load_designators_from_netlist(
 
 def replace_faebryk_names_with_designators_in_kicad_pcb(graph: Graph, pcbfile: Path):
     logger.info("Load PCB")
-    pcb = C_kicad_pcb_file.loads(pcbfile)
-    pcb.dumps(pcbfile.with_suffix(".bak"))
+    # only footprints are touched, copper & graphics are written back verbatim
+    pcb = C_kicad_pcb_file.loads(pcbfile, lazy=True)
+    pcb.dump(pcbfile.with_suffix(".bak"))
 
     pattern = re.compile(r"^(.*)\[[^\]]*\]$")
     translation = {
@@ -143,4 +158,4 @@ def replace_faebryk_names_with_designators_in_kicad_pcb(graph: Graph, pcbfile: P
         logger.info(f"Translating {name} to {translation[name]}")
         ref_prop.value = translation[name]
 
-    pcb.dumps(pcbfile)
+    pcb.dump(pcbfile)
@@ -3,16 +3,19 @@
 
 import inspect
 import logging
-from typing import Callable, Iterable, Sequence
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from enum import StrEnum, auto
+from typing import Callable, Iterable, Sequence, cast
 
 import faebryk.library._F as F
 from faebryk.core.graphinterface import Graph
 from faebryk.core.module import Module
 from faebryk.core.moduleinterface import ModuleInterface
-from faebryk.core.util import (
-    get_all_nodes_of_type,
-    get_all_nodes_of_types,
-)
+from faebryk.core.util import get_all_nodes_of_types
 from faebryk.libs.picker.picker import has_part_picked
 from faebryk.libs.util import groupby, print_stack
 
@@ -28,34 +31,37 @@ class ERCFault(Exception):
 class ERCFaultShort(ERCFault):
     def __init__(self, faulting_ifs: Sequence[ModuleInterface], *args: object) -> None:
         link = faulting_ifs[0].is_connected_to(faulting_ifs[1])
-        assert link
         from faebryk.core.core import LINK_TB
 
         stack = ""
-        if LINK_TB:
+        if LINK_TB and link:
             stack = print_stack(link.tb)
 
         super().__init__(faulting_ifs, *args)
         print(stack)
 
 
-def simple_erc(G: Graph):
-    """Simple ERC check.
+class ERCFaults(ERCFault):
+    """Multiple ERC faults at once"""
 
-    This function will check for the following ERC violations:
-    - shorted ElectricPower
-    - shorted Caps
-    - shorted Resistors
-    - shorted symmetric footprints
-    - shorted Nets
-    - Net name collision
+    def __init__(self, faults: Sequence[ERCFault]) -> None:
+        super().__init__(
+            [mif for fault in faults for mif in fault.faulting_ifs],
+            f"{len(faults)} ERC faults",
+        )
+        self.faults = faults
 
-    - [unmapped pins for footprints]
 
-    Args:
+def find_erc_faults(G: Graph) -> list[ERCFault]:
+    """Simple ERC check, see simple_erc.
+
+    Collects all nodes of interest in one traversal and decides shorts by
+    comparing electrically connected component ids.
 
     Returns:
+        all found faults
     """
+    from faebryk.exporters.netlist.graph import get_electrical_components
     from faebryk.library.Capacitor import Capacitor
     from faebryk.library.ElectricPower import ElectricPower
     from faebryk.library.Fuse import Fuse
@@ -64,27 +70,47 @@ def simple_erc(G: Graph):
 
     logger.info("Checking graph for ERC violations")
 
+    electricpower: list[ElectricPower] = []
+    nets: list[Net] = []
+    comps: list[Resistor | Capacitor | Fuse] = []
+    electricals: list[F.Electrical] = []
+    for n in get_all_nodes_of_types(
+        G, (F.Electrical, ElectricPower, Net, Resistor, Capacitor, Fuse)
+    ):
+        if isinstance(n, F.Electrical):
+            electricals.append(n)
+        elif isinstance(n, ElectricPower):
+            electricpower.append(n)
+        elif isinstance(n, Net):
+            nets.append(n)
+        else:
+            comps.append(cast(Resistor | Capacitor | Fuse, n))
+
+    component_id = {
+        mif: i
+        for i, component in enumerate(get_electrical_components(G, electricals))
+        for mif in component
+    }
+
+    def _shorted(a: F.Electrical, b: F.Electrical) -> bool:
+        return component_id[a] == component_id[b]
+
+    faults: list[ERCFault] = []
+
     # power short
-    electricpower = get_all_nodes_of_type(G, ElectricPower)
     logger.info(f"Checking {len(electricpower)} Power")
     for ep in electricpower:
-        if ep.lv.is_connected_to(ep.hv):
-            raise ERCFaultShort([ep], "shorted power")
+        if _shorted(ep.lv, ep.hv):
+            faults.append(ERCFaultShort([ep.lv, ep.hv], "shorted power"))
 
     # shorted nets
-    nets = get_all_nodes_of_type(G, Net)
     logger.info(f"Checking {len(nets)} nets")
-    for net in nets:
-        collisions = {
-            p[0]
-            for mif in net.part_of.get_direct_connections()
-            if (p := mif.get_parent()) and isinstance(p[0], Net)
-        }
-
-        if collisions:
-            shorted = collisions | {net}
-            raise ERCFaultShort(
-                [n.part_of for n in shorted], f"shorted nets: {shorted}"
+    for shorted in groupby(nets, lambda n: component_id[n.part_of]).values():
+        if len(shorted) > 1:
+            faults.append(
+                ERCFaultShort(
+                    [n.part_of for n in shorted], f"shorted nets: {set(shorted)}"
+                )
             )
 
     # net name collisions
@@ -96,7 +122,7 @@ def simple_erc(G: Graph):
         if len(v) > 1
     }
     if net_name_collisions:
-        raise ERCFault([], f"Net name collision: {net_name_collisions}")
+        faults.append(ERCFault([], f"Net name collision: {net_name_collisions}"))
 
     # shorted components
     # parts = [n for n in nodes if n.has_trait(has_footprint)]
@@ -113,17 +139,14 @@ def simple_erc(G: Graph):
     #        checked.add(mif)
     #        if any(mif.is_connected_to(other) for other in (mifs - checked)):
     #            raise ERCFault([mif], "shorted symmetric footprint")
-    comps = get_all_nodes_of_types(G, (Resistor, Capacitor, Fuse))
     for comp in comps:
-        assert isinstance(comp, (Resistor, Capacitor, Fuse))
         # TODO make prettier
         if (
-            comp.has_trait(has_part_picked)
-            and comp.get_trait(has_part_picked).get_part().partno == "REMOVE"
-        ):
+            picked := comp.try_get_trait(has_part_picked)
+        ) is not None and picked.get_part().partno == "REMOVE":
             continue
-        if comp.unnamed[0].is_connected_to(comp.unnamed[1]):
-            raise ERCFaultShort(comp.unnamed, "shorted component")
+        if _shorted(comp.unnamed[0], comp.unnamed[1]):
+            faults.append(ERCFaultShort(comp.unnamed, "shorted component"))
 
     ## unmapped Electricals
     # fps = [n for n in nodes if isinstance(n, Footprint)]
@@ -135,6 +158,33 @@ def simple_erc(G: Graph):
 
     # TODO check multiple pulls per logic
 
+    return faults
+
+
+def simple_erc(G: Graph):
+    """Simple ERC check.
+
+    This function will check for the following ERC violations:
+    - shorted ElectricPower
+    - shorted Caps
+    - shorted Resistors
+    - shorted symmetric footprints
+    - shorted Nets
+    - Net name collision
+
+    - [unmapped pins for footprints]
+
+    Raises the fault if there is one, ERCFaults with all of them otherwise.
+    """
+    faults = find_erc_faults(G)
+    for fault in faults:
+        logger.error(f"ERC fault: {fault.args}")
+
+    if len(faults) == 1:
+        raise faults[0]
+    if faults:
+        raise ERCFaults(faults)
+
 
 def check_modules_for_erc(module: Iterable[Module]):
     for m in module:
@@ -142,21 +192,140 @@ def check_modules_for_erc(module: Iterable[Module]):
         simple_erc(m.get_graph())
 
 
-def check_classes_for_erc(classes: Iterable[Callable[[], Module]]):
-    modules = []
-    for c in classes:
-        try:
-            m = c()
-        except Exception as e:
-            logger.warning(
-                f"Could not instantiate {c.__name__}: {type(e).__name__}({e})"
-            )
+class ERCStatus(StrEnum):
+    OK = auto()
+    FAULT = auto()
+    # could not instantiate, not an ERC violation
+    SKIPPED = auto()
+    # exception or dead worker during the check
+    CRASH = auto()
+
+
+@dataclass
+class ERCResult:
+    name: str
+    status: ERCStatus
+    messages: list[str] = field(default_factory=list)
+
+
+def _check_class_for_erc(c: Callable[[], Module]) -> ERCResult:
+    name = getattr(c, "__name__", repr(c))
+    try:
+        m = c()
+    except Exception as e:
+        return ERCResult(name, ERCStatus.SKIPPED, [f"{type(e).__name__}({e})"])
+
+    logger.info(f"Checking {m} {'-'*20}")
+    try:
+        faults = find_erc_faults(m.get_graph())
+    except Exception as e:
+        return ERCResult(name, ERCStatus.CRASH, [f"{type(e).__name__}({e})"])
+
+    if faults:
+        return ERCResult(name, ERCStatus.FAULT, [str(f.args) for f in faults])
+    return ERCResult(name, ERCStatus.OK)
+
+
+def _is_picklable(obj) -> bool:
+    try:
+        pickle.dumps(obj)
+    except Exception:
+        return False
+    return True
+
+
+def _check_classes_in_pool(
+    classes: list[Callable[[], Module]], workers: int
+) -> list[ERCResult]:
+    """
+    Check classes in worker processes.
+    A dead worker breaks the whole pool, so the classes without result are
+    rechecked in a single use worker each to find the culprit.
+    """
+    results: dict[int, ERCResult] = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(classes))) as pool:
+        futures = [pool.submit(_check_class_for_erc, c) for c in classes]
+        for i, future in enumerate(futures):
+            try:
+                results[i] = future.result()
+            except BrokenProcessPool:
+                pass
+
+    for i, c in enumerate(classes):
+        if i in results:
             continue
-        modules.append(m)
-    check_modules_for_erc(modules)
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            try:
+                results[i] = pool.submit(_check_class_for_erc, c).result()
+            except BrokenProcessPool as e:
+                results[i] = ERCResult(
+                    getattr(c, "__name__", repr(c)),
+                    ERCStatus.CRASH,
+                    [f"worker died: {e}"],
+                )
+
+    return [results[i] for i in range(len(classes))]
+
+
+def get_erc_results_for_classes(
+    classes: Iterable[Callable[[], Module]], workers: int | None = None
+) -> list[ERCResult]:
+    """
+    Instantiate and ERC check every class, in the order given.
+
+    Args:
+        workers: number of worker processes, defaults to cpu count.
+            1 checks everything in this process.
+            Classes that can't be pickled are always checked in this process.
+    """
+    classes = list(classes)
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+
+    pooled: list[int] = []
+    if workers > 1 and len(classes) > 1:
+        pooled = [i for i, c in enumerate(classes) if _is_picklable(c)]
+
+    results: dict[int, ERCResult] = {}
+    if pooled:
+        for i, result in zip(
+            pooled, _check_classes_in_pool([classes[i] for i in pooled], workers)
+        ):
+            results[i] = result
+
+    for i, c in enumerate(classes):
+        if i not in results:
+            results[i] = _check_class_for_erc(c)
+
+    return [results[i] for i in range(len(classes))]
+
+
+def check_classes_for_erc(
+    classes: Iterable[Callable[[], Module]], workers: int | None = None
+) -> list[ERCResult]:
+    """
+    Raises ERCFault naming all classes that have ERC faults or crashed.
+    Classes that can't be instantiated are only logged.
+    """
+    results = get_erc_results_for_classes(classes, workers)
+
+    for r in results:
+        if r.status == ERCStatus.SKIPPED:
+            logger.warning(f"Could not instantiate {r.name}: {r.messages[0]}")
+        elif r.status != ERCStatus.OK:
+            logger.error(f"ERC {r.status} {r.name}: {r.messages}")
+
+    failed = {
+        r.name: r.status
+        for r in results
+        if r.status in (ERCStatus.FAULT, ERCStatus.CRASH)
+    }
+    if failed:
+        raise ERCFault([], f"ERC failed for {len(failed)} classes: {failed}")
+
+    return results
 
 
-def check_library_for_erc(lib):
+def check_library_for_erc(lib, workers: int | None = None) -> list[ERCResult]:
     members = inspect.getmembers(lib, inspect.isclass)
     module_classes = [m[1] for m in members if issubclass(m[1], Module)]
-    check_classes_for_erc(module_classes)
+    return check_classes_for_erc(module_classes, workers)
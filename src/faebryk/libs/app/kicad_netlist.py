@@ -1,23 +1,112 @@
 # This file is part of the faebryk project
 # SPDX-License-Identifier: MIT
 
+import hashlib
+import json
 import logging
+from collections import Counter
+from dataclasses import asdict, dataclass
 from pathlib import Path
 
 from faebryk.core.graph import Graph
 from faebryk.exporters.netlist.graph import attach_nets_and_kicad_info
 from faebryk.exporters.netlist.kicad.netlist_kicad import from_faebryk_t2_netlist
-from faebryk.exporters.netlist.netlist import make_t2_netlist_from_graph
+from faebryk.exporters.netlist.netlist import T2Netlist, make_t2_netlist_from_graph
 from faebryk.importers.netlist.kicad.netlist_kicad import to_faebryk_t2_netlist
 from faebryk.libs.app.designators import (
     attach_random_designators,
     load_designators_from_netlist,
     override_names_with_designators,
 )
+from faebryk.libs.util import duplicates
 
 logger = logging.getLogger(__name__)
 
 
+def _hash(obj) -> str:
+    return hashlib.sha256(repr(obj).encode()).hexdigest()
+
+
+@dataclass
+class NetlistSummary:
+    """
+    Hashes of all components and nets of a T2 netlist, together with the hash
+    of the netlist file that was written for it.
+    Lets write_netlist detect an unchanged design without serializing.
+    """
+
+    # bump if the kicad netlist output changes for the same T2 netlist
+    VERSION = 1
+
+    comps: dict[str, str]
+    nets: dict[str, str]
+    netlist_hash: str = ""
+    version: int = VERSION
+
+    @classmethod
+    def from_t2(cls, t2: T2Netlist) -> "NetlistSummary":
+        dupes = duplicates(t2.comps, lambda comp: comp.name)
+        assert not dupes, f"Duplicate comps {dupes}"
+
+        comps = {
+            comp.name: _hash((comp.value, tuple(comp.properties.items())))
+            for comp in t2.comps
+        }
+
+        name_count = Counter(net.properties["name"] for net in t2.nets)
+        nets = {}
+        for net in t2.nets:
+            name = net.properties["name"]
+            h = _hash(
+                (
+                    tuple(net.properties.items()),
+                    tuple((v.component.name, v.pin) for v in net.vertices),
+                )
+            )
+            # duplicate names would shadow each other
+            nets[name if name_count[name] == 1 else f"{name}#{h}"] = h
+
+        return cls(comps=comps, nets=nets)
+
+    @staticmethod
+    def path_for(netlist_path: Path) -> Path:
+        return netlist_path.with_suffix(netlist_path.suffix + ".summary.json")
+
+    @classmethod
+    def load(cls, netlist_path: Path) -> "NetlistSummary | None":
+        """
+        Summary of the netlist file at netlist_path.
+        None if missing, outdated or the netlist file was modified since.
+        """
+        path = cls.path_for(netlist_path)
+        if not path.exists() or not netlist_path.exists():
+            return None
+        try:
+            summary = cls(**json.loads(path.read_text()))
+        except (ValueError, TypeError):
+            logger.warning(f"Ignoring invalid netlist summary {path}")
+            return None
+        if summary.version != cls.VERSION:
+            return None
+        if summary.netlist_hash != _hash(netlist_path.read_text(encoding="utf-8")):
+            return None
+        return summary
+
+    def dump(self, netlist_path: Path, netlist: str):
+        self.netlist_hash = _hash(netlist)
+        self.path_for(netlist_path).write_text(json.dumps(asdict(self)))
+
+    def diff(self, other: "NetlistSummary") -> tuple[set[str], set[str]]:
+        """
+        Names of the changed (added, removed or modified) components and nets.
+        """
+
+        def _changed(a: dict[str, str], b: dict[str, str]) -> set[str]:
+            return {k for k in a.keys() | b.keys() if a.get(k) != b.get(k)}
+
+        return _changed(self.comps, other.comps), _changed(self.nets, other.nets)
+
+
 def write_netlist(
     G: Graph, netlist_path: Path, use_kicad_designators: bool = False
 ) -> bool:
@@ -37,17 +126,33 @@ def write_netlist(
 
     logger.info("Making faebryk netlist")
     t2 = make_t2_netlist_from_graph(G)
+
+    summary = NetlistSummary.from_t2(t2)
+    old_summary = NetlistSummary.load(netlist_path)
+    if old_summary is not None:
+        changed_comps, changed_nets = old_summary.diff(summary)
+        if not changed_comps and not changed_nets:
+            logger.warning("Netlist did not change, not writing")
+            return False
+        logger.info(
+            f"Netlist changed: {len(changed_comps)} components,"
+            f" {len(changed_nets)} nets"
+        )
+        logger.debug(f"Changed components: {sorted(changed_comps)}")
+        logger.debug(f"Changed nets: {sorted(changed_nets)}")
+
     logger.info("Making kicad netlist")
     netlist = from_faebryk_t2_netlist(t2).dumps()
 
     if netlist_path.exists():
         old_netlist = netlist_path.read_text()
-        # pure text based check
+        # pure text based check, only needed without (valid) summary
         # works in a lot of cases because netlist is pretty stable
         # components sorted by name
         # nets sorted by name
         if old_netlist == netlist:
             logger.warning("Netlist did not change, not writing")
+            summary.dump(netlist_path, netlist)
             return False
         backup_path = netlist_path.with_suffix(netlist_path.suffix + ".bak")
         logger.info(f"Backup old netlist at {backup_path}")
@@ -56,5 +161,6 @@ def write_netlist(
     logger.info("Writing Experiment netlist to {}".format(netlist_path.resolve()))
     netlist_path.parent.mkdir(parents=True, exist_ok=True)
     netlist_path.write_text(netlist, encoding="utf-8")
+    summary.dump(netlist_path, netlist)
 
     return True
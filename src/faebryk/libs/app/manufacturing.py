@@ -3,16 +3,19 @@
 
 import logging
 from pathlib import Path
+from typing import Callable
 
 from faebryk.core.module import Module
 from faebryk.core.util import get_all_modules
 from faebryk.exporters.bom.jlcpcb import write_bom_jlcpcb
 from faebryk.exporters.pcb.kicad.artifacts import (
+    ArtifactCache,
     export_dxf,
     export_gerber,
     export_glb,
     export_pick_and_place,
     export_step,
+    run_exports,
 )
 from faebryk.exporters.pcb.pick_and_place.jlcpcb import (
     convert_kicad_pick_and_place_to_jlcpcb,
@@ -21,20 +24,48 @@ from faebryk.exporters.pcb.pick_and_place.jlcpcb import (
 logger = logging.getLogger(__name__)
 
 
-def export_pcba_artifacts(out: Path, pcb_path: Path, app: Module):
+def export_pcba_artifacts(
+    out: Path,
+    pcb_path: Path,
+    app: Module,
+    jobs: int | None = None,
+    cache_dir: Path | None = None,
+):
+    """
+    Args:
+        jobs: max number of concurrent kicad-cli exports, default all
+        cache_dir: reuse outputs of unchanged pcb files from this artifact cache
+    """
     cad_path = out.joinpath("cad")
     cad_path.mkdir(parents=True, exist_ok=True)
 
     logger.info("Exporting PCBA artifacts")
 
     write_bom_jlcpcb(get_all_modules(app), out.joinpath("jlcpcb_bom.csv"))
-    export_step(pcb_path, step_file=cad_path.joinpath("pcba.step"))
-    export_glb(pcb_path, glb_file=cad_path.joinpath("pcba.glb"))
-    export_dxf(pcb_path, dxf_file=cad_path.joinpath("pcba.dxf"))
-    export_gerber(pcb_path, gerber_zip_file=out.joinpath("gerber.zip"))
-    pnp_file = out.joinpath("pick_and_place.csv")
-    export_pick_and_place(pcb_path, pick_and_place_file=pnp_file)
-    convert_kicad_pick_and_place_to_jlcpcb(
-        pnp_file,
-        out.joinpath("jlcpcb_pick_and_place.csv"),
+
+    cache = ArtifactCache(cache_dir) if cache_dir is not None else None
+
+    def _export(export: Callable[[Path, Path], None], out_file: Path):
+        if cache is not None:
+            cache.export(export, pcb_path, out_file)
+        else:
+            export(pcb_path, out_file)
+
+    def _pick_and_place():
+        pnp_file = out.joinpath("pick_and_place.csv")
+        _export(export_pick_and_place, pnp_file)
+        convert_kicad_pick_and_place_to_jlcpcb(
+            pnp_file,
+            out.joinpath("jlcpcb_pick_and_place.csv"),
+        )
+
+    run_exports(
+        {
+            "step": lambda: _export(export_step, cad_path.joinpath("pcba.step")),
+            "glb": lambda: _export(export_glb, cad_path.joinpath("pcba.glb")),
+            "dxf": lambda: _export(export_dxf, cad_path.joinpath("pcba.dxf")),
+            "gerber": lambda: _export(export_gerber, out.joinpath("gerber.zip")),
+            "pick_and_place": _pick_and_place,
+        },
+        jobs=jobs,
     )
@@ -10,7 +10,8 @@ from typing import Any, Callable
 import faebryk.library._F as F
 from faebryk.core.graph import Graph
 from faebryk.core.module import Module
-from faebryk.core.util import get_node_tree, iter_tree_by_depth
+from faebryk.core.node import Node
+from faebryk.core.util import NodeTree, get_node_tree_view
 from faebryk.exporters.pcb.kicad.transformer import PCB_Transformer
 from faebryk.exporters.pcb.routing.util import apply_route_in_pcb
 from faebryk.libs.app.kicad_netlist import write_netlist
@@ -23,7 +24,13 @@ from faebryk.libs.kicad.fileformats import (
 logger = logging.getLogger(__name__)
 
 
-def apply_layouts(app: Module):
+def apply_layouts(
+    app: Module, tree: NodeTree | None = None
+) -> dict[Node, F.has_pcb_position.Point]:
+    """
+    Apply all layouts top-down and resolve the resulting positions.
+    Returns the absolute positions, only valid until positions change.
+    """
     if not app.has_trait(F.has_pcb_position):
         app.add_trait(
             F.has_pcb_position_defined(
@@ -31,18 +38,58 @@ def apply_layouts(app: Module):
             )
         )
 
-    tree = get_node_tree(app)
-    for level in iter_tree_by_depth(tree):
+    if tree is None:
+        tree = get_node_tree_view(app)
+
+    # top-down, layouts place the nodes below them
+    for level in tree.iter_levels():
         for n in level:
             if n.has_trait(F.has_pcb_layout):
                 n.get_trait(F.has_pcb_layout).apply()
 
-
-def apply_routing(app: Module, transformer: PCB_Transformer):
+    return resolve_positions(app, tree)
+
+
+def resolve_positions(
+    app: Module, tree: NodeTree | None = None
+) -> dict[Node, F.has_pcb_position.Point]:
+    """
+    Resolve all pcb positions in one top-down pass.
+    Every node passes the position of its closest positioned ancestor down,
+    instead of every relative position walking up its hierarchy.
+    """
+    from faebryk.libs.geometry.basic import Geometry
+
+    if tree is None:
+        tree = get_node_tree_view(app)
+
+    resolved: dict[Node, F.has_pcb_position.Point] = {}
+    positions: list[F.has_pcb_position.Point | None] = []
+    for node, parent in zip(tree.nodes, tree.parents):
+        pos = positions[parent] if parent >= 0 else None
+        if node.has_trait(F.has_pcb_position):
+            trait = node.get_trait(F.has_pcb_position)
+            if isinstance(trait, F.has_pcb_position_defined_relative_to_parent):
+                # without parent get_position raises later
+                if pos is not None:
+                    pos = Geometry.abs_pos(pos, trait.position_relative)
+            else:
+                pos = trait.get_position()
+            if pos is not None:
+                resolved[node] = pos
+        positions.append(pos)
+
+    return resolved
+
+
+def apply_routing(
+    app: Module, transformer: PCB_Transformer, tree: NodeTree | None = None
+):
     strategies: list[tuple[F.has_pcb_routing_strategy, int]] = []
 
-    tree = get_node_tree(app)
-    for i, level in enumerate(list(iter_tree_by_depth(tree))):
+    if tree is None:
+        tree = get_node_tree_view(app)
+    for i, level in enumerate(tree.iter_levels()):
         for n in level:
             if not n.has_trait(F.has_pcb_routing_strategy):
                 continue
@@ -74,7 +121,8 @@ def apply_design(
     apply_netlist(pcb_path, netlist_path, changed)
 
     logger.info("Load PCB")
-    pcb = C_kicad_pcb_file.loads(pcb_path)
+    # copper & graphics are only decoded if the transformer touches them
+    pcb = C_kicad_pcb_file.loads(pcb_path, lazy=True)
 
     transformer = PCB_Transformer(pcb.kicad_pcb, G, app)
 
@@ -82,13 +130,16 @@ def apply_design(
     if transform:
         transform(transformer)
 
+    # hierarchy doesn't change while laying out and routing
+    tree = get_node_tree_view(app)
+
     # set layout
-    apply_layouts(app)
-    transformer.move_footprints()
-    apply_routing(app, transformer)
+    positions = apply_layouts(app, tree)
+    transformer.move_footprints(positions)
+    apply_routing(app, transformer, tree)
 
     logger.info(f"Writing pcbfile {pcb_path}")
-    pcb.dumps(pcb_path)
+    pcb.dump(pcb_path)
 
     print("Reopen PCB in kicad")
 
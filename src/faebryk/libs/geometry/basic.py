@@ -3,11 +3,14 @@
 
 import logging
 import math
+import os
+from concurrent.futures import ProcessPoolExecutor
 from operator import add
 from typing import Iterable, Sequence, TypeVar
 
 import numpy as np
-from shapely import MultiPolygon, Point, Polygon, transform
+import shapely
+from shapely import MultiPoint, Point, Polygon, STRtree, transform
 
 logger = logging.getLogger(__name__)
 
@@ -77,15 +80,51 @@ def flatten_polygons(polygons: list[Polygon]) -> list[Polygon]:
     return flattened_polygons
 
 
+def _voronoi_cells(points: np.ndarray, polygon: Polygon) -> np.ndarray:
+    """
+    Voronoi cells of points clipped to polygon, in the order of points.
+    If a clipped cell falls apart, only the part containing its point is kept.
+    """
+    if len(points) == 1:
+        return np.array([polygon], dtype=object)
+
+    cells = shapely.get_parts(
+        shapely.voronoi_polygons(MultiPoint(points), extend_to=polygon)
+    )
+    # voronoi_polygons does not guarantee input order
+    point_idx, cell_idx = STRtree(cells).query(
+        shapely.points(points), predicate="intersects"
+    )
+    # boundary points (duplicates) intersect several cells, first one wins
+    point_idx, first = np.unique(point_idx, return_index=True)
+    ordered = np.empty(len(points), dtype=object)
+    ordered[point_idx] = cells[cell_idx[first]]
+
+    clipped = shapely.intersection(ordered, polygon)
+    for i in np.flatnonzero(shapely.get_num_geometries(clipped) > 1):
+        parts = shapely.get_parts(clipped[i])
+        inside = shapely.contains_xy(parts, *points[i])
+        if inside.any():
+            clipped[i] = parts[inside][0]
+    return clipped
+
+
 def get_distributed_points_in_polygon(
     polygon: Polygon,
     density: float,
+    max_iterations: int = 1000,
+    seed: int | None = None,
 ) -> list[Point]:
     """
     Get a list of points that are distributed in a polygon
 
+    Lloyd relaxation: every iteration moves all points to the centroids of
+    their voronoi cells (clipped to the polygon) until they settle.
+
     :param polygon: The polygon to distribute the points in
     :param density: The density of the points
+    :param max_iterations: Upper bound of relaxation steps
+    :param seed: Seed for the initial points, global numpy random state if None
     :return: A list of points that are distributed in the polygon
     """
 
@@ -93,88 +132,58 @@ def get_distributed_points_in_polygon(
     if polygon.area > 0 and num_points == 0:
         num_points = 1
 
-    points = get_random_points_in_polygon(polygon, num_points)
-
-    min_x, min_y, max_x, max_y = polygon.bounds
-    size_x = max_x - min_x
-    size_y = max_y - min_y
-
-    while True:
-        point_distance_travel = []
-        for i, point in enumerate(points):
-            point_bubble = polygon
-
-            for p in points:
-                if p == point:
-                    continue
-
-                p1 = np.array((point.x, point.y))
-                p2 = np.array((p.x, p.y))
-
-                p_mid = (p1 + p2) / 2
-
-                v = p2 - p1
-                v_unit = v / np.linalg.norm(v)
-                v_unit_perp = np.array([v_unit[1], -v_unit[0]])
-
-                # create a polygon at least twice as large to cut the polygon up
-                exclusion_polygon = Polygon(
-                    [
-                        (
-                            p_mid[0] + v_unit_perp[0] * size_x / 2,
-                            p_mid[1] + v_unit_perp[1] * size_x / 2,
-                        ),
-                        (
-                            p_mid[0] + v_unit_perp[0] * size_x / 2 + v_unit[0] * size_y,
-                            p_mid[1] + v_unit_perp[1] * size_x / 2 + v_unit[1] * size_y,
-                        ),
-                        (
-                            p_mid[0] - v_unit_perp[0] * size_x / 2 + v_unit[0] * size_y,
-                            p_mid[1] - v_unit_perp[1] * size_x / 2 + v_unit[1] * size_y,
-                        ),
-                        (
-                            p_mid[0] - v_unit_perp[0] * size_x,
-                            p_mid[1] - v_unit_perp[1] * size_x,
-                        ),
-                    ]
-                )
-
-                point_bubble = point_bubble.difference(exclusion_polygon)
-
-            assert point_bubble.contains(point)
-
-            if isinstance(point_bubble, MultiPolygon):
-                for p in list(point_bubble.geoms):
-                    if p.contains(point):
-                        point_bubble = p
-                        break
-
-            new_point = point_bubble.centroid
-
-            # TODO: it is possible it will be outside, then just move it to the
-            # closest point on the polygon.
-            if not point_bubble.contains(new_point):
-                continue
+    rng = np.random.default_rng(seed) if seed is not None else None
+    points = shapely.get_coordinates(
+        get_random_points_in_polygon(polygon, num_points, rng=rng)
+    )
+    if not len(points):
+        return []
 
-            assert polygon.contains(new_point)
+    for _ in range(max_iterations):
+        cells = _voronoi_cells(points, polygon)
+        centroids = shapely.get_coordinates(shapely.centroid(cells))
 
-            point_distance_travel.append(
-                Geometry.distance_euclid(
-                    Geometry.Point((point.x, point.y)),
-                    Geometry.Point((new_point.x, new_point.y)),
-                )
-            )
-            logger.debug(
-                f"Point ({point.x:.2f}, {point.y:.2f}) -> ({new_point.x:.2f}, "
-                f"{new_point.y:.2f}), distance: {point_distance_travel[-1]}"
-            )
+        # TODO: centroid can be outside of a concave cell, then just move it to
+        # the closest point on the polygon.
+        keep = ~shapely.contains_xy(cells, centroids[:, 0], centroids[:, 1])
+        centroids[keep] = points[keep]
 
-            points[i] = new_point
+        travel = np.linalg.norm(centroids - points, axis=1)
+        logger.debug(f"Relaxation step, max distance: {travel.max()}")
+        points = centroids
 
-        if max(point_distance_travel) < density / 100:
+        if travel.max() < density / 100:
             break
 
-    return points
+    return list(shapely.points(points))
+
+
+def _distributed_points_job(args: tuple[Polygon, float, int]) -> list[Point]:
+    polygon, density, seed = args
+    return get_distributed_points_in_polygon(polygon, density, seed=seed)
+
+
+def get_distributed_points_in_polygons(
+    polygons: Sequence[Polygon], density: float, workers: int | None = 1
+) -> list[list[Point]]:
+    """
+    get_distributed_points_in_polygon for many polygons.
+
+    Every polygon gets its own seed drawn from the global numpy random state,
+    so the result does not depend on the number of workers.
+
+    :param workers: number of processes, None for cpu count, <= 1 runs inline
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    seeds = np.random.randint(0, 2**32, size=len(polygons), dtype=np.uint64)
+    jobs = [(polygon, density, int(seed)) for polygon, seed in zip(polygons, seeds)]
+    if workers <= 1 or len(jobs) <= 1:
+        return [_distributed_points_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(_distributed_points_job, jobs))
 
 
 def closest_point_on_segment_to_point(line: tuple[Point, Point], point: Point) -> Point:
@@ -252,21 +261,35 @@ def closest_point_on_line(p1, p2, p3):
     return closest_point
 
 
-def get_random_points_in_polygon(polygon: Polygon, num_points: int) -> list[Point]:
+def get_random_points_in_polygon(
+    polygon: Polygon, num_points: int, rng: np.random.Generator | None = None
+) -> list[Point]:
     """
     Get a list of unique random points that are inside a polygon
 
     :param polygon: The polygon to get the points from
     :param num_points: The number of points to get
+    :param rng: Random generator, global numpy random state if None
     :return: A list of unique random points that are inside the polygon
     """
-    points = []
+    uniform = (rng or np.random).uniform
+    points = np.empty((0, 2))
     min_x, min_y, max_x, max_y = polygon.bounds
+    shapely.prepare(polygon)
     while len(points) < num_points:
-        p = Point(np.random.uniform(min_x, max_x), np.random.uniform(min_y, max_y))
-        if polygon.contains(p) and p not in points:
-            points.append(p)
-    return points
+        # oversample, the polygon might only cover a fraction of its bounds
+        n = max(2 * (num_points - len(points)), 16)
+        candidates = np.column_stack(
+            [
+                uniform(min_x, max_x, n),
+                uniform(min_y, max_y, n),
+            ]
+        )
+        candidates = candidates[shapely.contains_xy(polygon, *candidates.T)]
+        points = np.concatenate([points, candidates])
+        _, first = np.unique(points, axis=0, return_index=True)
+        points = points[np.sort(first)]
+    return list(shapely.points(points[:num_points]))
 
 
 def polygon_to_lines(polygon: Polygon) -> Iterable[tuple[Point, Point]]:
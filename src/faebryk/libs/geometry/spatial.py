@@ -0,0 +1,186 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import math
+from typing import Callable, Iterator
+
+from faebryk.libs.geometry.basic import Geometry
+
+Point2D = Geometry.Point2D
+BBox = tuple[Point2D, Point2D]
+
+
+def bbox_intersects(a: BBox, b: BBox) -> bool:
+    return (
+        a[0][0] <= b[1][0]
+        and b[0][0] <= a[1][0]
+        and a[0][1] <= b[1][1]
+        and b[0][1] <= a[1][1]
+    )
+
+
+def bbox_distance(bbox: BBox, point: Point2D) -> float:
+    dx = max(bbox[0][0] - point[0], 0, point[0] - bbox[1][0])
+    dy = max(bbox[0][1] - point[1], 0, point[1] - bbox[1][1])
+    return math.hypot(dx, dy)
+
+
+class SpatialIndex[T]:
+    """
+    Uniform grid (spatial hash) over axis aligned bounding boxes.
+
+    Objects are keyed by identity, so unhashable dataclasses can be indexed.
+    Insert (also used to update) and remove are O(cells covered), rect queries
+    only look at the cells overlapping the query.
+    """
+
+    def __init__(self, cell_size: float = 2.0) -> None:
+        assert cell_size > 0
+        self.cell_size = cell_size
+        self._cells: dict[tuple[int, int], dict[int, T]] = {}
+        self._entries: dict[int, tuple[T, BBox]] = {}
+        # cell extents (x0, y0, x1, y1) of everything ever inserted, only grows
+        # on insert, so it stays a valid bound for the nearest ring search
+        self._extents: tuple[int, int, int, int] | None = None
+
+    def _cell_range(self, bbox: BBox) -> tuple[range, range]:
+        (x0, y0), (x1, y1) = bbox
+        s = self.cell_size
+        return (
+            range(math.floor(x0 / s), math.floor(x1 / s) + 1),
+            range(math.floor(y0 / s), math.floor(y1 / s) + 1),
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, obj: T) -> bool:
+        return id(obj) in self._entries
+
+    def __iter__(self) -> Iterator[T]:
+        return (obj for obj, _ in self._entries.values())
+
+    def items(self) -> Iterator[tuple[T, BBox]]:
+        return iter(self._entries.values())
+
+    def get_bbox(self, obj: T) -> BBox:
+        return self._entries[id(obj)][1]
+
+    def insert(self, obj: T, bbox: BBox):
+        if id(obj) in self._entries:
+            self.remove(obj)
+
+        self._entries[id(obj)] = obj, bbox
+        xs, ys = self._cell_range(bbox)
+        if self._extents is None:
+            self._extents = xs.start, ys.start, xs.stop - 1, ys.stop - 1
+        else:
+            x0, y0, x1, y1 = self._extents
+            self._extents = (
+                min(x0, xs.start),
+                min(y0, ys.start),
+                max(x1, xs.stop - 1),
+                max(y1, ys.stop - 1),
+            )
+        for x in xs:
+            for y in ys:
+                self._cells.setdefault((x, y), {})[id(obj)] = obj
+
+    def remove(self, obj: T):
+        _, bbox = self._entries.pop(id(obj))
+        xs, ys = self._cell_range(bbox)
+        for x in xs:
+            for y in ys:
+                cell = self._cells[(x, y)]
+                del cell[id(obj)]
+                if not cell:
+                    del self._cells[(x, y)]
+        if not self._entries:
+            self._extents = None
+
+    def discard(self, obj: T):
+        if obj in self:
+            self.remove(obj)
+
+    def query_rect(
+        self, bbox: BBox, filter: Callable[[T], bool] | None = None
+    ) -> list[T]:
+        """
+        All objects whose bbox intersects the given bbox.
+        """
+        xs, ys = self._cell_range(bbox)
+        # sparse cells: iterating the occupied cells is cheaper for huge queries
+        if len(xs) * len(ys) > len(self._cells):
+            keys = [k for k in self._cells if k[0] in xs and k[1] in ys]
+        else:
+            keys = [(x, y) for x in xs for y in ys if (x, y) in self._cells]
+
+        seen: set[int] = set()
+        out: list[T] = []
+        for key in keys:
+            for i, obj in self._cells[key].items():
+                if i in seen:
+                    continue
+                seen.add(i)
+                if not bbox_intersects(self._entries[i][1], bbox):
+                    continue
+                if filter is not None and not filter(obj):
+                    continue
+                out.append(obj)
+        return out
+
+    def nearest(
+        self, point: Point2D, k: int = 1, filter: Callable[[T], bool] | None = None
+    ) -> list[T]:
+        """
+        Up to k objects closest to point (distance to bbox, 0 if inside),
+        ordered by distance.
+        Searches rings of cells around point until no closer object can exist.
+        """
+        if self._extents is None or k <= 0:
+            return []
+
+        s = self.cell_size
+        cx, cy = math.floor(point[0] / s), math.floor(point[1] / s)
+        # furthest ring that can still contain occupied cells
+        x0, y0, x1, y1 = self._extents
+        max_ring = max(abs(x0 - cx), abs(x1 - cx), abs(y0 - cy), abs(y1 - cy))
+
+        seen: set[int] = set()
+        found: list[tuple[float, int, T]] = []
+        for ring in range(max_ring + 1):
+            # everything in rings further out is at least this far away
+            if len(found) >= k and found[k - 1][0] <= (ring - 1) * s:
+                break
+            for key in _ring_cells(cx, cy, ring):
+                cell = self._cells.get(key)
+                if not cell:
+                    continue
+                for i, obj in cell.items():
+                    if i in seen:
+                        continue
+                    seen.add(i)
+                    if filter is not None and not filter(obj):
+                        continue
+                    found.append(
+                        (bbox_distance(self._entries[i][1], point), len(seen), obj)
+                    )
+            found.sort(key=lambda x: x[:2])
+
+        return [obj for _, _, obj in found[:k]]
+
+
+def _ring_cells(cx: int, cy: int, ring: int) -> Iterator[tuple[int, int]]:
+    if ring == 0:
+        yield cx, cy
+        return
+    for x in range(cx - ring, cx + ring + 1):
+        yield x, cy - ring
+        yield x, cy + ring
+    for y in range(cy - ring + 1, cy + ring):
+        yield cx - ring, y
+        yield cx + ring, y
+
+
+def union_bbox(bboxes: list[BBox]) -> BBox:
+    return Geometry.bbox([p for bbox in bboxes for p in bbox])
@@ -1011,26 +1011,30 @@ class C_kicad_pcb_file(SEXP_File):
             **sexp_field(multidict=True), default_factory=list
         )
         vias: list[C_via] = field(**sexp_field(multidict=True), default_factory=list)
-        zones: list[C_zone] = field(**sexp_field(multidict=True), default_factory=list)
+        zones: list[C_zone] = field(
+            **sexp_field(multidict=True, lazy=True), default_factory=list
+        )
         segments: list[C_segment] = field(
-            **sexp_field(multidict=True), default_factory=list
+            **sexp_field(multidict=True, lazy=True), default_factory=list
         )
         arcs: list[C_arc_segment] = field(
-            **sexp_field(multidict=True), default_factory=list
+            **sexp_field(multidict=True, lazy=True), default_factory=list
         )
 
         gr_lines: list[C_line] = field(
-            **sexp_field(multidict=True), default_factory=list
+            **sexp_field(multidict=True, lazy=True), default_factory=list
+        )
+        gr_arcs: list[C_arc] = field(
+            **sexp_field(multidict=True, lazy=True), default_factory=list
         )
-        gr_arcs: list[C_arc] = field(**sexp_field(multidict=True), default_factory=list)
         gr_circles: list[C_circle] = field(
-            **sexp_field(multidict=True), default_factory=list
+            **sexp_field(multidict=True, lazy=True), default_factory=list
         )
         gr_rects: list[C_rect] = field(
-            **sexp_field(multidict=True), default_factory=list
+            **sexp_field(multidict=True, lazy=True), default_factory=list
         )
         gr_texts: list[C_text] = field(
-            **sexp_field(multidict=True), default_factory=list
+            **sexp_field(multidict=True, lazy=True), default_factory=list
         )
 
     kicad_pcb: C_kicad_pcb
@@ -1,18 +1,32 @@
+import io
 import logging
+import os
+import shutil
+import tempfile
+from contextvars import ContextVar
 from dataclasses import Field, dataclass, fields, is_dataclass
-from enum import Enum, IntEnum, StrEnum
+from enum import Enum, IntEnum, StrEnum, auto
 from pathlib import Path
 from types import UnionType
-from typing import Any, Callable, Iterator, Union, get_args, get_origin
+from typing import Any, Callable, Iterator, TextIO, Union, get_args, get_origin
 
 import sexpdata
-from sexpdata import Symbol
+from sexpdata import String, Symbol
 
-from faebryk.libs.sexp.util import prettify_sexp_string
-from faebryk.libs.util import duplicates, groupby, zip_non_locked
+from faebryk.libs.sexp import parser
+from faebryk.libs.sexp.util import PrettySexpWriter
+from faebryk.libs.util import ConfigFlagEnum, duplicates
 
 logger = logging.getLogger(__name__)
 
+
+class Parsers(StrEnum):
+    FAST = auto()
+    SEXPDATA = auto()
+
+
+PARSER = ConfigFlagEnum(Parsers, "SEXP_PARSER", Parsers.FAST, "Sexp parser backend")
+
 # TODO: Should be its own repo
 
 """
@@ -37,6 +51,8 @@ class sexp_field(dict[str, Any]):
     :param Any assert_value: Assert that the value is equal to this value
     :param int order: Order of the field in the sexp, lower is first,
     can be less than 0. Only used if not positional.
+    :param bool lazy: If True and loading in lazy mode, the (list multidict) field
+    keeps its raw sexp until first accessed. Untouched fields are dumped verbatim.
     """
 
     positional: bool = False
@@ -44,12 +60,14 @@ class sexp_field(dict[str, Any]):
     key: Callable[[Any], Any] | None = None
     assert_value: Any | None = None
     order: int = 0
+    lazy: bool = False
 
     def __post_init__(self):
         super().__init__({"metadata": {"sexp": self}})
 
         assert not (self.positional and self.multidict)
         assert (self.key is None) or self.multidict, "Key only supported for multidict"
+        assert not self.lazy or self.multidict, "Lazy only supported for multidict"
 
     @classmethod
     def from_field(cls, f: Field):
@@ -61,118 +79,228 @@ class sexp_field(dict[str, Any]):
 class SymEnum(StrEnum): ...
 
 
-def _convert(val, t):
+class LazyList[T](list[T]):
+    """
+    List that holds the raw sexp of its items and only decodes them on first
+    access. As long as it is not accessed, its raw sexp is dumped verbatim.
+    """
+
+    def __init__(self, raw: "netlist_type", convert: Callable[[Any], T]) -> None:
+        super().__init__()
+        self._raw: netlist_type | None = raw
+        self._convert = convert
+
+    @property
+    def is_materialized(self) -> bool:
+        return self._raw is None
+
+    @property
+    def raw(self) -> "netlist_type":
+        if self._raw is None:
+            raise ValueError("LazyList already materialized")
+        return self._raw
+
+    def filter_raw(self, keep: Callable[["netlist_type"], bool]) -> int:
+        """
+        Drop raw items without decoding them.
+
+        :return: number of dropped items
+        """
+        raw = self.raw
+        kept = [_val for _val in raw if keep(_val)]
+        self._raw = kept
+        return len(raw) - len(kept)
+
+    def materialize(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        list.extend(self, [self._convert(_val[1:]) for _val in raw])
+
+    def __reduce_ex__(self, protocol):
+        # copies are plain lists
+        self.materialize()
+        return list, (list(self),)
+
+    def __repr__(self) -> str:
+        if self._raw is not None:
+            return f"{type(self).__name__}(<{len(self._raw)} raw items>)"
+        return list.__repr__(self)
+
+
+def _lazy_list_method(name: str):
+    method = getattr(list, name)
+
+    def _wrapped(self: LazyList, *args, **kwargs):
+        self.materialize()
+        for arg in args:
+            # list methods access other lists' items directly
+            if isinstance(arg, LazyList):
+                arg.materialize()
+        return method(self, *args, **kwargs)
+
+    _wrapped.__name__ = name
+    return _wrapped
+
+
+for _name in [
+    "__getitem__",
+    "__setitem__",
+    "__delitem__",
+    "__iter__",
+    "__reversed__",
+    "__len__",
+    "__contains__",
+    "__eq__",
+    "__ne__",
+    "__lt__",
+    "__le__",
+    "__gt__",
+    "__ge__",
+    "__add__",
+    "__iadd__",
+    "__mul__",
+    "__rmul__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "index",
+    "count",
+    "sort",
+    "reverse",
+    "copy",
+]:
+    setattr(LazyList, _name, _lazy_list_method(_name))
+
+# Set by loads for the duration of a lazy decode
+_lazy_decode: ContextVar[bool] = ContextVar("lazy_decode", default=False)
+
+
+netlist_obj = str | Symbol | int | float | bool | list
+netlist_type = list[netlist_obj]
+
+# Converters -------------------------------------------------------------------
+# All type reflection (fields, sexp_field metadata, get_origin/get_args) is done
+# once per type and compiled into closures, which are cached in the dicts below.
+_converters: dict[Any, Callable[[Any], Any]] = {}
+_decoders: dict[type, Callable[[netlist_type], Any]] = {}
+
+_SYM_YES = Symbol("yes")
+_SYM_NO = Symbol("no")
+
+
+def _unpack_atom(val):
+    # Unpack list if single atom
+    if isinstance(val, list) and len(val) == 1 and not isinstance(val[0], list):
+        return val[0]
+    return val
+
+
+def _make_converter(t) -> Callable[[Any], Any]:
     # Recurse (GenericAlias e.g list[])
     if (origin := get_origin(t)) is not None:
         args = get_args(t)
         if origin is list:
-            return [_convert(_val, args[0]) for _val in val]
+            c = _get_converter(args[0])
+            return lambda val: [c(_val) for _val in val]
         if origin is tuple:
-            return tuple(_convert(_val, _t) for _val, _t in zip(val, args))
+            cs = [_get_converter(_t) for _t in args]
+            return lambda val: tuple(c(_val) for _val, c in zip(val, cs))
         if origin in (Union, UnionType) and len(args) == 2 and args[1] is type(None):
-            return _convert(val, args[0]) if val is not None else None
+            c = _get_converter(args[0])
+            return lambda val: c(val) if val is not None else None
+
+        def _not_supported(val):
+            raise NotImplementedError(f"{origin} not supported")
 
-        raise NotImplementedError(f"{origin} not supported")
+        return _not_supported
 
     #
     if is_dataclass(t):
-        return _decode(val, t)
+        return _get_decoder(t)
 
     # Primitive
+    if isinstance(t, type) and issubclass(t, bool):
 
-    # Unpack list if single atom
-    if isinstance(val, list) and len(val) == 1 and not isinstance(val[0], list):
-        val = val[0]
+        def _convert_bool(val):
+            val = _unpack_atom(val)
+            assert val in [_SYM_YES, _SYM_NO]
+            return val == _SYM_YES
 
-    if issubclass(t, bool):
-        assert val in [Symbol("yes"), Symbol("no")]
-        return val == Symbol("yes")
-    if isinstance(val, Symbol):
-        return t(str(val))
+        return _convert_bool
 
-    return t(val)
+    def _convert_primitive(val):
+        val = _unpack_atom(val)
+        if isinstance(val, Symbol):
+            return t(str(val))
+        return t(val)
 
+    return _convert_primitive
 
-netlist_obj = str | Symbol | int | float | bool | list
-netlist_type = list[netlist_obj]
 
+def _get_converter(t) -> Callable[[Any], Any]:
+    try:
+        return _converters[t]
+    except KeyError:
+        pass
+    c = _converters[t] = _make_converter(t)
+    return c
 
-def _decode[T](sexp: netlist_type, t: type[T]) -> T:
-    if logger.isEnabledFor(logging.DEBUG):
-        logger.debug(f"parse into: {t.__name__} {'-'*40}")
-        logger.debug(f"sexp: {sexp}")
 
+def _make_decoder[T](t: type[T]) -> Callable[[netlist_type], T]:
     # check if t is dataclass type
     if not hasattr(t, "__dataclass_fields__"):
         # is_dataclass(t) trips mypy
         raise TypeError(f"{t} is not a dataclass type")
 
-    value_dict = {}
-
     # Fields
     fs = fields(t)
-    key_fields = {f.name: f for f in fs if not sexp_field.from_field(f).positional}
-    positional_fields = {
-        i: f for i, f in enumerate(fs) if sexp_field.from_field(f).positional
-    }
-
-    # Values
-    key_values = groupby(
-        (
-            val
-            for val in sexp
-            if isinstance(val, list)
-            and len(val)
-            and isinstance(key := val[0], Symbol)
-            and (str(key) + "s" in key_fields or str(key) in key_fields)
-        ),
-        lambda val: str(val[0]) + "s"
-        if str(val[0]) + "s" in key_fields
-        else str(val[0]),
+    sps = {f.name: sexp_field.from_field(f) for f in fs}
+    key_fields = {f.name: f for f in fs if not sps[f.name].positional}
+    positional_fields = [f for f in fs if sps[f.name].positional]
+
+    # sexp key -> field name, plural field names take precedence
+    key_lookup: dict[Symbol, str] = {Symbol(name): name for name in key_fields}
+    key_lookup.update(
+        {Symbol(name[:-1]): name for name in key_fields if name.endswith("s")}
     )
-    pos_values = {
-        i: val
-        for i, val in enumerate(sexp)
-        if isinstance(val, (str, int, float, Symbol, bool))
-        or (isinstance(val, list) and (not len(val) or not isinstance(val[0], Symbol)))
-        # and i in positional_fields
-        # and positional_fields[i].name not in value_dict
-    }
-
-    if logger.isEnabledFor(logging.DEBUG):
-        logger.debug(f"key_fields: {list(key_fields.keys())}")
-        logger.debug(
-            f"positional_fields: {list(f.name for f in positional_fields.values())}"
-        )
-        logger.debug(f"key_values: {list(key_values.keys())}")
-        logger.debug(f"pos_values: {pos_values}")
-
-    # Parse --------------------------------------------------------------
 
     # Key-Value
-    for s_name, f in key_fields.items():
-        name = f.name
-        sp = sexp_field.from_field(f)
-        if s_name not in key_values:
-            if sp.multidict and not f.default_factory or f.default:
-                base_type = get_origin(f.type) or f.type
-                value_dict[name] = base_type()
-            # will be automatically filled by factory
+    # (name, sp, converter, default_type)
+    key_parsers: list[tuple[str, sexp_field, Callable[[Any], Any], type | None]] = []
+    for name, f in key_fields.items():
+        sp = sps[name]
+        default_type = None
+        if sp.multidict and not f.default_factory or f.default:
+            default_type = get_origin(f.type) or f.type
+
+        if not sp.multidict:
+            key_parsers.append((name, sp, _get_converter(f.type), default_type))
             continue
 
-        values = key_values[s_name]
-        if sp.multidict:
-            origin = get_origin(f.type)
-            args = get_args(f.type)
-            if origin is list:
-                val_t = args[0]
-                value_dict[name] = [_convert(_val[1:], val_t) for _val in values]
-            elif origin is dict:
-                if not sp.key:
-                    raise ValueError(f"Key function required for multidict: {f.name}")
-                key_t = args[0]
-                val_t = args[1]
-                converted_values = [_convert(_val[1:], val_t) for _val in values]
+        origin = get_origin(f.type)
+        args = get_args(f.type)
+        if origin is list:
+            c = _get_converter(args[0])
+
+            def _parse_multi_list(values, c=c, lazy=sp.lazy):
+                if lazy and _lazy_decode.get():
+                    return LazyList(values, c)
+                return [c(_val[1:]) for _val in values]
+
+            parser = _parse_multi_list
+        elif origin is dict:
+            if not sp.key:
+                raise ValueError(f"Key function required for multidict: {f.name}")
+
+            def _parse_multi_dict(
+                values, c=_get_converter(args[1]), key_t=args[0], f=f, sp=sp
+            ):
+                converted_values = [c(_val[1:]) for _val in values]
                 values_with_key = [(sp.key(_val), _val) for _val in converted_values]
 
                 if not all(isinstance(k, key_t) for k, _ in values_with_key):
@@ -182,146 +310,365 @@ def _decode[T](sexp: netlist_type, t: type[T]) -> T:
                     )
                 if d := duplicates(values_with_key, key=lambda v: v[0]):
                     raise ValueError(f"Duplicate keys: {d}")
-                value_dict[name] = dict(values_with_key)
-            else:
+                return dict(values_with_key)
+
+            parser = _parse_multi_dict
+        else:
+
+            def _parse_multi_not_supported(values, origin=origin, f=f):
                 raise NotImplementedError(
                     f"Multidict not supported for {origin} in field {f}"
                 )
-        else:
-            assert len(values) == 1, f"Duplicate key: {name}"
-            value_dict[name] = _convert(values[0][1:], f.type)
+
+            parser = _parse_multi_not_supported
+
+        key_parsers.append((name, sp, parser, default_type))
 
     # Positional
-    for f, v in (it := zip_non_locked(positional_fields.values(), pos_values.values())):
-        # special case for missing positional empty StrEnum fields
-        if isinstance(f.type, type) and issubclass(f.type, StrEnum):
-            if "" in f.type and not isinstance(v, Symbol):
-                value_dict[f.name] = _convert(Symbol(""), f.type)
-                # only advance field iterator
-                # if no more positional fields, there shouldn't be any more values
-                if it.next(0) is None:
-                    raise ValueError(f"Unexpected symbol {v}")
+    # (name, converter, empty_str_enum)
+    pos_parsers = [
+        (
+            f.name,
+            _get_converter(f.type),
+            isinstance(f.type, type) and issubclass(f.type, StrEnum) and "" in f.type,
+        )
+        for f in positional_fields
+    ]
+
+    # Assertions
+    assertions = [
+        (name, sp.assert_value)
+        for name, sp in sps.items()
+        if sp.assert_value is not None
+    ]
+
+    def _decode_compiled(sexp: netlist_type) -> T:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"parse into: {t.__name__} {'-'*40}")
+            logger.debug(f"sexp: {sexp}")
+
+        value_dict = {}
+
+        # Values
+        key_values: dict[str, list] = {}
+        pos_values = []
+        for val in sexp:
+            if isinstance(val, list):
+                if len(val) and isinstance(key := val[0], Symbol):
+                    if (s_name := key_lookup.get(key)) is not None:
+                        if s_name in key_values:
+                            key_values[s_name].append(val)
+                        else:
+                            key_values[s_name] = [val]
+                    continue
+                pos_values.append(val)
+            elif isinstance(val, (str, int, float, Symbol, bool)):
+                pos_values.append(val)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"key_fields: {list(key_fields.keys())}")
+            logger.debug(
+                f"positional_fields: {list(f.name for f in positional_fields)}"
+            )
+            logger.debug(f"key_values: {list(key_values.keys())}")
+            logger.debug(f"pos_values: {pos_values}")
+
+        # Parse --------------------------------------------------------------
+
+        # Key-Value
+        for name, sp, parser, default_type in key_parsers:
+            if name not in key_values:
+                if default_type is not None:
+                    value_dict[name] = default_type()
+                # will be automatically filled by factory
                 continue
 
-        value_dict[f.name] = _convert(v, f.type)
+            values = key_values[name]
+            if sp.multidict:
+                value_dict[name] = parser(values)
+            else:
+                assert len(values) == 1, f"Duplicate key: {name}"
+                value_dict[name] = parser(values[0][1:])
+
+        # Positional
+        pos_fields = iter(pos_parsers)
+        for v in pos_values:
+            skipped = False
+            for name, c, empty_str_enum in pos_fields:
+                # special case for missing positional empty StrEnum fields
+                if empty_str_enum and not isinstance(v, Symbol):
+                    value_dict[name] = c(Symbol(""))
+                    # only advance field iterator
+                    skipped = True
+                    continue
+                value_dict[name] = c(v)
+                break
+            else:
+                # if no more positional fields, there shouldn't be any more values
+                if skipped:
+                    raise ValueError(f"Unexpected symbol {v}")
+                break
 
-    # Check assertions ----------------------------------------------------
-    for f in fs:
-        sp = sexp_field.from_field(f)
-        if sp.assert_value is not None:
-            assert value_dict[f.name] == sp.assert_value, (
-                f"Fileformat assertion! {f.name} has to be"
-                f" {sp.assert_value} but is {value_dict[f.name]}"
+        # Check assertions ----------------------------------------------------
+        for name, assert_value in assertions:
+            assert value_dict[name] == assert_value, (
+                f"Fileformat assertion! {name} has to be"
+                f" {assert_value} but is {value_dict[name]}"
             )
 
-    if logger.isEnabledFor(logging.DEBUG):
-        logger.debug(f"value_dict: {value_dict}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"value_dict: {value_dict}")
 
-    try:
-        return t(**value_dict)
-    except TypeError as e:
-        raise TypeError(f"Failed to create {t} with {value_dict}") from e
+        try:
+            return t(**value_dict)
+        except TypeError as e:
+            raise TypeError(f"Failed to create {t} with {value_dict}") from e
 
+    return _decode_compiled
 
-def _convert2(val: Any) -> netlist_obj | None:
-    if val is None:
-        return None
-    if is_dataclass(val):
-        return _encode(val)
-    if isinstance(val, list):
-        return [_convert2(v) for v in val]
-    if isinstance(val, tuple):
-        return [_convert2(v) for v in val]
-    if isinstance(val, dict):
-        return [_convert2(v) for v in val.values()]
-    if isinstance(val, SymEnum):
-        return Symbol(val)
-    if isinstance(val, StrEnum):
-        return str(val)
-    if isinstance(val, IntEnum):
-        return int(val)
-    if isinstance(val, Enum):
-        return Symbol(val)
-    if isinstance(val, bool):
-        return Symbol("yes" if val else "no")
-    if isinstance(val, float):
-        if val.is_integer():
-            return int(val)
-        return val
-    if isinstance(val, (str, int)):
-        return val
 
-    return str(val)
+def _get_decoder[T](t: type[T]) -> Callable[[netlist_type], T]:
+    try:
+        return _decoders[t]
+    except KeyError:
+        pass
+    d = _decoders[t] = _make_decoder(t)
+    return d
 
 
-def _encode(t) -> netlist_type:
+def _decode[T](sexp: netlist_type, t: type[T]) -> T:
+    return _get_decoder(t)(sexp)
+
+
+def _make_field_table(t: type) -> list[tuple[str, bool, Any, Symbol]]:
     if not is_dataclass(t):
         raise TypeError(f"{t} is not a dataclass type")
 
-    sexp: netlist_type = []
+    fs = [(f, sexp_field.from_field(f)) for f in fields(t)]
+
+    # (name, positional, multidict origin, key symbol)
+    return [
+        (
+            f.name,
+            sp.positional,
+            get_origin(f.type) if sp.multidict else None,
+            Symbol(f.name.removesuffix("s") if sp.multidict else f.name),
+        )
+        for f, sp in sorted(fs, key=lambda x: (not x[1].positional, x[1].order))
+    ]
 
-    def _append(_val):
-        if val is None:
-            return
-        sexp.append(_val)
 
-    fs = [(f, sexp_field.from_field(f)) for f in fields(t)]
+# Streaming --------------------------------------------------------------------
+# Writes the dataclasses directly into a PrettySexpWriter, without building the
+# sexp tree first.
 
-    for f, sp in sorted(fs, key=lambda x: (not x[1].positional, x[1].order)):
-        name = f.name
-        val = getattr(t, name)
+_ValueWriter = Callable[[Any, PrettySexpWriter], None]
 
-        if sp.positional:
-            _append(_convert2(val))
-            continue
+# type -> (write value, write items of list-like value or None)
+_value_writers: dict[type, tuple[_ValueWriter, _ValueWriter | None]] = {}
+_field_writers: dict[type, _ValueWriter] = {}
 
-        def _append_kv(name, v):
-            converted = _convert2(v)
-            if converted is None:
-                return
-            if isinstance(converted, list):
-                _append([Symbol(name), *converted])
-                return
-            _append([Symbol(name), converted])
+_STRING_ESCAPES = str.maketrans(dict(String._lisp_quoted_specials))
+_SYMBOL_ESCAPES = str.maketrans(dict(Symbol._lisp_quoted_specials))
+_symbol_tokens: dict[str, str] = {}
 
-        if sp.multidict:
-            if isinstance(val, list):
-                assert get_origin(f.type) is list
-                _val = val
-            elif isinstance(val, dict):
-                assert get_origin(f.type) is dict
-                _val = val
-                _val = val.values()
+
+def _symbol_token(val: str) -> str:
+    try:
+        return _symbol_tokens[val]
+    except KeyError:
+        pass
+    token = _symbol_tokens[val] = val.translate(_SYMBOL_ESCAPES)
+    return token
+
+
+def _string_token(val: str) -> str:
+    return '"' + val.translate(_STRING_ESCAPES) + '"'
+
+
+def _number_token(val: float) -> str:
+    if val.is_integer():
+        return str(int(val))
+    return str(val)
+
+
+def _write_raw(val, w: PrettySexpWriter):
+    if isinstance(val, list):
+        w.open()
+        for v in val:
+            _write_raw(v, w)
+        w.close()
+    elif isinstance(val, Symbol):
+        w.atom(_symbol_token(val))
+    elif isinstance(val, str):
+        w.atom(_string_token(val))
+    elif isinstance(val, bool):
+        w.atom("t" if val else "()")
+    elif val is None:
+        w.atom("()")
+    else:
+        w.atom(str(val))
+
+
+def _write_value(val, w: PrettySexpWriter):
+    _get_value_writer(type(val))[0](val, w)
+
+
+def _make_value_writer(t: type) -> tuple[_ValueWriter, _ValueWriter | None]:
+    def _write_listlike(items: _ValueWriter) -> _ValueWriter:
+        def _write(val, w: PrettySexpWriter):
+            w.open()
+            items(val, w)
+            w.close()
+
+        return _write
+
+    def _atom(to_token: Callable[[Any], str]) -> _ValueWriter:
+        return lambda val, w: w.atom(to_token(val))
+
+    if t is type(None):
+        return _atom(lambda val: "()"), None
+    if is_dataclass(t):
+        fields_writer = _get_field_writer(t)
+        return _write_listlike(fields_writer), fields_writer
+    if issubclass(t, (list, tuple)):
+
+        def _write_list_items(val, w: PrettySexpWriter):
+            for v in val:
+                _write_value(v, w)
+
+        return _write_listlike(_write_list_items), _write_list_items
+    if issubclass(t, dict):
+
+        def _write_dict_items(val, w: PrettySexpWriter):
+            for v in val.values():
+                _write_value(v, w)
+
+        return _write_listlike(_write_dict_items), _write_dict_items
+    if issubclass(t, SymEnum):
+        return _atom(lambda val: _symbol_token(str(val))), None
+    if issubclass(t, StrEnum):
+        return _atom(lambda val: _string_token(str(val))), None
+    if issubclass(t, IntEnum):
+        return _atom(lambda val: str(int(val))), None
+    if issubclass(t, Enum):
+        return _atom(lambda val: _symbol_token(str(val))), None
+    if issubclass(t, bool):
+        return _atom(lambda val: "yes" if val else "no"), None
+    if issubclass(t, float):
+        return _atom(_number_token), None
+    if issubclass(t, Symbol):
+        return _atom(_symbol_token), None
+    if issubclass(t, str):
+        return _atom(_string_token), None
+    if issubclass(t, int):
+        return _atom(str), None
+
+    return _atom(lambda val: _string_token(str(val))), None
+
+
+def _get_value_writer(t: type) -> tuple[_ValueWriter, _ValueWriter | None]:
+    try:
+        return _value_writers[t]
+    except KeyError:
+        pass
+    vw = _value_writers[t] = _make_value_writer(t)
+    return vw
+
+
+def _make_field_writer(t: type) -> _ValueWriter:
+    field_table = [
+        (name, positional, multidict_origin, _symbol_token(sym))
+        for name, positional, multidict_origin, sym in _make_field_table(t)
+    ]
+
+    def _write_fields(obj, w: PrettySexpWriter):
+        for name, positional, multidict_origin, sym in field_table:
+            val = getattr(obj, name)
+            if val is None:
+                continue
+
+            if positional:
+                _write_value(val, w)
+                continue
+
+            if multidict_origin is not None:
+                if isinstance(val, LazyList) and not val.is_materialized:
+                    for raw in val.raw:
+                        _write_raw(raw, w)
+                    continue
+                if isinstance(val, list):
+                    assert multidict_origin is list
+                    _val = val
+                elif isinstance(val, dict):
+                    assert multidict_origin is dict
+                    _val = val.values()
+                else:
+                    raise TypeError()
             else:
-                raise TypeError()
+                _val = (val,)
+
             for v in _val:
-                _append_kv(f.name.removesuffix("s"), v)
-        else:
-            _append_kv(f.name, val)
+                if v is None:
+                    continue
+                write_value, write_items = _get_value_writer(type(v))
+                w.open()
+                w.atom(sym)
+                if write_items is not None:
+                    write_items(v, w)
+                else:
+                    write_value(v, w)
+                w.close()
+
+    return _write_fields
 
-    if logger.isEnabledFor(logging.DEBUG):
-        logger.debug(f"Dumping {type(t).__name__} {'-'*40}")
-        logger.debug(f"Obj: {t}")
-        logger.debug(f"Sexp: {sexp}")
 
-    return sexp
+def _get_field_writer(t: type) -> _ValueWriter:
+    try:
+        return _field_writers[t]
+    except KeyError:
+        pass
+    fw = _field_writers[t] = _make_field_writer(t)
+    return fw
 
 
-def loads[T](s: str | Path | list, t: type[T]) -> T:
+def loads[T](s: str | Path | list, t: type[T], lazy: bool = False) -> T:
+    """
+    :param lazy: Decode fields marked with sexp_field(lazy=True) only on first
+    access. Until then their raw sexp is kept and dumped verbatim.
+    """
     text = s
     sexp = s
     if isinstance(s, Path):
         text = s.read_text()
     if isinstance(text, str):
-        sexp = sexpdata.loads(text)
+        if PARSER == Parsers.FAST:
+            sexp = parser.loads(text)
+        else:
+            sexp = sexpdata.loads(text)
 
-    return _decode([sexp], t)
+    token = _lazy_decode.set(lazy)
+    try:
+        return _decode([sexp], t)
+    finally:
+        _lazy_decode.reset(token)
+
+
+def dump(obj, fp: TextIO):
+    """
+    Write obj as KiCAD formatted sexp into fp in a single pass.
+    """
+    if not is_dataclass(obj):
+        raise TypeError(f"{obj} is not a dataclass type")
+    w = PrettySexpWriter(fp)
+    _get_field_writer(type(obj))(obj, w)
+    w.finish()
 
 
 def dumps(obj, path: Path | None = None) -> str:
-    sexp = _encode(obj)[0]
-    text = sexpdata.dumps(sexp)
-    text = prettify_sexp_string(text)
+    buf = io.StringIO()
+    dump(obj, buf)
+    text = buf.getvalue()
     if path:
         path.write_text(text)
     return text
@@ -329,12 +676,45 @@ def dumps(obj, path: Path | None = None) -> str:
 
 class SEXP_File:
     @classmethod
-    def loads(cls, path_or_string_or_data: Path | str | list):
-        return loads(path_or_string_or_data, cls)
+    def loads(cls, path_or_string_or_data: Path | str | list, lazy: bool = False):
+        return loads(path_or_string_or_data, cls, lazy=lazy)
 
     def dumps(self, path: Path | None = None):
         return dumps(self, path)
 
+    def dump(self, path_or_fp: Path | TextIO):
+        if isinstance(path_or_fp, Path):
+            return _dump_atomic(self, path_or_fp)
+        return dump(self, path_or_fp)
+
+
+def _dump_atomic(obj, path: Path):
+    """
+    Stream into a temporary file next to path and replace path with it,
+    so a failing encoder never leaves a truncated file behind.
+    """
+    # replace the link target, not the link
+    path = path.resolve()
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", text=True)
+    try:
+        with os.fdopen(fd, "w") as fp:
+            dump(obj, fp)
+        if path.exists():
+            shutil.copymode(path, tmp)
+        else:
+            # mkstemp creates 0600, new files should follow the umask like open()
+            os.chmod(tmp, 0o666 & ~_get_umask())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _get_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
 
 # TODO move
 class JSON_File:
@@ -0,0 +1,119 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import logging
+import re
+
+import sexpdata
+from sexpdata import String, Symbol
+
+logger = logging.getLogger(__name__)
+
+"""
+Fast s-expression reader for the subset of sexp used by KiCAD files.
+
+Produces exactly the same list structure as `sexpdata.loads` (with its default
+settings), but tokenizes with a single regex and caches atom conversion, so
+every distinct symbol/number is only converted once (symbols are interned).
+
+Anything outside of the supported subset (brackets, quotes, comments,
+escaped atoms, unbalanced parentheses) falls back to `sexpdata.loads`,
+which also takes care of raising the appropriate errors.
+"""
+
+_WS = " \t\n\r\x0b\x0c"
+
+_TOKEN_RE = re.compile(
+    r"[()]"
+    # string (with quotes)
+    r'|"[^"\\]*(?:\\.[^"\\]*)*"'
+    # plain atom
+    rf"|[^{_WS}()\[\]\"'\\;][^{_WS}()\[\]\"\\;]*"
+    # anything else -> unsupported
+    rf"|[^{_WS}]",
+    re.DOTALL,
+)
+_UNSUPPORTED = "[]'\\;\""
+
+_ESCAPE_RE = re.compile(r"\\(.)", re.DOTALL)
+
+_NIL = "nil"
+_TRUE = "t"
+
+
+class _Unsupported(Exception): ...
+
+
+def _unescape(s: str) -> str:
+    return _ESCAPE_RE.sub(lambda m: String.unquote(m.group(0)), s)
+
+
+def _atom(token: str):
+    if token == _TRUE:
+        return True
+    try:
+        return int(token)
+    except ValueError:
+        try:
+            return float(token)
+        except ValueError:
+            return Symbol(token)
+
+
+def _parse(text: str) -> list:
+    atoms: dict[str, object] = {}
+    stack: list[list] = []
+    cur: list = []
+    append = cur.append
+
+    for token in _TOKEN_RE.findall(text):
+        c = token[0]
+        if c == "(":
+            new: list = []
+            append(new)
+            stack.append(cur)
+            cur = new
+            append = new.append
+        elif c == ")":
+            if not stack:
+                raise _Unsupported()
+            cur = stack.pop()
+            append = cur.append
+        elif c == '"' and len(token) > 1:
+            s = token[1:-1]
+            if "\\" in s:
+                s = _unescape(s)
+            append(s)
+        else:
+            try:
+                append(atoms[token])
+            except KeyError:
+                if c in _UNSUPPORTED:
+                    raise _Unsupported()
+                if token == _NIL:
+                    # mutable, can't be cached
+                    append([])
+                    continue
+                val = atoms[token] = _atom(token)
+                append(val)
+
+    if stack:
+        raise _Unsupported()
+
+    return cur
+
+
+def loads(text: str):
+    """
+    Drop-in replacement for `sexpdata.loads` for KiCAD files.
+    """
+    try:
+        out = _parse(text)
+    except _Unsupported:
+        logger.debug("Unsupported sexp for fast parser, falling back to sexpdata")
+        return sexpdata.loads(text)
+
+    if len(out) != 1:
+        return sexpdata.loads(text)
+
+    return out[0]
@@ -2,6 +2,8 @@
 # SPDX-License-Identifier: MIT
 
 import logging
+import re
+from typing import TextIO
 
 logger = logging.getLogger(__name__)
 
@@ -30,3 +32,100 @@ def prettify_sexp_string(raw: str) -> str:
     # if i > 0 no strip is a kicad bug(?) workaround
     out = "\n".join(x.rstrip() if i > 0 else x for i, x in enumerate(out.splitlines()))
     return out
+
+
+# str.splitlines() boundaries
+_LINEBREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+# atoms that can be written as a whole (outside of quotes)
+_CLEAN_ATOM_RE = re.compile(rf'"[^"{_LINEBREAKS}]*"|[^" (){_LINEBREAKS}]+')
+
+
+class PrettySexpWriter:
+    """
+    Streaming equivalent of `prettify_sexp_string(sexpdata.dumps(sexp))`.
+
+    Takes sexp tokens (open, close, rendered atoms) and writes the formatted
+    output line by line to `fp`, so only the current line is kept in memory.
+    Atoms that could interact with the prettify rules (quotes, parens, spaces,
+    line breaks) are fed character by character to stay byte-identical.
+    """
+
+    def __init__(self, fp: TextIO) -> None:
+        self._fp = fp
+        self._line: list[str] = []
+        self._first_line = True
+        self._level = 0
+        self._in_quotes = False
+        # last char of the not yet line-split output
+        self._last = ""
+        # last char was \r, \r\n is a single line break
+        self._cr = False
+        self._need_sep = False
+
+    def open(self):
+        if self._need_sep:
+            self._feed(" ")
+        self._feed("(")
+        self._need_sep = False
+
+    def close(self):
+        self._feed(")")
+        self._need_sep = True
+
+    def atom(self, token: str):
+        if self._need_sep:
+            self._feed(" ")
+        self._need_sep = True
+
+        if not self._in_quotes and _CLEAN_ATOM_RE.fullmatch(token):
+            self._line.append(token)
+            self._last = token[-1]
+            self._cr = False
+            return
+
+        for c in token:
+            self._feed(c)
+
+    def finish(self):
+        if self._line:
+            self._end_line()
+
+    def _feed(self, c: str):
+        if c == '"':
+            self._in_quotes = not self._in_quotes
+        if self._in_quotes:
+            pass
+        elif c == "\n":
+            return
+        elif c == " " and self._last == " ":
+            return
+        elif c == "(":
+            if self._level != 0:
+                self._out("\n" + " " * 4 * self._level)
+            self._level += 1
+        elif c == ")":
+            self._level -= 1
+        self._out(c)
+
+    def _out(self, s: str):
+        for c in s:
+            if c in _LINEBREAKS:
+                if c == "\n" and self._cr:
+                    self._cr = False
+                    continue
+                self._end_line()
+                self._cr = c == "\r"
+                continue
+            self._line.append(c)
+            self._cr = False
+        self._last = s[-1]
+
+    def _end_line(self):
+        line = "".join(self._line)
+        self._line = []
+        if self._first_line:
+            # no strip is a kicad bug(?) workaround
+            self._first_line = False
+            self._fp.write(line)
+        else:
+            self._fp.write("\n" + line.rstrip())
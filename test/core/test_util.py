@@ -6,7 +6,11 @@ import unittest
 from faebryk.core.module import Module
 from faebryk.core.moduleinterface import ModuleInterface
 from faebryk.core.node import Node
-from faebryk.core.util import get_node_tree, iter_tree_by_depth
+from faebryk.core.util import (
+    get_node_tree,
+    get_node_tree_view,
+    iter_tree_by_depth,
+)
 from faebryk.libs.library import L
 
 
@@ -46,3 +50,50 @@ class TestUtil(unittest.TestCase):
             assertEqual(levels[i], [n_i.n, n_i.mif])
             n_i = n_i.n
         assertEqual(levels[level_count + 1], [n_i.mif])
+
+    def test_tree_view(self):
+        class N(Module):
+            mif: ModuleInterface
+            children_ = L.list_field(2, Module)
+
+        n = N()
+        view = get_node_tree_view(n)
+
+        self.assertEqual(
+            [sorted(map(id, level)) for level in view.iter_levels()],
+            [sorted(map(id, level)) for level in iter_tree_by_depth(get_node_tree(n))],
+        )
+        self.assertEqual(view.depth, 2)
+        for node, parent, depth in zip(view.nodes, view.parents, view.depths):
+            if parent < 0:
+                self.assertIs(node, n)
+                continue
+            self.assertIs(node.get_parent()[0], view.nodes[parent])
+            self.assertEqual(depth, view.depths[parent] + 1)
+
+        # cached until the graph changes
+        self.assertIs(get_node_tree_view(n), view)
+        added = n.add(Module())
+        view = get_node_tree_view(n)
+        self.assertIn(added, view.level(1))
+        self.assertEqual(len(view.nodes), 5)
+        self.assertIsNot(get_node_tree_view(n, include_mifs=False), view)
+
+    def test_tree_view_remove_and_add(self):
+        class N(Module):
+            children_ = L.list_field(2, Module)
+
+        n = N()
+        moved, new_parent = n.children_
+        view = get_node_tree_view(n)
+        g = n.get_graph()
+        counts = g.node_cnt, g.edge_cnt
+
+        # same node & edge count, different tree
+        g.remove_edge(moved.parent, n.children)
+        new_parent.add(moved)
+        self.assertEqual((g.node_cnt, g.edge_cnt), counts)
+
+        view = get_node_tree_view(n)
+        self.assertIn(moved, view.level(2))
+        self.assertNotIn(moved, view.level(1))
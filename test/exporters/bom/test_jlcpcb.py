@@ -0,0 +1,68 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from faebryk.exporters.bom.jlcpcb import BOMLine, _compact_bomlines, _write_bomlines
+
+
+def _line(designator: str, lcsc: str, value: str = "10k") -> BOMLine:
+    return BOMLine(
+        Designator=designator,
+        Footprint="R0402",
+        Quantity=1,
+        Value=value,
+        Manufacturer="m",
+        Partnumber="p",
+        LCSC_Partnumber=lcsc,
+    )
+
+
+class TestBomJLCPCB(unittest.TestCase):
+    def test_compact(self):
+        lines = [
+            _line("R10", "C1"),
+            _line("C1", "C2", "1uF"),
+            _line("R2", "C1"),
+            _line("R1", "C1"),
+            _line("C3", "C2", "1uF"),
+        ]
+        with self.assertNoLogs(level="WARNING"):
+            compact = _compact_bomlines(lines)
+
+        self.assertEqual(
+            [(line.Designator, line.Quantity) for line in compact],
+            [("R1, R2, R10", 3), ("C1, C3", 2)],
+        )
+
+    def test_compact_mismatch(self):
+        with self.assertLogs(level="WARNING"):
+            _compact_bomlines([_line("R1", "C1"), _line("R2", "C1", "1k")])
+
+    def test_write(self):
+        lines = [_line(f"R{i}", f"C{i % 3}") for i in range(1, 8)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bom" / "bom.csv"
+            _write_bomlines(lines, path)
+            self.assertEqual(
+                path.read_text().splitlines(),
+                [
+                    "Designator,Footprint,Quantity,Value,Manufacturer,Partnumber,"
+                    "LCSC Part #",
+                    '"R1, R4, R7",R0402,3,10k,m,p,C1',
+                    '"R2, R5",R0402,2,10k,m,p,C2',
+                    '"R3, R6",R0402,2,10k,m,p,C0',
+                ],
+            )
+
+    def test_write_empty(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "bom.csv"
+            _write_bomlines([], path)
+            self.assertEqual(len(path.read_text().splitlines()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
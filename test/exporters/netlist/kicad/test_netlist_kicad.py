@@ -214,3 +214,62 @@ class TestNetlist(unittest.TestCase):
 
         ok, _ = _test_netlist_graph()
         self.assertTrue(ok)
+
+    def test_net_extraction(self):
+        from faebryk.core.util import get_all_nodes_of_type
+
+        resistors = [F.Resistor() for _ in range(3)]
+        vcc = F.Net.with_name("VCC")
+        vcc.part_of.connect(resistors[0].unnamed[0])
+        for r1, r2 in zip(resistors[:-1], resistors[1:]):
+            r1.unnamed[0].connect(r2.unnamed[0])
+        resistors[0].unnamed[1].connect(resistors[1].unnamed[1])
+
+        for r in resistors:
+            r.get_trait(F.can_attach_to_footprint).attach(
+                F.SMDTwoPin(F.SMDTwoPin.Type._0805)
+            )
+
+        G = resistors[0].get_graph()
+        attach_random_designators(G)
+        override_names_with_designators(G)
+        attach_nets_and_kicad_info(G)
+
+        nets = get_all_nodes_of_type(G, F.Net)
+        # vcc, shared pin 2 of r0/r1, pin 2 of r2
+        self.assertEqual(len(nets), 3)
+        self.assertEqual(len(vcc.get_fps()), 3)
+        self.assertEqual(sorted(len(n.get_fps()) for n in nets), [1, 2, 3])
+
+        (net,) = (n for n in nets if len(n.get_fps()) == 1)
+        name = net.get_trait(F.has_overriden_name).get_name()
+        self.assertIs(net.get_trait(F.has_overriden_name).get_name(), name)
+
+        # precomputed memberships and names are dropped once the net changes
+        resistors[2].unnamed[1].connect(resistors[0].unnamed[1])
+        self.assertEqual(len(net.get_fps()), 3)
+        self.assertNotEqual(net.get_trait(F.has_overriden_name).get_name(), name)
+
+    def test_net_name_follows_designators(self):
+        from faebryk.core.util import get_all_nodes_of_type
+
+        resistors = [F.Resistor() for _ in range(2)]
+        resistors[0].unnamed[0].connect(resistors[1].unnamed[0])
+        for r in resistors:
+            r.get_trait(F.can_attach_to_footprint).attach(
+                F.SMDTwoPin(F.SMDTwoPin.Type._0805)
+            )
+
+        G = resistors[0].get_graph()
+        attach_nets_and_kicad_info(G)
+        (net,) = (n for n in get_all_nodes_of_type(G, F.Net) if len(n.get_fps()) == 2)
+        before = net.get_trait(F.has_overriden_name).get_name()
+
+        attach_random_designators(G)
+        override_names_with_designators(G)
+
+        after = net.get_trait(F.has_overriden_name).get_name()
+        self.assertIs(net.get_trait(F.has_overriden_name).get_name(), after)
+        self.assertNotEqual(after, before)
+        for r in resistors:
+            self.assertIn(r.get_trait(F.has_designator).get_designator(), after)
@@ -0,0 +1,156 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from textwrap import dedent
+from unittest.mock import patch
+
+from faebryk.core.module import Module
+from faebryk.exporters.pcb.kicad.artifacts import ArtifactCache, export_step
+from faebryk.libs.app.manufacturing import export_pcba_artifacts
+
+# records (export, start, end) per call to FAKE_KICAD_CLI_LOG
+FAKE_KICAD_CLI = dedent(
+    """
+    import os, sys, time
+    from pathlib import Path
+
+    args = sys.argv[1:]
+    if args == ["--version"]:
+        print("8.0.0")
+        sys.exit(0)
+
+    export = args[2]
+    start = time.time()
+    print(f"exporting {export}", flush=True)
+    if export == os.environ.get("FAKE_KICAD_CLI_FAIL"):
+        sys.exit(1)
+    time.sleep(float(os.environ.get("FAKE_KICAD_CLI_SLEEP", "0")))
+
+    out = args[args.index("--output") + 1]
+    if out.endswith("/"):
+        out = out + export
+    Path(out).write_text("Ref,Val,Package,PosX,PosY,Rot,Side\\n")
+    with open(os.environ["FAKE_KICAD_CLI_LOG"], "a") as f:
+        f.write(f"{export} {start} {time.time()}\\n")
+    """
+)
+
+
+class TestArtifacts(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+        bin = self.tmp / "bin"
+        bin.mkdir()
+        cli = bin / "kicad-cli"
+        cli.write_text(f"#!{sys.executable}\n{FAKE_KICAD_CLI}")
+        cli.chmod(cli.stat().st_mode | stat.S_IEXEC)
+
+        self.pcb = self.tmp / "test.kicad_pcb"
+        self.pcb.write_text("(kicad_pcb)")
+
+        self.log = self.tmp / "log"
+        self.env = {
+            "PATH": f"{bin}{os.pathsep}{os.environ.get('PATH', '')}",
+            "FAKE_KICAD_CLI_LOG": str(self.log),
+        }
+
+    def _export(
+        self, jobs: int | None = None, cache_dir: Path | None = None, **env: str
+    ):
+        with patch.dict(os.environ, self.env | env):
+            export_pcba_artifacts(
+                self.tmp / "out", self.pcb, Module(), jobs=jobs, cache_dir=cache_dir
+            )
+
+    def _calls(self) -> list[tuple[str, float, float]]:
+        return [
+            (name, float(start), float(end))
+            for name, start, end in (
+                line.split() for line in self.log.read_text().splitlines()
+            )
+        ]
+
+    def test_concurrent(self):
+        self._export(FAKE_KICAD_CLI_SLEEP="1")
+
+        out = self.tmp / "out"
+        for file in [
+            "jlcpcb_bom.csv",
+            "cad/pcba.step",
+            "cad/pcba.glb",
+            "cad/pcba.dxf",
+            "gerber.zip",
+            "jlcpcb_pick_and_place.csv",
+        ]:
+            self.assertTrue((out / file).exists(), file)
+
+        calls = self._calls()
+        self.assertEqual(
+            sorted(name for name, _, _ in calls),
+            ["drill", "dxf", "gerbers", "glb", "pos", "step"],
+        )
+        # independent exports overlap, only gerbers and drill are sequential
+        span = max(end for _, _, end in calls) - min(start for _, start, _ in calls)
+        self.assertLess(span, sum(end - start for _, start, end in calls) / 2)
+
+    def test_job_limit(self):
+        self._export(jobs=1)
+
+        calls = sorted(self._calls(), key=lambda c: c[1])
+        for (_, _, end), (_, start, _) in zip(calls, calls[1:]):
+            self.assertLessEqual(end, start)
+
+    def test_fail_fast(self):
+        now = time.time()
+        with self.assertRaises(ExceptionGroup) as ctx:
+            self._export(FAKE_KICAD_CLI_SLEEP="10", FAKE_KICAD_CLI_FAIL="glb")
+        self.assertLess(time.time() - now, 5)
+
+        self.assertEqual(len(ctx.exception.exceptions), 1)
+        self.assertIn("glb", str(ctx.exception.exceptions[0]))
+        self.assertFalse(self.log.exists())
+
+    def test_cache(self):
+        cache_dir = self.tmp / "cache"
+        out = self.tmp / "out"
+
+        self._export(cache_dir=cache_dir)
+        self.assertEqual(len(self._calls()), 6)
+        step = (out / "cad/pcba.step").read_text()
+
+        # unchanged pcb: everything restored without kicad-cli
+        shutil.rmtree(out)
+        self._export(cache_dir=cache_dir)
+        self.assertEqual(len(self._calls()), 6)
+        self.assertEqual((out / "cad/pcba.step").read_text(), step)
+        self.assertTrue((out / "jlcpcb_pick_and_place.csv").exists())
+
+        self.pcb.write_text("(kicad_pcb (version 1))")
+        self._export(cache_dir=cache_dir)
+        self.assertEqual(len(self._calls()), 12)
+
+    def test_cache_output_names(self):
+        cache = ArtifactCache(self.tmp / "cache")
+        out = self.tmp / "out"
+        out.mkdir()
+
+        with patch.dict(os.environ, self.env):
+            for name in ["a.step", "b.step", "a.step", "b.step"]:
+                cache.export(export_step, self.pcb, out / name)
+        self.assertEqual(len(self._calls()), 2)
+        self.assertTrue((out / "b.step").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
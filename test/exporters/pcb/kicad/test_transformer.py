@@ -0,0 +1,304 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import unittest
+from copy import deepcopy
+from dataclasses import fields
+from pathlib import Path
+
+import faebryk.library._F  # noqa: F401  # transformer needs the library loaded
+from faebryk.core.module import Module
+from faebryk.exporters.pcb.kicad.transformer import (
+    PCB_Transformer,
+    flip_layer,
+    get_all_geos,
+    get_fp_bbox,
+    get_pad_bbox,
+)
+from faebryk.libs.geometry.basic import Geometry
+from faebryk.libs.geometry.spatial import bbox_distance, bbox_intersects
+from faebryk.libs.kicad.fileformats import (
+    C_effects,
+    C_fp_text,
+    C_kicad_pcb_file,
+    C_text_layer,
+    C_xyr,
+)
+from faebryk.libs.sexp.dataclass_sexp import LazyList
+from faebryk.libs.util import find
+
+TEST_DIR = find(
+    Path(__file__).parents,
+    lambda p: p.name == "test" and (p / "common/resources").is_dir(),
+)
+PCBFILE = TEST_DIR / "common/resources/test.kicad_pcb"
+
+Footprint = C_kicad_pcb_file.C_kicad_pcb.C_pcb_footprint
+Pad = Footprint.C_pad
+
+
+def _move_fp_reference(transformer: PCB_Transformer, fp, coord: C_xyr, layer: str):
+    if any(x.text == "FBRK:notouch" for x in fp.fp_texts):
+        return
+
+    rot_angle = (coord.r - fp.at.r) % 360
+    if rot_angle:
+        for obj in fp.pads + fp.fp_texts + list(fp.propertys.values()):
+            obj.at.r = (obj.at.r + rot_angle) % 360
+    fp.at = coord
+
+    def _flip(x: str):
+        return x.replace("F.", "<F>.").replace("B.", "F.").replace("<F>.", "B.")
+
+    if fp.layer != layer:
+        fp.layer = _flip(fp.layer)
+        for pad in fp.pads:
+            pad.layers = [_flip(x) for x in pad.layers]
+        for geo in get_all_geos(fp):
+            geo.layer = _flip(geo.layer)
+        for text in fp.fp_texts + list(fp.propertys.values()):
+            text.layer.layer = _flip(text.layer.layer)
+
+    if not any(x.text == "FBRK:autoplaced" for x in fp.fp_texts):
+        fp.fp_texts.append(
+            C_fp_text(
+                type=C_fp_text.E_type.user,
+                text="FBRK:autoplaced",
+                at=C_xyr(0, 0, rot_angle),
+                effects=C_effects(transformer.font),
+                uuid=transformer.gen_uuid(mark=True),
+                layer=C_text_layer("User.5"),
+            )
+        )
+
+
+class TestTransformer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pcb = C_kicad_pcb_file.loads(PCBFILE, lazy=True).kicad_pcb
+        app = Module()
+        self.transformer = PCB_Transformer(self.pcb, app.get_graph(), app)
+
+    def _lazy_untouched(self) -> bool:
+        return all(
+            not holder.is_materialized
+            for f in fields(self.pcb)
+            if isinstance(holder := getattr(self.pcb, f.name), LazyList)
+        )
+
+    def test_net_obj_bbox(self):
+        net = find(self.pcb.nets, lambda n: n.name == "D1-1-R1-1")
+        pads = [
+            (fp, pad)
+            for fp in self.pcb.footprints
+            for pad in fp.pads
+            if pad.net is not None and pad.net.number == net.number
+        ]
+        self.assertEqual(len(pads), 2)
+
+        def _expected(extra=()):
+            return Geometry.rect_to_polygon(
+                Geometry.bbox(
+                    [(fp.at.x + pad.at.x, fp.at.y + pad.at.y) for fp, pad in pads]
+                    + list(extra)
+                )
+            )
+
+        bbox = self.transformer.get_net_obj_bbox(net, "F.Cu")
+        self.assertEqual(bbox, _expected())
+        self.assertTrue(self._lazy_untouched())
+
+        self.transformer.insert_via((100, 100), net.number, (0.6, 0.3))
+        bbox = self.transformer.get_net_obj_bbox(net, "F.Cu")
+        self.assertEqual(bbox, _expected([(100, 100)]))
+
+        self.transformer._delete(self.pcb.vias[-1])
+        self.assertEqual(self.transformer.get_net_obj_bbox(net, "F.Cu"), _expected())
+
+        # pads of net are not on B.Cu
+        self.assertNotEqual(self.transformer.get_net_obj_bbox(net, "B.Cu"), _expected())
+
+    def test_objs_in_rect(self):
+        pad_bboxes = [
+            (pad, get_pad_bbox(fp, pad))
+            for fp in self.pcb.footprints
+            for pad in fp.pads
+        ]
+        rect = ((60.0, 80.0), (70.0, 90.0))
+
+        found = self.transformer.get_objs_in_rect(rect, Pad)
+        self.assertEqual(
+            sorted(map(id, found)),
+            sorted(id(pad) for pad, bbox in pad_bboxes if bbox_intersects(bbox, rect)),
+        )
+        self.assertTrue(found)
+
+        on_b = self.transformer.get_objs_in_rect(rect, Pad, layer="B.Cu")
+        self.assertTrue(all("B.Cu" in p.layers or "*.Cu" in p.layers for p in on_b))
+
+        fps = self.transformer.get_objs_in_rect(rect, Footprint)
+        self.assertEqual(
+            sorted(fp.name for fp in fps),
+            sorted(
+                fp.name
+                for fp in self.pcb.footprints
+                if bbox_intersects(get_fp_bbox(fp), rect)
+            ),
+        )
+
+    def test_nearest_objs(self):
+        fp = find(self.pcb.footprints, lambda f: f.name == "lcsc:R0402")
+        pad = fp.pads[0]
+        center = (fp.at.x + pad.at.x, fp.at.y + pad.at.y)
+
+        self.assertIs(self.transformer.get_nearest_objs(center, Pad)[0], pad)
+        self.assertIs(self.transformer.get_pad_footprint(pad), fp)
+
+        # brute force, by the same distance to the pad bbox
+        dists = sorted(
+            bbox_distance(get_pad_bbox(f, p), center)
+            for f in self.pcb.footprints
+            for p in f.pads
+        )
+        for k in [3, 10]:
+            nearest = self.transformer.get_nearest_objs(center, Pad, k=k)
+            self.assertEqual(
+                [
+                    bbox_distance(
+                        get_pad_bbox(self.transformer.get_pad_footprint(p), p), center
+                    )
+                    for p in nearest
+                ],
+                dists[:k],
+            )
+
+    def test_move_updates_index(self):
+        fp = find(self.pcb.footprints, lambda f: f.name == "lcsc:R0402")
+        self.transformer.spatial
+
+        self.transformer.move_fp(fp, C_xyr(200, 200, 0), "F.Cu")
+
+        found = self.transformer.get_objs_in_rect(((199, 199), (201, 201)), Pad)
+        self.assertEqual(sorted(map(id, found)), sorted(map(id, fp.pads)))
+        self.assertFalse(
+            any(
+                p in fp.pads
+                for p in self.transformer.get_objs_in_rect(
+                    ((60.0, 80.0), (70.0, 90.0)), Pad
+                )
+            )
+        )
+
+    def test_pad_indexes(self):
+        fp = find(self.pcb.footprints, lambda f: f.name == "lcsc:R0402")
+        pads = self.transformer.get_pads_by_name(fp)
+        self.assertIs(self.transformer.get_pads_by_name(fp), pads)
+        self.assertEqual(
+            sorted(id(p) for ps in pads.values() for p in ps),
+            sorted(map(id, fp.pads)),
+        )
+        for pad in fp.pads:
+            self.assertIn(pad, pads[pad.name])
+            self.assertIs(self.transformer.get_pad_footprint(pad), fp)
+
+    def test_delete_insert_footprint(self):
+        fp = find(self.pcb.footprints, lambda f: f.name == "lcsc:R0402")
+        key = fp.propertys["Reference"].value, fp.name
+        pads = self.transformer.get_pads_by_name(fp)
+        pad = fp.pads[0]
+        rect = get_pad_bbox(fp, pad)
+        net = pad.net
+        assert net is not None
+        self.transformer.get_net_obj_bbox(net, "F.Cu")
+
+        self.transformer._delete(fp)
+        self.assertFalse(any(f is fp for f in self.pcb.footprints))
+        self.assertNotIn(key, self.transformer._footprints)
+        self.assertNotIn(pad, self.transformer.get_objs_in_rect(rect, Pad))
+        with self.assertRaises(KeyError):
+            self.transformer.get_pad_footprint(pad)
+        self.assertFalse(
+            any(p is pad for p, _ in self.transformer._get_net_objs(net.number)[0])
+        )
+
+        # changed while out of the pcb
+        fp.pads.pop()
+        self.transformer._insert(fp)
+        self.assertIs(self.transformer._footprints[key], fp)
+        self.assertIsNot(self.transformer.get_pads_by_name(fp), pads)
+        self.assertEqual(
+            sum(map(len, self.transformer.get_pads_by_name(fp).values())),
+            len(fp.pads),
+        )
+        self.assertIn(pad, self.transformer.get_objs_in_rect(rect, Pad))
+        self.assertIs(self.transformer.get_pad_footprint(pad), fp)
+
+    def test_delete_matching(self):
+        self.transformer.insert_via((100, 100), 1, (0.6, 0.3))
+        via = self.pcb.vias[-1]
+        count = len(self.pcb.vias)
+
+        # equal copy falls back to equality, like list.remove
+        self.transformer._delete(deepcopy(via))
+        self.assertEqual(len(self.pcb.vias), count - 1)
+        self.assertFalse(any(v is via for v in self.pcb.vias))
+        with self.assertRaises(KeyError):
+            self.transformer.get_marked(via.uuid)
+
+        with self.assertRaises(ValueError):
+            self.transformer._delete(via)
+
+    def test_move_fps_like_move_fp(self):
+        def _moves(pcb):
+            return [
+                (fp, C_xyr(10 * i, 5 * i, (30 * i) % 360), ["F.Cu", "B.Cu"][i % 2])
+                for i, fp in enumerate(pcb.footprints)
+            ]
+
+        def _normalized(pcb):
+            for fp in pcb.footprints:
+                for text in fp.fp_texts:
+                    if text.text == "FBRK:autoplaced":
+                        text.uuid = None
+            return pcb.footprints
+
+        moves = _moves(self.pcb)
+        self.assertTrue(any(fp.layer != layer for fp, _, layer in moves))
+        self.assertTrue(any(fp.at.r != coord.r for fp, coord, _ in moves))
+        # twice in one batch, flipping back
+        fp, coord, layer = moves[0]
+        moves.append((fp, C_xyr(1, 2, 90), fp.layer))
+        self.transformer.move_fps(moves)
+
+        # sequential move_fp calls and the straightforward per footprint move
+        for move_fp in [PCB_Transformer.move_fp, _move_fp_reference]:
+            sequential = C_kicad_pcb_file.loads(PCBFILE).kicad_pcb
+            app = Module()
+            transformer = PCB_Transformer(sequential, app.get_graph(), app)
+            moves = _moves(sequential)
+            moves.append((moves[0][0], C_xyr(1, 2, 90), moves[0][0].layer))
+            for move in moves:
+                move_fp(transformer, *move)
+
+            self.assertEqual(_normalized(self.pcb), _normalized(sequential))
+
+        flipped = [fp for i, fp in enumerate(sequential.footprints) if i % 2][0]
+        self.assertEqual(flipped.layer, "B.Cu")
+        for pad in flipped.pads:
+            self.assertFalse(any(layer.startswith("F.") for layer in pad.layers))
+        for text in flipped.fp_texts:
+            if text.text != "FBRK:autoplaced":
+                self.assertFalse(text.layer.layer.startswith("F."))
+        for prop in flipped.propertys.values():
+            self.assertFalse(prop.layer.layer.startswith("F."))
+
+    def test_flip_layer(self):
+        for layer in ["F.Cu", "B.Cu", "F.SilkS", "B.Fab", "*.Cu", "In1.Cu", "User.5"]:
+            expected = (
+                layer.replace("F.", "<F>.").replace("B.", "F.").replace("<F>.", "B.")
+            )
+            self.assertEqual(flip_layer(layer), expected)
+            self.assertEqual(flip_layer(flip_layer(layer)), layer)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,251 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import itertools
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+import networkx as nx
+import numpy as np
+
+from faebryk.exporters.pcb.routing.grid import (
+    WEIGHTS,
+    GraphImplicit,
+    Grid,
+    GridInvalidVertexException,
+    OutCoord,
+    add,
+    sub,
+)
+
+DIMS = (7, 6, 3)
+
+
+def _explicit(g: GraphImplicit) -> nx.Graph:
+    """
+    Reference lattice with the same edges & weights, built explicitly
+    """
+    G = nx.Graph()
+    G.add_nodes_from(np.flatnonzero(g.G).tolist())
+    planar = [((1, 0), WEIGHTS[0]), ((0, 1), WEIGHTS[0])]
+    planar += [((1, 1), WEIGHTS[1]), ((1, -1), WEIGHTS[1])]
+    for x, y, z in itertools.product(*map(range, DIMS)):
+        v = g.project_into((x, y, z))
+        for (dx, dy), w in planar:
+            if 0 <= x + dx < DIMS[0] and 0 <= y + dy < DIMS[1]:
+                G.add_edge(v, g.project_into((x + dx, y + dy, z)), weight=w)
+        for z2 in range(z + 1, DIMS[2]):
+            v2 = g.project_into((x, y, z2))
+            if not (g.no_via[v] or g.no_via[v2]):
+                G.add_edge(v, v2, weight=WEIGHTS[2])
+
+    G.remove_edges_from(
+        (a, b)
+        for a, b in list(G.edges)
+        if g._edge_key(a, b) in g.removed_edges or not (g.G[a] and g.G[b])
+    )
+    G.remove_nodes_from(np.flatnonzero(~g.G).tolist())
+    return G
+
+
+def _cost(G: nx.Graph, path: list[int]) -> int:
+    return sum(G.edges[a, b]["weight"] for a, b in zip(path[:-1], path[1:]))
+
+
+class TestGraphImplicit(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        size = DIMS[0] * DIMS[1] * DIMS[2]
+        g = GraphImplicit.lattice(DIMS, diagonal=True, layer=True)
+        g = g.subgraph(ex={rng.randrange(size) for _ in range(size // 5)})
+        g = g.subgraph_e(
+            ex={(v, (v + DIMS[0] * DIMS[1]) % size) for v in range(0, size, 3)}
+        )
+        g = g.subgraph_via(ex={rng.randrange(size) for _ in range(size // 5)})
+        self.g = g
+        self.G = _explicit(g)
+
+    def test_astar_optimal(self):
+        vs = sorted(self.G.nodes)
+        for start, end in itertools.combinations(vs[::7], 2):
+            path = self.g.astar(start, end)
+            if not nx.has_path(self.G, start, end):
+                self.assertEqual(path, [])
+                continue
+            self.assertEqual((path[0], path[-1]), (start, end))
+            self.assertTrue(all(self.G.has_edge(a, b) for a, b in zip(path, path[1:])))
+            self.assertEqual(
+                _cost(self.G, path),
+                nx.shortest_path_length(self.G, start, end, weight="weight"),
+            )
+
+    def test_astar_multi(self):
+        vs = sorted(self.G.nodes)
+        sources, targets = set(vs[:20:4]), set(vs[-30::6])
+        path = self.g.astar_multi(sources, targets)
+        self.assertIn(path[0], sources)
+        self.assertIn(path[-1], targets)
+
+        # reference: multi-source dijkstra
+        dists = nx.multi_source_dijkstra_path_length(self.G, sources)
+        self.assertEqual(_cost(self.G, path), min(dists[t] for t in targets))
+
+    def test_find_tree(self):
+        g = GraphImplicit.lattice(DIMS, diagonal=True, layer=True)
+        nodes = {g.project_into(c) for c in [(0, 0, 0), (6, 0, 0), (3, 5, 0)]}
+        G = _explicit(g)
+
+        tree = g.find_tree(nodes, ex=set())
+        coords = {c for branch in tree for c in branch}
+        self.assertTrue(nodes.issubset(coords))
+        for i, branch in enumerate(tree):
+            self.assertTrue(all(G.has_edge(a, b) for a, b in zip(branch, branch[1:])))
+            if i > 0:
+                self.assertIn(branch[0], {c for b in tree[:i] for c in b})
+
+        chain = g.find_path(nodes, ex=set())
+        self.assertLess(sum(_cost(G, branch) for branch in tree), _cost(G, chain))
+
+    def test_neigh(self):
+        vs = set(sorted(self.G.nodes)[::5])
+        self.assertEqual(
+            self.g.neigh(vs, order=1, ring=False),
+            {n for v in vs for n in self.G.neighbors(v)},
+        )
+        self.assertEqual(
+            self.g.neigh(vs, order=1, ring=True),
+            {
+                n
+                for v in vs
+                for n in self.G.neighbors(v)
+                if self.g.project_out(n)[2] == self.g.project_out(v)[2]
+            },
+        )
+
+    def test_overlay(self):
+        g = self.g
+        G, no_via = g.G.copy(), g.no_via.copy()
+        vs = sorted(self.G.nodes)
+        start, end = vs[0], vs[-1]
+        ex = set(vs[1:-1:2])
+
+        with g.overlay(ex=ex, ex_via=ex) as g_o:
+            self.assertIs(g_o, g)
+            path = g.astar(start, end)
+            self.assertTrue(ex.isdisjoint(path))
+            ref = _explicit(g)
+
+        self.assertTrue(np.array_equal(g.G, G))
+        self.assertTrue(np.array_equal(g.no_via, no_via))
+        if path:
+            self.assertEqual(
+                _cost(ref, path),
+                nx.shortest_path_length(ref, start, end, weight="weight"),
+            )
+
+    def test_block(self):
+        g = self.g
+        path = g.astar(*sorted(self.G.nodes)[:2])
+        g.block(ex=path[1:], ex_via=path[:1])
+        self.assertFalse(g.G[path[1:]].any())
+        self.assertTrue(g.no_via[path[0]])
+        self.assertTrue(set(path[1:]).isdisjoint(g.neigh({path[0]}, 1, ring=False)))
+
+    def test_invalid_vertex(self):
+        removed = int(np.flatnonzero(~self.g.G)[0])
+        with self.assertRaises(GridInvalidVertexException):
+            self.g.astar(removed, int(np.flatnonzero(self.g.G)[0]))
+
+
+class TestGridProjection(unittest.TestCase):
+    def setUp(self):
+        self.grid = Grid((OutCoord(0, 0, 0), OutCoord(3, 2, 1)), tolerance_=0.5)
+
+    def test_points(self):
+        grid = self.grid
+        rng = np.random.default_rng(0)
+        coords = np.column_stack(
+            [rng.uniform(-0.5, 3.5, 50), rng.uniform(-0.5, 2.5, 50), [0, 1] * 25]
+        )
+
+        idx = grid._project_into_np(coords)
+        self.assertEqual(
+            idx.tolist(), [grid._project_into(OutCoord(*c)) for c in coords]
+        )
+        self.assertTrue(
+            np.allclose(
+                grid._project_out_np(idx),
+                [grid._project_out(i).as_tuple() for i in idx.tolist()],
+            )
+        )
+
+    def test_rects(self):
+        grid = self.grid
+        rects = [
+            (OutCoord(0, 0, 0), OutCoord(0.5, 0.3, 0)),
+            (OutCoord(1, 1, 0), OutCoord(1.25, 1.5, 1)),
+            # partially outside of the grid
+            (OutCoord(-0.5, -0.5, 0), OutCoord(-0.2, 0, 0)),
+        ]
+
+        def reference(rect):
+            qrect = tuple(grid._project_into_tuple(r) for r in rect)
+            dim = sub(qrect[1], qrect[0])
+            coords = [
+                add(qrect[0], (x, y, z))
+                for x in range(-1, dim[0] + 2)
+                for y in range(-1, dim[1] + 2)
+                for z in range(dim[2] + 1)
+            ]
+            return [
+                grid.G.project_into(c)
+                for c in coords
+                if all(0 <= ci < si for ci, si in zip(c, grid.steps))
+            ]
+
+        self.assertEqual(
+            grid._project_rects_into_np(np.asarray(rects)).tolist(),
+            [c for rect in rects for c in reference(rect)],
+        )
+
+    def test_find_path_and_tree(self):
+        grid = self.grid
+        two = [OutCoord(0, 0, 0), OutCoord(3, 0, 0)]
+        path = grid.find_path(two, remove=False)
+        self.assertEqual({path[0], path[-1]}, set(two))
+
+        three = [*two, OutCoord(1.5, 2, 0)]
+        tree = grid.find_tree(three, remove=False)
+        self.assertGreater(len(tree), 1)
+        self.assertTrue(set(three).issubset({c for branch in tree for c in branch}))
+
+        chain = grid.find_path(three)
+        self.assertTrue(set(three).issubset(chain))
+        self.assertFalse(grid.is_free(grid._project_into(c) for c in three))
+
+    def test_project_path(self):
+        grid = self.grid
+        path = [
+            grid.G.project_into(c)
+            for c in [(0, 0, 0), (1, 0, 0), (2, 0, 0), (3, 1, 0), (4, 2, 0), (4, 2, 1)]
+        ]
+        self.assertEqual(
+            grid.project_path(path),
+            grid._compress_path([grid._project_out(c) for c in path]),
+        )
+        self.assertEqual(len(grid.project_path(path)), 4)
+        self.assertEqual(len(grid.project_path(path, compressed=False)), 6)
+
+    def test_draw(self):
+        grid = self.grid
+        grid.commit([[grid.G.project_into((1, 1, 0)), grid.G.project_into((2, 1, 0))]])
+        with tempfile.TemporaryDirectory() as tmp:
+            out = Path(tmp) / "grid.png"
+            grid.draw(str(out))
+            self.assertTrue(out.stat().st_size > 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
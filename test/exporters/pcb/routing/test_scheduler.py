@@ -0,0 +1,128 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import pickle
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+
+from faebryk.exporters.pcb.routing import scheduler as scheduler_module
+from faebryk.exporters.pcb.routing.grid import (
+    Grid,
+    GridInvalidVertexException,
+    OutCoord,
+)
+from faebryk.exporters.pcb.routing.scheduler import (
+    NetOrder,
+    RoutingJob,
+    RoutingScheduler,
+)
+
+
+def _grid(size: float = 10):
+    return Grid((OutCoord(0, 0, 0), OutCoord(size, size, 0)), tolerance_=1)
+
+
+def _job(name: str, *nodes: tuple[float, float]):
+    return RoutingJob(name, [OutCoord(x, y, 0) for x, y in nodes])
+
+
+class TestRoutingScheduler(unittest.TestCase):
+    def test_job_failures(self):
+        grid = _grid()
+        grid.commit(_job("a", (1, 1), (3, 1)).route(grid))
+        # unroutable nets are reported, not raised
+        self.assertIsNone(_job("b", (1, 1), (5, 5)).route(grid))
+
+        # a broken grid is not a routing failure
+        v = grid._project_into(OutCoord(5, 5, 0))
+        grid.G = grid.G.block(ex=np.array([v]), ex_via=np.array([], dtype=np.int64))
+        with self.assertRaises(GridInvalidVertexException) as ctx:
+            _job("c", (7, 7), (5, 5)).route(grid)
+
+        e = pickle.loads(pickle.dumps(ctx.exception))
+        self.assertEqual(e.vertex_index, v)
+
+    def test_order_and_batches(self):
+        jobs = [
+            _job("big", (0, 0), (9, 9)),
+            _job("three", (1, 1), (1, 2), (1, 3)),
+            _job("small", (5, 5), (6, 5)),
+            _job("corner", (8, 0), (8.5, 0)),
+        ]
+        scheduler = RoutingScheduler(_grid(), order=NetOrder.PINS)
+        ordered = scheduler._sort(jobs)
+        self.assertEqual([j.name for j in ordered], ["corner", "small", "big", "three"])
+        self.assertEqual(
+            [[j.name for j in b] for b in scheduler._batches(ordered)],
+            [["corner", "small"], ["big"], ["three"]],
+        )
+
+        scheduler.order = NetOrder.BBOX
+        self.assertEqual(
+            [j.name for j in scheduler._sort(jobs)],
+            ["corner", "small", "three", "big"],
+        )
+
+    def test_parallel_equals_sequential(self):
+        jobs = [
+            _job("a", (1, 1), (3, 2)),
+            _job("b", (7, 1), (9, 3)),
+            _job("c", (1, 7), (2, 9)),
+            _job("d", (7, 7), (9, 8), (8, 9)),
+        ]
+        sequential = RoutingScheduler(_grid(), workers=1).run(jobs)
+        parallel_scheduler = RoutingScheduler(_grid(), workers=2)
+        parallel = parallel_scheduler.run(jobs)
+
+        self.assertEqual({j.name for j in parallel}, {"a", "b", "c", "d"})
+        self.assertEqual(parallel, sequential)
+        self.assertFalse(parallel_scheduler.failed)
+
+    def test_ripup(self):
+        # a is routed first and runs right next to the first pad of b
+        jobs = [_job("a", (2, 2), (8, 2)), _job("b", (5, 2.1), (5, 9))]
+
+        scheduler = RoutingScheduler(_grid(), order=NetOrder.BBOX, ripup_passes=0)
+        self.assertEqual([j.name for j in scheduler.run(jobs)], ["a"])
+        self.assertEqual([j.name for j in scheduler.failed], ["b"])
+
+        grid = _grid()
+        scheduler = RoutingScheduler(grid, order=NetOrder.BBOX, ripup_passes=1)
+        paths = scheduler.run(jobs)
+        self.assertEqual(set(paths), set(jobs))
+        self.assertFalse(scheduler.failed)
+        a, b = ({c for branch in paths[j] for c in branch} for j in jobs)
+        self.assertTrue(a.isdisjoint(b))
+
+    def test_one_pool_per_run(self):
+        # every batch after the first has to see the commits of the earlier ones
+        jobs = [
+            _job("a", (1, 1), (3, 1)),
+            _job("b", (7, 1), (9, 1)),
+            _job("c", (0, 2), (4, 2)),
+            _job("d", (6, 2), (9, 2)),
+            _job("e", (0, 8), (4, 8)),
+            _job("f", (6, 8), (9, 8)),
+        ]
+        sequential = RoutingScheduler(_grid(), workers=1).run(jobs)
+
+        scheduler = RoutingScheduler(_grid(), workers=2)
+        with patch.object(
+            scheduler_module, "ProcessPoolExecutor", wraps=ProcessPoolExecutor
+        ) as pool:
+            parallel = scheduler.run(jobs)
+        self.assertEqual(pool.call_count, 1)
+        self.assertGreater(len(scheduler._batches(scheduler._sort(jobs))), 1)
+        self.assertEqual(parallel, sequential)
+
+    def test_same_name(self):
+        jobs = [_job("x", (1, 1), (3, 1)), _job("x", (1, 8), (3, 8))]
+        paths = RoutingScheduler(_grid(), workers=1).run(jobs)
+        self.assertEqual(set(paths), set(jobs))
+
+
+if __name__ == "__main__":
+    unittest.main()
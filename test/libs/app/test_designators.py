@@ -0,0 +1,47 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import unittest
+
+import faebryk.library._F as F
+from faebryk.core.module import Module
+from faebryk.libs.app.designators import (
+    DesignatorAllocator,
+    attach_random_designators,
+)
+from faebryk.libs.library import L
+
+
+class TestDesignators(unittest.TestCase):
+    def test_allocator(self):
+        allocator = DesignatorAllocator(["R1", "R3", "R3", "C2", "bogus"])
+
+        self.assertEqual(
+            [allocator.allocate("R") for _ in range(3)], ["R2", "R4", "R5"]
+        )
+        self.assertEqual(allocator.allocate("C"), "C1")
+        allocator.reserve("C3")
+        self.assertEqual([allocator.allocate("C") for _ in range(2)], ["C4", "C5"])
+        self.assertEqual(allocator.allocate("U"), "U1")
+
+    def test_attach_random_designators(self):
+        class App(Module):
+            resistors = L.list_field(4, F.Resistor)
+
+        app = App()
+        for r in app.resistors:
+            r.get_trait(F.can_attach_to_footprint).attach(
+                F.SMDTwoPin(F.SMDTwoPin.Type._0805)
+            )
+        app.resistors[2].add(F.has_designator_defined("R1"))
+
+        attach_random_designators(app.get_graph())
+
+        self.assertEqual(
+            [r.get_trait(F.has_designator).get_designator() for r in app.resistors],
+            ["R2", "R3", "R1", "R4"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import os
+import unittest
+
+import faebryk.library._F as F
+from faebryk.core.module import Module
+from faebryk.libs.app.erc import (
+    ERCFault,
+    ERCFaults,
+    ERCFaultShort,
+    ERCStatus,
+    check_classes_for_erc,
+    find_erc_faults,
+    get_erc_results_for_classes,
+    simple_erc,
+)
+from faebryk.libs.library import L
+
+
+class _App(Module):
+    power = L.list_field(2, F.ElectricPower)
+    resistors = L.list_field(2, F.Resistor)
+    nets = L.list_field(2, F.Net)
+
+    def __preinit__(self):
+        for i, net in enumerate(self.nets):
+            net.add(F.has_overriden_name_defined(f"net{i}"))
+        r1, r2 = self.resistors
+        r1.unnamed[0].connect(self.nets[0].part_of)
+        r1.unnamed[1].connect(self.nets[1].part_of)
+        r2.unnamed[0].connect(r1.unnamed[1])
+
+
+class _Shorted(Module):
+    resistor: F.Resistor
+
+    def __preinit__(self):
+        self.resistor.unnamed[0].connect(self.resistor.unnamed[1])
+
+
+class _Broken(Module):
+    def __init__(self):
+        raise ValueError("broken")
+
+
+class _Dying(Module):
+    def __init__(self):
+        os._exit(1)
+
+
+class TestERC(unittest.TestCase):
+    def test_no_faults(self):
+        app = _App()
+        self.assertEqual(find_erc_faults(app.get_graph()), [])
+        simple_erc(app.get_graph())
+
+    def test_single_fault(self):
+        app = _App()
+        app.power[0].lv.connect(app.power[0].hv)
+
+        faults = find_erc_faults(app.get_graph())
+        self.assertEqual(len(faults), 1)
+        self.assertIsInstance(faults[0], ERCFaultShort)
+        self.assertEqual(faults[0].faulting_ifs, [app.power[0].lv, app.power[0].hv])
+
+        with self.assertRaises(ERCFaultShort):
+            simple_erc(app.get_graph())
+
+    def test_all_faults(self):
+        app = _App()
+        # shorted via a chain, not a direct connection
+        app.power[1].lv.connect(app.resistors[0].unnamed[0])
+        app.power[1].lv.connect(app.resistors[1].unnamed[0])
+        app.power[0].hv.connect(app.resistors[1].unnamed[0])
+        app.power[0].lv.connect(app.nets[0].part_of)
+
+        faults = find_erc_faults(app.get_graph())
+        messages = sorted(str(f.args[0]).split(":")[0] for f in faults)
+        self.assertEqual(
+            messages,
+            ["shorted component", "shorted nets", "shorted power"],
+        )
+
+        with self.assertRaises(ERCFault) as ctx:
+            simple_erc(app.get_graph())
+        self.assertIsInstance(ctx.exception, ERCFaults)
+        self.assertEqual(len(ctx.exception.faults), 3)
+
+    def test_classes(self):
+        classes = [_App, _Shorted, _Broken, lambda: _Shorted()]
+        serial = get_erc_results_for_classes(classes, workers=1)
+        self.assertEqual(
+            [r.status for r in serial],
+            [ERCStatus.OK, ERCStatus.FAULT, ERCStatus.SKIPPED, ERCStatus.FAULT],
+        )
+        self.assertEqual(get_erc_results_for_classes(classes, workers=2), serial)
+
+        with self.assertRaises(ERCFault):
+            check_classes_for_erc(classes, workers=2)
+        check_classes_for_erc([_App, _Broken], workers=2)
+
+    def test_classes_worker_crash(self):
+        results = get_erc_results_for_classes([_App, _Dying, _Shorted], workers=2)
+        self.assertEqual(
+            [r.status for r in results],
+            [ERCStatus.OK, ERCStatus.CRASH, ERCStatus.FAULT],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import faebryk.library._F as F
+from faebryk.core.module import Module
+from faebryk.libs.app import kicad_netlist
+from faebryk.libs.app.kicad_netlist import NetlistSummary, write_netlist
+from faebryk.libs.library import L
+from faebryk.libs.units import P
+
+
+class _App(Module):
+    resistors = L.list_field(2, F.Resistor)
+    gnd: F.Net
+
+    def __init__(self, resistance: float):
+        super().__init__()
+        self._resistance = resistance
+
+    def __preinit__(self):
+        r1, r2 = self.resistors
+        r1.resistance.merge(self._resistance * P.ohm)
+        r2.resistance.merge(100 * P.ohm)
+        r1.unnamed[0].connect(r2.unnamed[0])
+        self.gnd.part_of.connect(r1.unnamed[1])
+
+        for r in self.resistors:
+            r.get_trait(F.can_attach_to_footprint).attach(
+                F.SMDTwoPin(F.SMDTwoPin.Type._0805)
+            )
+
+
+def _graph(resistance: float):
+    return _App(resistance).get_graph()
+
+
+class TestWriteNetlist(unittest.TestCase):
+    def test_unchanged_skips_serialization(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "test.net"
+
+            self.assertTrue(write_netlist(_graph(100), path, True))
+            self.assertTrue(NetlistSummary.path_for(path).exists())
+            netlist = path.read_text()
+
+            with patch.object(
+                kicad_netlist,
+                "from_faebryk_t2_netlist",
+                wraps=kicad_netlist.from_faebryk_t2_netlist,
+            ) as serialize:
+                self.assertFalse(write_netlist(_graph(100), path, True))
+                serialize.assert_not_called()
+
+                self.assertTrue(write_netlist(_graph(200), path, True))
+                serialize.assert_called_once()
+            self.assertNotEqual(path.read_text(), netlist)
+
+    def test_modified_netlist_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "test.net"
+            self.assertTrue(write_netlist(_graph(100), path, True))
+
+            # summary does not match the file anymore, fall back to text compare
+            path.write_text(path.read_text() + "\n")
+            self.assertIsNone(NetlistSummary.load(path))
+            self.assertTrue(write_netlist(_graph(100), path, True))
+            self.assertFalse(write_netlist(_graph(100), path, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
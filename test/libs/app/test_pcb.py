@@ -0,0 +1,86 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import unittest
+
+import faebryk.library._F as F
+from faebryk.core.module import Module
+from faebryk.exporters.pcb.layout.absolute import LayoutAbsolute
+from faebryk.libs.app.pcb import apply_layouts
+from faebryk.libs.library import L
+
+
+class TestApplyLayouts(unittest.TestCase):
+    def test_resolved_positions(self):
+        class N(Module):
+            @L.rt_field
+            def n(self):
+                if self._depth == 0:
+                    return []
+                return N(self._depth - 1)
+
+            def __init__(self, depth: int):
+                super().__init__()
+                self._depth = depth
+
+        depth = 6
+        app = N(depth)
+        nodes = [app]
+        for _ in range(depth):
+            nodes.append(nodes[-1].n)
+
+        layer = F.has_pcb_position.layer_type.NONE
+        # every other level places itself with a layout, the rest has no position
+        for i, n in enumerate(nodes[:-1]):
+            if i % 2 == 1:
+                n.add_trait(F.has_pcb_layout_defined(LayoutAbsolute((1, 2, 90, layer))))
+        nodes[-1].add_trait(
+            F.has_pcb_position_defined_relative_to_parent((3, 0, 0, layer))
+        )
+
+        positions = apply_layouts(app)
+
+        positioned = [n for n in nodes if n.has_trait(F.has_pcb_position)]
+        self.assertEqual(len(positioned), 1 + depth // 2 + 1)
+        self.assertEqual(set(positions), set(positioned))
+
+        for n in positioned:
+            # hierarchy walk
+            expected = n.get_trait(F.has_pcb_position).get_position()
+            for a, b in zip(positions[n], expected):
+                self.assertAlmostEqual(a, b)
+
+    def test_positions_not_stale_between_passes(self):
+        class Child(Module): ...
+
+        class App(Module):
+            child: Child
+
+        layer = F.has_pcb_position.layer_type.NONE
+        seen: list[F.has_pcb_position.Point] = []
+
+        class RecordingLayout(LayoutAbsolute):
+            def apply(self, *node):
+                super().apply(*node)
+                seen.append(app.child.get_trait(F.has_pcb_position).get_position())
+
+        app = App()
+        app.add_trait(F.has_pcb_position_defined((0, 0, 0, layer)))
+        app.child.add_trait(
+            F.has_pcb_position_defined_relative_to_parent((1, 0, 0, layer))
+        )
+        app.add_trait(F.has_pcb_layout_defined(RecordingLayout((0, 0, 0, layer))))
+
+        apply_layouts(app)
+        app.add_trait(F.has_pcb_position_defined((10, 0, 0, layer)))
+        # nothing cached on the traits outside of a pass
+        self.assertEqual(app.child.get_trait(F.has_pcb_position).get_position()[0], 11)
+        positions = apply_layouts(app)
+
+        self.assertEqual(seen[0][0], 1)
+        self.assertEqual(seen[1][0], 11)
+        self.assertEqual(positions[app.child][0], 11)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from shapely import box
+
+from faebryk.libs.geometry import basic
+from faebryk.libs.geometry.basic import (
+    get_distributed_points_in_polygon,
+    get_distributed_points_in_polygons,
+)
+
+
+class TestDistributedPoints(unittest.TestCase):
+    def test_distributed_points(self):
+        # U shape, concave
+        polygon = box(0, 0, 10, 10).difference(box(3, 3, 7, 12))
+        points = get_distributed_points_in_polygon(polygon, density=0.5, seed=0)
+
+        self.assertEqual(len(points), int(polygon.area * 0.5))
+        self.assertTrue(all(polygon.contains(p) for p in points))
+
+        coords = np.array([(p.x, p.y) for p in points])
+        dists = np.linalg.norm(coords[:, None] - coords[None, :], axis=-1)
+        np.fill_diagonal(dists, np.inf)
+        # relaxed points are spread out, random ones usually clump
+        self.assertGreater(dists.min(), 0.8)
+
+    def test_single_point(self):
+        polygon = box(0, 0, 1, 1)
+        (point,) = get_distributed_points_in_polygon(polygon, density=0.1, seed=0)
+        self.assertAlmostEqual(point.x, 0.5)
+        self.assertAlmostEqual(point.y, 0.5)
+
+    def test_parallel_matches_inline(self):
+        polygons = [box(0, 0, 5, 5), box(0, 0, 2, 8).union(box(0, 6, 6, 8))]
+
+        np.random.seed(1)
+        inline = get_distributed_points_in_polygons(polygons, 0.5, workers=1)
+        np.random.seed(1)
+        parallel = get_distributed_points_in_polygons(polygons, 0.5, workers=2)
+
+        self.assertEqual(inline, parallel)
+
+    def test_serial_by_default(self):
+        polygons = [box(0, 0, 5, 5), box(0, 0, 3, 3)]
+        with patch.object(basic, "ProcessPoolExecutor") as pool:
+            get_distributed_points_in_polygons(polygons, 0.5)
+        pool.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import random
+import unittest
+
+from faebryk.libs.geometry.spatial import (
+    SpatialIndex,
+    bbox_distance,
+    bbox_intersects,
+)
+
+
+class _Obj:
+    pass
+
+
+def _random_bbox(rng: random.Random):
+    x, y = rng.uniform(-50, 50), rng.uniform(-50, 50)
+    w, h = rng.uniform(0, 8), rng.uniform(0, 8)
+    return (x, y), (x + w, y + h)
+
+
+class TestSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        self.rng = rng
+        self.index = SpatialIndex[_Obj](cell_size=2.0)
+        self.boxes = {}
+        for _ in range(300):
+            obj = _Obj()
+            bbox = _random_bbox(rng)
+            self.boxes[obj] = bbox
+            self.index.insert(obj, bbox)
+
+    def _check_rect(self, query):
+        expected = {o for o, b in self.boxes.items() if bbox_intersects(b, query)}
+        self.assertEqual(set(self.index.query_rect(query)), expected)
+
+    def test_query_rect(self):
+        for _ in range(100):
+            self._check_rect(_random_bbox(self.rng))
+        # larger than the occupied area
+        self._check_rect(((-1e3, -1e3), (1e3, 1e3)))
+
+    def test_nearest(self):
+        for _ in range(100):
+            p = (self.rng.uniform(-80, 80), self.rng.uniform(-80, 80))
+            expected = sorted(bbox_distance(b, p) for b in self.boxes.values())[:5]
+            out = self.index.nearest(p, k=5)
+            self.assertEqual([bbox_distance(self.boxes[o], p) for o in out], expected)
+
+    def test_update_remove(self):
+        objs = list(self.boxes)
+        for obj in objs[:100]:
+            self.index.remove(obj)
+            del self.boxes[obj]
+        for obj in objs[100:200]:
+            self.boxes[obj] = _random_bbox(self.rng)
+            self.index.insert(obj, self.boxes[obj])
+
+        self.assertEqual(len(self.index), 200)
+        self.assertNotIn(objs[0], self.index)
+        for _ in range(50):
+            self._check_rect(_random_bbox(self.rng))
+
+
+if __name__ == "__main__":
+    unittest.main()
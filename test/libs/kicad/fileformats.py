@@ -14,7 +14,11 @@ from faebryk.libs.kicad.fileformats import (
     C_kicad_project_file,
 )
 from faebryk.libs.logging import setup_basic_logging
-from faebryk.libs.sexp.dataclass_sexp import JSON_File, SEXP_File, dataclass_dfs
+from faebryk.libs.sexp.dataclass_sexp import (
+    JSON_File,
+    SEXP_File,
+    dataclass_dfs,
+)
 from faebryk.libs.util import NotNone, find
 
 logger = logging.getLogger(__name__)
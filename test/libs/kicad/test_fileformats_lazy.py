@@ -0,0 +1,45 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import unittest
+from pathlib import Path
+
+from faebryk.libs.kicad.fileformats import C_kicad_pcb_file
+from faebryk.libs.sexp.dataclass_sexp import LazyList
+from faebryk.libs.util import find
+
+TEST_DIR = find(
+    Path(__file__).parents,
+    lambda p: p.name == "test" and (p / "common/resources").is_dir(),
+)
+PCBFILE = TEST_DIR / "common/resources/test.kicad_pcb"
+
+
+class TestFileFormatsLazy(unittest.TestCase):
+    def test_lazy(self):
+        pcb = C_kicad_pcb_file.loads(PCBFILE)
+        pcb_lazy = C_kicad_pcb_file.loads(PCBFILE, lazy=True)
+
+        zones = pcb_lazy.kicad_pcb.zones
+        self.assertIsInstance(zones, LazyList)
+        self.assertFalse(zones.is_materialized)
+
+        # untouched lazy fields are dumped verbatim
+        self.assertEqual(
+            C_kicad_pcb_file.loads(pcb_lazy.dumps()).kicad_pcb.zones,
+            pcb.kicad_pcb.zones,
+        )
+        self.assertFalse(zones.is_materialized)
+
+        # first access decodes
+        self.assertEqual(len(zones), len(pcb.kicad_pcb.zones))
+        self.assertTrue(zones.is_materialized)
+        self.assertEqual(zones, pcb.kicad_pcb.zones)
+
+        zones[0].name = "lazy"
+        pcb_reload = C_kicad_pcb_file.loads(pcb_lazy.dumps())
+        self.assertEqual(pcb_reload.kicad_pcb.zones[0].name, "lazy")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import io
+import os
+import stat
+import tempfile
+import unittest
+from dataclasses import dataclass, field, fields, is_dataclass
+from enum import Enum, IntEnum, StrEnum
+from pathlib import Path
+from unittest.mock import patch
+
+import sexpdata
+from sexpdata import Symbol
+
+from faebryk.libs.kicad.fileformats import (
+    C_kicad_footprint_file,
+    C_kicad_netlist_file,
+    C_kicad_pcb_file,
+)
+from faebryk.libs.sexp import dataclass_sexp
+from faebryk.libs.sexp.dataclass_sexp import (
+    SEXP_File,
+    SymEnum,
+    dump,
+    dumps,
+    sexp_field,
+)
+from faebryk.libs.sexp.util import prettify_sexp_string
+from faebryk.libs.util import find
+
+TEST_DIR = find(
+    Path(__file__).parents,
+    lambda p: p.name == "test" and (p / "common/resources").is_dir(),
+)
+TEST_FILES = TEST_DIR / "common/resources"
+
+
+# Straightforward encoder into a sexpdata tree, the streaming writer has to
+# produce the same text
+def _convert_reference(val):
+    if val is None:
+        return None
+    if is_dataclass(val):
+        return _encode_reference(val)
+    if isinstance(val, (list, tuple)):
+        return [_convert_reference(v) for v in val]
+    if isinstance(val, dict):
+        return [_convert_reference(v) for v in val.values()]
+    if isinstance(val, SymEnum):
+        return Symbol(val)
+    if isinstance(val, StrEnum):
+        return str(val)
+    if isinstance(val, IntEnum):
+        return int(val)
+    if isinstance(val, Enum):
+        return Symbol(val)
+    if isinstance(val, bool):
+        return Symbol("yes" if val else "no")
+    if isinstance(val, float):
+        return int(val) if val.is_integer() else val
+    if isinstance(val, (str, int)):
+        return val
+    return str(val)
+
+
+def _encode_reference(obj) -> list:
+    sexp = []
+    fs = [(f, sexp_field.from_field(f)) for f in fields(obj)]
+    for f, sp in sorted(fs, key=lambda x: (not x[1].positional, x[1].order)):
+        val = getattr(obj, f.name)
+        if val is None:
+            continue
+        if sp.positional:
+            sexp.append(_convert_reference(val))
+            continue
+
+        if sp.multidict:
+            name = f.name.removesuffix("s")
+            vals = val.values() if isinstance(val, dict) else val
+        else:
+            name, vals = f.name, [val]
+        for v in vals:
+            converted = _convert_reference(v)
+            if converted is None:
+                continue
+            if isinstance(converted, list):
+                sexp.append([Symbol(name), *converted])
+            else:
+                sexp.append([Symbol(name), converted])
+    return sexp
+
+
+def _dumps_reference(obj) -> str:
+    return prettify_sexp_string(sexpdata.dumps(_encode_reference(obj)[0]))
+
+
+@dataclass
+class C_test_file:
+    @dataclass
+    class C_test:
+        @dataclass
+        class C_item:
+            name: str = field(**sexp_field(positional=True))
+            value: float
+            flag: bool = False
+
+        texts: list[str] = field(**sexp_field(multidict=True), default_factory=list)
+        items: list[C_item] = field(**sexp_field(multidict=True), default_factory=list)
+
+    test: C_test
+
+
+class TestDataclassSexp(unittest.TestCase):
+    def test_dumps_identical_to_prettify(self):
+        for parser, path in [
+            (C_kicad_pcb_file, TEST_FILES / "test.kicad_pcb"),
+            (C_kicad_footprint_file, TEST_FILES / "test.kicad_mod"),
+            (C_kicad_netlist_file, TEST_FILES / "test_e.net"),
+        ]:
+            obj = parser.loads(path)
+            self.assertEqual(dumps(obj), _dumps_reference(obj), path.name)
+
+    def test_dumps_special_strings(self):
+        obj = C_test_file(
+            C_test_file.C_test(
+                texts=[
+                    "",
+                    "a  b",
+                    'quote " (paren',
+                    "new\nline\ttab\\",
+                    "odd\x0bbreak   ",
+                    "(x) )",
+                ],
+                items=[
+                    C_test_file.C_test.C_item("a b", 1.0, True),
+                    C_test_file.C_test.C_item("c", 0.5),
+                ],
+            )
+        )
+        self.assertEqual(dumps(obj), _dumps_reference(obj))
+
+    def test_dump_stream(self):
+        obj = C_kicad_pcb_file.loads(TEST_FILES / "test.kicad_pcb")
+        buf = io.StringIO()
+        dump(obj, buf)
+        self.assertEqual(buf.getvalue(), dumps(obj))
+
+    def test_dump_path_failure_keeps_file(self):
+        @dataclass
+        class C_failing_file:
+            @dataclass
+            class C_item:
+                name: str = field(**sexp_field(positional=True))
+
+            texts: list[str] = field(**sexp_field(multidict=True))
+            items: list[C_item] = field(**sexp_field(multidict=True))
+
+        def _raise(*args):
+            raise ValueError("encoder failed")
+
+        obj = C_failing_file(["a"] * 100, [C_failing_file.C_item("a")])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "test.kicad_pcb"
+            path.write_text("original")
+
+            with patch.dict(
+                dataclass_sexp._field_writers, {C_failing_file.C_item: _raise}
+            ):
+                with self.assertRaises(ValueError):
+                    SEXP_File.dump(obj, path)  # type: ignore
+
+            self.assertEqual(path.read_text(), "original")
+            self.assertEqual([p.name for p in Path(tmp).iterdir()], [path.name])
+
+            ok = C_test_file(C_test_file.C_test(texts=["a"]))
+            SEXP_File.dump(ok, path)  # type: ignore
+            self.assertEqual(path.read_text(), dumps(ok))
+
+    def test_dump_path_mode_and_symlink(self):
+        obj = C_test_file(C_test_file.C_test(texts=["a"]))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "new.kicad_pcb"
+            old_umask = os.umask(0o022)
+            try:
+                SEXP_File.dump(obj, path)  # type: ignore
+            finally:
+                os.umask(old_umask)
+            self.assertEqual(stat.S_IMODE(path.stat().st_mode), 0o644)
+
+            # existing files keep their mode, links stay links
+            path.chmod(0o600)
+            link = Path(tmp) / "link.kicad_pcb"
+            link.symlink_to(path)
+            SEXP_File.dump(obj, link)  # type: ignore
+            self.assertTrue(link.is_symlink())
+            self.assertEqual(stat.S_IMODE(path.stat().st_mode), 0o600)
+            self.assertEqual(path.read_text(), dumps(obj))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# This file is part of the faebryk project
+# SPDX-License-Identifier: MIT
+
+import timeit
+import unittest
+from pathlib import Path
+
+import sexpdata
+
+from faebryk.libs.sexp import parser
+from faebryk.libs.util import find
+
+TEST_DIR = find(
+    Path(__file__).parents,
+    lambda p: p.name == "test" and (p / "common/resources").is_dir(),
+)
+TEST_FILES = TEST_DIR / "common/resources"
+
+FILES = [
+    TEST_FILES / "test.kicad_pcb",
+    TEST_FILES / "test.kicad_mod",
+    TEST_FILES / "test.kicad_sch",
+    TEST_FILES / "test_e.net",
+    TEST_FILES / "fp-lib-table",
+]
+
+
+def _typed(sexp):
+    # sexpdata.Symbol == str is False, so compare types explicitly as well
+    if isinstance(sexp, list):
+        return [_typed(v) for v in sexp]
+    return (type(sexp), sexp)
+
+
+class TestSexpParser(unittest.TestCase):
+    def test_equal_to_sexpdata(self):
+        for path in FILES:
+            text = path.read_text()
+            self.assertEqual(
+                _typed(parser.loads(text)), _typed(sexpdata.loads(text)), path.name
+            )
+
+    def test_edge_cases(self):
+        for text in [
+            "(a)",
+            "()",
+            '(a "" "x\\"y" "\\\\n\\n\\q" b)',
+            "(a nil t 1 -1 1.5 .5 1e3 1_000 inf 0x10 a'b)",
+            "(a\t(b\r\n(c)) )  ",
+            "(a [b c])",
+            "(a 'b)",
+            "(a ; comment\n b)",
+            "(a\\ b)",
+        ]:
+            self.assertEqual(
+                _typed(parser.loads(text)), _typed(sexpdata.loads(text)), text
+            )
+
+    def test_errors(self):
+        for text in ["(a", "(a))", '(a "b)']:
+            with self.assertRaises(Exception):
+                parser.loads(text)
+
+    def test_interned_symbols(self):
+        out = parser.loads("(a (a b) (b a))")
+        self.assertIs(out[0], out[1][0])
+        self.assertIs(out[1][1], out[2][0])
+
+    def test_faster_than_sexpdata(self):
+        # largest fixture, best of a few runs to keep it stable
+        text = (TEST_FILES / "test_e.net").read_text()
+
+        def _best(loads) -> float:
+            return min(timeit.repeat(lambda: loads(text), number=1, repeat=3))
+
+        self.assertEqual(_typed(parser.loads(text)), _typed(sexpdata.loads(text)))
+        self.assertLess(_best(parser.loads), _best(sexpdata.loads))
+
+
+if __name__ == "__main__":
+    unittest.main()